@@ -9,16 +9,18 @@ import linkograph.stats as st
 import linkograph.linkoCreate as lc
 
 
+# The statistics are memoized in st.statsCache so that repeated
+# requests for the same linkograph and window are not recomputed.
 standard_args = {
-  'totalLabels':st.totalLabels,
-  'percentageOfEntries':st.percentageOfEntries,
-  'links':st.links,
-  'percentageOfLinks':st.percentageOfLinks,
-  'graphEntropy':st.graphEntropy,
+  'totalLabels':st.cachedMetric(st.totalLabels),
+  'percentageOfEntries':st.cachedMetric(st.percentageOfEntries),
+  'links':st.cachedMetric(st.links),
+  'percentageOfLinks':st.cachedMetric(st.percentageOfLinks),
+  'graphEntropy':st.cachedMetric(st.graphEntropy),
 }
 restrict_args = {
-  'linkEntropy':st.linkEntropy,
-  'linkTComplexity':st.linkTComplexity
+  'linkEntropy':st.cachedMetric(st.linkEntropy),
+  'linkTComplexity':st.cachedMetric(st.linkTComplexity)
 }
 '''
 getStats
@@ -27,8 +29,14 @@ getStats
 '''
 def getStats(linkograph,lowerBound,upperBound):
   result = {}
-  for f in standard_args:
-    result[f] = standard_args[f](linkograph,lowerBound=lowerBound,upperBound=upperBound)
-  for f in restrict_args:
-    result[f] = restrict_args[f](linkograph,restrict=True,lowerBound=lowerBound,upperBound=upperBound)
+  # The linkograph does not change while the statistics are gathered,
+  # so it is only hashed once for the cache lookups.
+  st.rememberFingerprint(linkograph)
+  try:
+    for f in standard_args:
+      result[f] = standard_args[f](linkograph,lowerBound=lowerBound,upperBound=upperBound)
+    for f in restrict_args:
+      result[f] = restrict_args[f](linkograph,restrict=True,lowerBound=lowerBound,upperBound=upperBound)
+  finally:
+    st.forgetFingerprint(linkograph)
   return result
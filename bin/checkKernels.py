@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+
+"""Command-line wrapper for kernels.cli_selfCheck."""
+
+import loadPath  # Adds the project path.
+import linkograph.kernels
+
+linkograph.kernels.cli_selfCheck()
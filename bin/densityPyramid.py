@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+
+"""Command-line wrapper for pyramid.cli_pyramid."""
+
+import loadPath  # Adds the project path.
+import linkograph.pyramid
+
+linkograph.pyramid.cli_pyramid()
@@ -75,41 +75,13 @@ def processSession(session_filename, writer):
     # extract features
     ##################
 
-    # node_count
-    node_count = len(lg)
-
-    # critical_node_count
+    # node_count, critical_node_count, x_bar, Sigma_x, range_x, y_bar,
+    # Sigma_y, range_y, percentage_of_links, entropy, t_complexity,
+    # link_index, graph_differences, entropy_deviation,
+    # mean_link_coverage, top_cover
     #     @todo: pick something real for critical_threshold
-    critical_threshold = node_count / 2
-    critical_node_count = lstats.countCriticalNodes(lg, critical_threshold)
-
-    # x_bar, Sigma_x, range_x, y_bar, Sigma_y, range_y
-    x_bar, Sigma_x, range_x, y_bar, Sigma_y, range_y = lstats.calculateCartesianStatistics(lg)
-
-    # percentage_of_links
-    percentage_of_links = lstats.percentageOfLinks(lg)
-
-    # entropy
-    entropy = lstats.graphEntropy(lg)
-
-    # T-Complexity
-    encoded_lg = lstats.linkographToString(lg)
-    t_complexity = lstats.tComplexity(encoded_lg)
-
-    # link_index
-    link_index = lstats.links(lg) / len(lg)
-
-    # graph differences
-    graph_differences = lstats.summaryDifference(lg)
-
-    # entropy deviation
-    entropy_deviation = lstats.entropyDeviation(lg)
-
-    # mean link coverage
-    mean_link_coverage = lstats.meanLinkCoverage(lg)
-
-    # top cover
-    top_cover = lstats.topCover(lg)
+    critical_threshold = len(lg) / 2
+    features = lstats.featureVector(lg, criticalThreshold=critical_threshold)
 
     first_command = json_commands[0]
     first_datetime = utils.stringToDatetime(first_command['ts'])
@@ -143,7 +115,7 @@ def processSession(session_filename, writer):
     #################
     # persist in .csv
     #################
-    writer.writerow([node_count, critical_node_count, x_bar, Sigma_x, range_x, y_bar, Sigma_y, range_y, percentage_of_links, entropy, t_complexity, link_index, graph_differences, entropy_deviation, mean_link_coverage, top_cover, session_start_time, session_length_seconds, mean_delay_seconds, access_ratio, look_ratio, transfer_ratio, move_ratio, execute_ratio, cleanup_ratio, access_next, look_next, transfer_next, move_next, execute_next, cleanup_next])
+    writer.writerow([features[name] for name in lstats.sessionFeatures] + [session_start_time, session_length_seconds, mean_delay_seconds, access_ratio, look_ratio, transfer_ratio, move_ratio, execute_ratio, cleanup_ratio, access_next, look_next, transfer_next, move_next, execute_next, cleanup_next])
 
 def regressionTest():
     # Figure 1 from linkography.pdf
@@ -157,6 +129,7 @@ def regressionTest():
            or (1.125, 4.5, 1.0, 1.75, 7, 2) != lstats.calculateCartesianStatistics(test_linkograph)
            or 0.0000000000000001 < abs(lstats.percentageOfLinks(test_linkograph) - 0.6666666666666666)
            or 0.0000000000000001 < abs(lstats.graphEntropy(test_linkograph) - 0.9182958340544896)
+           or (1.125, 4.5, 1.0, 1.75, 7, 2) != tuple(lstats.featureVector(test_linkograph, ["x_bar", "Sigma_x", "range_x", "y_bar", "Sigma_y", "range_y"]).values())
        ):
         print("error calculating statistics for training data")
 
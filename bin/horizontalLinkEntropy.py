@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+
+"""Command-line wrapper for stats.cli_horizontalLinkEntropy."""
+
+import loadPath  # Adds the project path.
+import linkograph.stats
+
+linkograph.stats.cli_horizontalLinkEntropy()
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+
+"""Command-line wrapper for sketch.cli_mergeSketches."""
+
+import loadPath  # Adds the project path.
+import linkograph.sketch
+
+linkograph.sketch.cli_mergeSketches()
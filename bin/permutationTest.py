@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+
+"""Command-line wrapper for significance.cli_permutationTest."""
+
+import loadPath  # Adds the project path.
+import linkograph.significance
+
+linkograph.significance.cli_permutationTest()
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+
+"""Command-line wrapper for store.cli_resultStore."""
+
+import loadPath  # Adds the project path.
+import linkograph.store
+
+linkograph.store.cli_resultStore()
@@ -17,14 +17,26 @@ n(n-1)/2.
 
 """
 import argparse  # For command line parsing.
+import itertools # For the relabelings of ontologies.
 import json
+import math
+import multiprocessing # For parallel frequency runs.
+import os
+import pickle # For checkpoints.
 import random
+import sys
+import time
+from collections import namedtuple
+from statistics import NormalDist # For confidence intervals.
+import numpy # For packed link strings.
 from decimal import * # For rounding metrics.
 from linkograph.stats import totalLinks # Gives the total links.
 from linkograph.stats import totalLinkographs # Gives total linkographs
 from linkograph import linkoCreate # For creating linkographs.
+from linkograph import kernels # For the compiled enumeration loop.
 from linkograph import linkoDrawSVG # For drawing linkographs.
 from linkograph import stats # For linkograph metrics.
+from linkograph import store as lstore # For stored results.
 
 class invalidEnumerationObject(Exception):
 
@@ -42,6 +54,10 @@ class invalidEnumerationObject(Exception):
 def linkoToEnum(linko):
     """Converts the linkograph to the enumeration.
 
+    The bits of the enumeration are set in a NumPy array, packed into
+    bytes and converted with int.from_bytes, rather than adding a
+    power of two for each link.
+
     Arguments:
     linko -- the linkograph to convert.
 
@@ -52,25 +68,56 @@ def linkoToEnum(linko):
     # Get the number of nodes.
     length = len(linko)
 
-    # Initialize the encoding.
-    enc = 0
-
     # The trivial case
     if length == 0:
         return (0,0)
 
-    # Loop through all the backlinks.
+    # Collect the backlinks (b,f) with f the node.
+    tails = []
+    heads = []
     for (nodeNum, entry) in enumerate(linko):
-        backlinks = entry[1]
+        tails.extend(entry[1])
+        heads.extend([nodeNum]*len(entry[1]))
+
+    return (length, _linksToEnc(length,
+                                numpy.array(tails, dtype=numpy.int64),
+                                numpy.array(heads, dtype=numpy.int64)))
+
+def _linksToEnc(length, tails, heads):
+    """The enc of an enumeration from the links (tails[i], heads[i])."""
+
+    # The link (b,f) is the power 2^(b + totalLinks(f)).
+    encBits = numpy.zeros(totalLinks(length), dtype=numpy.uint8)
+    encBits[tails + heads*(heads-1)//2] = 1
 
-        enc += sum([2**(x + totalLinks(nodeNum)) for x in backlinks])
+    return int.from_bytes(numpy.packbits(encBits,
+                                         bitorder='little').tobytes(),
+                          'little')
 
+def _encLinks(positions):
+    """The links (tails, heads) of the set bits of an enc."""
 
-    return (length, int(enc))
+    if kernels.accelerated:
+        return kernels.enumLinks(positions)
+
+    # The backlinks of node f start at the bit totalLinks(f).
+    heads = ((1 + numpy.sqrt(1 + 8*positions.astype(float))) // 2
+             ).astype(numpy.int64)
+
+    # Correct the rounding of the square root for very large
+    # positions.
+    heads -= heads*(heads-1)//2 > positions
+    heads += (heads+1)*heads//2 <= positions
+
+    return positions - heads*(heads-1)//2, heads
 
 def enumToLinko(enum):
     """Converts a linkograph enumeration to a linkograph.
 
+    The enc is converted to bytes with int.to_bytes and unpacked with
+    NumPy, so the links are found without shifting the integer one bit
+    at a time.
+
     Arguments:
     enum -- an enumeration (length, enc) for a linkograph.
 
@@ -92,32 +139,137 @@ def enumToLinko(enum):
         raise invalidEnumerationObject("The enumeration does not"
                                        " correspond to a linkograph")
 
-    # Initialize the linkograph.
+    positions = kernels.enumPositions(max(enc, 0))
+
+    return _linksToLinko(length, *_encLinks(positions))
+
+def _linksToLinko(length, tails, heads):
+    """The linkograph on length nodes with the links (tails, heads)."""
+
     linko = [(set(), set(), set()) for n in range(length)]
 
-    # Keep track of the node and backlink.
-    node, link = 1, 0
+    for (link, node) in zip(tails.tolist(), heads.tolist()):
+        # Add backlink
+        linko[node][1].add(link)
 
-    while enc > 0:
+        # Add forelink
+        linko[link][2].add(node)
 
-        # Test for bit
-        if enc & 1 == 1:
-            # Add backlink
-            linko[node][1].add(link)
+    return linkoCreate.Linkograph(linko)
 
-            # Add forelink
-            linko[link][2].add(node)
+def linkosToEnums(linkos):
+    """Converts a list of linkographs to enumerations.
 
-        # Shift off the bit.
-        enc >>= 1
+    The linkographs with the same number of nodes are converted
+    together: their bits are set in one NumPy array with a row for
+    each linkograph and packed at once. Gives the same list as
+    [linkoToEnum(linko) for linko in linkos].
 
-        # Increment the link.
-        link += 1
-        if link == node:
-            node, link = node+1, 0
+    """
 
-    return linkoCreate.Linkograph(linko)
+    result = [None]*len(linkos)
+
+    bySize = {}
+    for (index, linko) in enumerate(linkos):
+        bySize.setdefault(len(linko), []).append(index)
+
+    for (length, indices) in bySize.items():
+        rows = []
+        tails = []
+        heads = []
+        for (row, index) in enumerate(indices):
+            for (nodeNum, entry) in enumerate(linkos[index]):
+                rows.extend([row]*len(entry[1]))
+                tails.extend(entry[1])
+                heads.extend([nodeNum]*len(entry[1]))
+
+        tails = numpy.array(tails, dtype=numpy.int64)
+        heads = numpy.array(heads, dtype=numpy.int64)
+
+        encBits = numpy.zeros((len(indices), totalLinks(length)),
+                              dtype=numpy.uint8)
+        encBits[rows, tails + heads*(heads-1)//2] = 1
+        packed = numpy.packbits(encBits, axis=1, bitorder='little')
+
+        for (row, index) in enumerate(indices):
+            result[index] = (length,
+                             int.from_bytes(packed[row].tobytes(),
+                                            'little'))
+
+    return result
+
+def enumsToLinkos(enums):
+    """Converts a list of enumerations to linkographs.
+
+    The encs with the same number of nodes are converted to bytes,
+    stacked and unpacked at once. Gives the same list as
+    [enumToLinko(enum) for enum in enums].
+
+    """
+
+    result = [None]*len(enums)
+
+    bySize = {}
+    for (index, (length, enc)) in enumerate(enums):
+        if enc >= totalLinkographs(length):
+            raise invalidEnumerationObject("The enumeration does not"
+                                           " correspond to a linkograph")
+        bySize.setdefault(length, []).append(index)
+
+    for (length, indices) in bySize.items():
+        width = (totalLinks(length) + 7)//8
+
+        data = numpy.frombuffer(
+            b''.join(max(enums[index][1], 0).to_bytes(width, 'little')
+                     for index in indices),
+            dtype=numpy.uint8).reshape(len(indices), width)
+
+        rows, positions = numpy.nonzero(
+            numpy.unpackbits(data, axis=1, bitorder='little'))
+        tails, heads = _encLinks(positions)
+
+        # The links of each row are consecutive in rows.
+        bounds = numpy.searchsorted(rows, numpy.arange(len(indices)+1))
+
+        for (row, index) in enumerate(indices):
+            links = slice(bounds[row], bounds[row+1])
+            result[index] = _linksToLinko(length, tails[links],
+                                          heads[links])
+
+    return result
+
+def packedToEnum(packed, length):
+    """Converts a packed link string to a linkograph enumeration.
+
+    The link string is the one given by stats.linkographToPacked,
+    which lists the possible forelinks of node 0, then node 1, and so
+    on. The enumeration lists the possible backlinks of node 1, then
+    node 2, and so on, so the bits are moved to their place in the
+    enumeration without building the linkograph.
 
+    Arguments:
+    packed -- a stats.PackedString for a linkograph.
+    length -- the number of nodes in the linkograph.
+
+    Return:
+    (len, enc) -- the enumeration.
+
+    """
+
+    if length <= 1:
+        return (length, 0)
+
+    # The positions of the links in the link string.
+    positions = numpy.nonzero(stats.unpackString(packed))[0]
+
+    # The link string for node i starts at offsets[i].
+    nodes = numpy.arange(length, dtype=numpy.int64)
+    offsets = nodes*(length-1) - nodes*(nodes-1)//2
+
+    tails = numpy.searchsorted(offsets, positions, side='right') - 1
+    heads = tails + 1 + positions - offsets[tails]
+
+    return (length, _linksToEnc(length, tails, heads))
 
 def enumOnt(enum, absClasses=None):
     """ Take an enumeration of labeled onotlogies and returns the ontology.
@@ -165,23 +317,387 @@ def enumOnt(enum, absClasses=None):
     return ont
 
 
-def ontEnum(ontology):
+def ontEnum(ontology, absClasses=None):
     """ Converts an ontology to the enumeration.
 
+    The inverse of enumOnt: the ith entry ai of the enumeration has
+    bit j set if and only if the ontology has an edge from the ith
+    abstraction class to the jth.
+
     Arguments:
 
     ontology -- The ontology to convert.
+    absClasses -- optional list giving the order of the abstraction
+    classes. The default is the order of the keys of the ontology.
 
     Returns:
 
-    [a0, ..., a(n-1)] -- An encoding of the ontology.
+    (a0, ..., a(n-1)) -- An encoding of the ontology.
 
     """
-    pass
 
+    if absClasses is None:
+        absClasses = list(ontology.keys())
+
+    index = {str(aClass): j for (j, aClass) in enumerate(absClasses)}
+
+    enum = []
+
+    for aClass in absClasses:
+        a = 0
+        for terminal in ontology.get(str(aClass), []):
+            if str(terminal) not in index:
+                raise ValueError('The class {} is not one of the'
+                                 ' abstraction classes.'.format(terminal))
+            a |= 1 << index[str(terminal)]
+        enum.append(a)
+
+    return tuple(enum)
+
+def canonicalOntEnum(enum):
+    """The canonical enumeration of the ontologies isomorphic to enum.
+
+    Two ontology enumerations are isomorphic if a relabeling of the
+    classes takes one to the other. The canonical enumeration is the
+    one that canonicalOntologies gives for the isomorphism class.
+
+    Returns (canonical, count) where count is the number of
+    enumerations isomorphic to enum.
+
+    """
+
+    size = len(enum)
+
+    if size == 0:
+        return (), 1
+
+    matrix = numpy.array([[(a >> j) & 1 for j in range(size)]
+                          for a in enum], dtype=numpy.uint8)
+
+    codes = _ontologyCodes(matrix[None], _permutations(size))[0]
+    best = codes.argmax()
+    automorphisms = numpy.count_nonzero(codes == codes[best])
+
+    permutation = _permutations(size)[best]
+    canonical = matrix[numpy.ix_(permutation, permutation)]
+
+    return (_matrixEnum(canonical),
+            math.factorial(size) // automorphisms)
+
+def canonicalOntologies(size):
+    """Generates one ontology enumeration for each isomorphism class.
+
+    Of the 2**(size*size) ontologies on size classes, those that are
+    the same up to a relabeling of the classes are only given once.
+    Yields (enum, count) where enum is the canonical enumeration of an
+    isomorphism class, see enumOnt, and count is the number of
+    enumerations in the class, so that the counts add up to
+    2**(size*size).
+
+    The matrix of links of an ontology is read off one class at a
+    time: the self link of class k followed by the links between k and
+    each earlier class. The canonical ontology is the relabeling that
+    gives the largest such code. The canonical ontologies on k+1
+    classes are exactly the canonical extensions of the canonical
+    ontologies on k classes, since the first k classes of a canonical
+    ontology form a canonical ontology, so the classes are built up
+    one at a time and only the canonical extensions are kept.
+
+    """
+
+    if size == 0:
+        yield (), 1
+        return
+
+    yield from _canonicalExtensions(numpy.zeros((0, 0), numpy.uint8),
+                                    size)
+
+def _canonicalExtensions(matrix, size):
+    """The canonical ontologies on size classes that extend matrix."""
+
+    k = matrix.shape[0]
+
+    # Every choice of the self link of class k and of the links to and
+    # from the earlier classes, in the order of the code.
+    choices = numpy.array(list(itertools.product([1, 0],
+                                                 repeat=2*k+1)),
+                          dtype=numpy.uint8)
+
+    candidates = numpy.zeros((len(choices), k+1, k+1), numpy.uint8)
+    candidates[:, :k, :k] = matrix
+    candidates[:, k, k] = choices[:, 0]
+    candidates[:, k, :k] = choices[:, 1::2]
+    candidates[:, :k, k] = choices[:, 2::2]
+
+    codes = _ontologyCodes(candidates, _permutations(k+1))
+
+    # The identity is the first permutation.
+    canonical = (codes <= codes[:, :1]).all(axis=1)
+
+    for (candidate, candidateCodes) in zip(candidates[canonical],
+                                           codes[canonical]):
+        if k+1 == size:
+            automorphisms = numpy.count_nonzero(candidateCodes ==
+                                                candidateCodes[0])
+            yield (_matrixEnum(candidate),
+                   math.factorial(size) // automorphisms)
+        else:
+            yield from _canonicalExtensions(candidate, size)
+
+def _permutations(size):
+    """Every permutation of range(size), identity first, as an array."""
+    return numpy.array(list(itertools.permutations(range(size))),
+                       dtype=numpy.int64).reshape(-1, size)
+
+def _ontologyCodes(matrices, permutations):
+    """The codes of the relabelings of the link matrices.
+
+    Entry [c, p] is the code of matrices[c] with class i relabeled as
+    permutations[p][i], see canonicalOntologies. The codes have at
+    most 64 bits, so there can be at most 8 classes.
+
+    """
+
+    size = matrices.shape[1]
+
+    if size > 8:
+        raise ValueError('Ontologies with more than 8 classes are not'
+                         ' supported.')
+
+    # The entries of the matrix in the order of the code.
+    rows = []
+    columns = []
+    for v in range(size):
+        rows.append(v)
+        columns.append(v)
+        for u in range(v):
+            rows.extend([v, u])
+            columns.extend([u, v])
+
+    entries = matrices.reshape(len(matrices), size*size)[
+        :, permutations[:, rows]*size + permutations[:, columns]]
+
+    # The bits of each code are packed into the leading bytes of a big
+    # endian integer, which keeps the order of the codes.
+    packed = numpy.packbits(entries, axis=-1)
+    codes = numpy.zeros(packed.shape[:-1] + (8,), numpy.uint8)
+    codes[..., :packed.shape[-1]] = packed
+
+    return codes.view('>u8')[..., 0]
+
+def _matrixEnum(matrix):
+    """The enumOnt enumeration of a link matrix."""
+    return tuple(int(sum(int(bit) << j for (j, bit) in enumerate(row)))
+                 for row in matrix)
+
+
+class LabelingState():
+
+    """A labeling and its linkograph built one node at a time.
+
+    The states given by labelingStates describe the linkograph that
+    createLinko creates for the labeling without building it:
+
+    length -- the number of nodes.
+    labels -- the list of the label of each node.
+    backlinks -- for each node, an integer with bit i set if node i is
+    a backlink.
+    enc -- the enc of the enumeration of the linkograph.
+    links -- the number of links.
+    orbit -- the number of labelings the state stands for, which is
+    more than 1 only when the labelings are reduced by automorphisms.
+
+    A state is updated in place as the enumeration moves on, so it
+    should not be kept after the next labeling is produced.
+
+    """
+
+    def __init__(self, ontology, length=0):
+        self.ontology = ontology
+        self.length = length
+        self.labels = [None]*length
+        self.backlinks = [0]*length
+        self.enc = 0
+        self.links = 0
+        self.orbit = 1
+
+    def enum(self):
+        """The enumeration (length, enc) of the linkograph."""
+        return (self.length, self.enc)
+
+    def linkograph(self):
+        """The linkograph createLinko gives for the labeling."""
+
+        return _labelLinkograph(enumToLinko(self.enum()), self.labels,
+                                self.ontology)
+
+def _labelLinkograph(linko, labels, ontology):
+    """Adds the labels of the nodes as createLinko does."""
+
+    # frequency uses the plain empty linkograph for no nodes.
+    if len(linko) == 0:
+        return linko
+
+    for (entry, label) in zip(linko, labels):
+        entry[0].add(label)
+
+    linko.labels = sorted(set(labels).union(ontology.keys()))
+
+    return linko
+
+def _classRelation(ontology, absClasses):
+    """Entry [a][b] is True if the ontology links class a to class b."""
+    return [[terminal in ontology.get(initial, [])
+             for terminal in absClasses]
+            for initial in absClasses]
+
+def classAutomorphisms(ontology, absClasses=None):
+    """The automorphisms of the ontology over the abstraction classes.
+
+    An automorphism is a permutation g of the classes such that the
+    ontology links class a to class b exactly when it links g(a) to
+    g(b). Relabeling the nodes of a labeling by an automorphism gives
+    the same links, so the labelings in an orbit of the automorphisms
+    all have the same linkograph enumeration.
+
+    Returns a list of the automorphisms, each a tuple whose entry c is
+    the index in absClasses of the image of absClasses[c]. The
+    identity is first. The list can have up to len(absClasses)!
+    entries, for instance if the ontology has no links.
+
+    """
+
+    if absClasses is None:
+        absClasses = [key for key in ontology.keys()]
+
+    classes = len(absClasses)
+    relation = _classRelation(ontology, absClasses)
+
+    # Classes can only be mapped to classes with the same number of
+    # links in and out and the same self link.
+    signature = [(sum(relation[c]), sum(row[c] for row in relation),
+                  relation[c][c]) for c in range(classes)]
+
+    automorphisms = []
+    image = []
+    used = [False]*classes
+
+    def extend():
+        c = len(image)
+        if c == classes:
+            automorphisms.append(tuple(image))
+            return
+        for d in range(classes):
+            if used[d] or signature[d] != signature[c]:
+                continue
+            if any(relation[c][a] != relation[d][image[a]]
+                   or relation[a][c] != relation[image[a]][d]
+                   for a in range(c)):
+                continue
+            if relation[c][c] != relation[d][d]:
+                continue
+            image.append(d)
+            used[d] = True
+            extend()
+            used[d] = False
+            image.pop()
+
+    extend()
+
+    return automorphisms
+
+def labelingStates(length, ontology, absClasses=None,
+                   automorphisms=None):
+    """Generates every labeling on length nodes depth first.
+
+    The labelings are extended one node at a time, and only the
+    backlinks of the new node are added: they are the earlier nodes
+    whose label the ontology links to the label of the new node. The
+    labelings that share a prefix share the work for the prefix. A
+    LabelingState is yielded for each of the len(absClasses)**length
+    labelings, with the labels of the first nodes changing slowest.
+
+    If automorphisms, as given by classAutomorphisms, is not None,
+    only the canonical labeling of each orbit is yielded, the one that
+    comes first in the order above, and the orbit attribute of the
+    state is the number of labelings in the orbit. A prefix is dropped
+    as soon as an automorphism maps it to an earlier prefix.
+
+    """
+
+    if absClasses is None:
+        absClasses = [key for key in ontology.keys()]
+
+    state = LabelingState(ontology, length)
+
+    if length == 0:
+        yield state
+        return
+
+    classes = len(absClasses)
+    index = {label: c for (c, label) in enumerate(absClasses)}
+
+    # The classes that each class links forward to.
+    targets = [[index[t] for t in ontology.get(label, []) if t in index]
+               for label in absClasses]
+
+    # predecessors[k][c] has bit i set if node i < k is linked to a
+    # node k with class c. encs[k] and links[k] are for the first k
+    # nodes.
+    predecessors = [[0]*classes for _ in range(length)]
+    encs = [0]*(length+1)
+    links = [0]*(length+1)
+
+    # stabilizers[k] are the automorphisms that fix the labels of the
+    # first k nodes; the others map the prefix to a later one.
+    if automorphisms is not None:
+        stabilizers = [None]*(length+1)
+        stabilizers[0] = automorphisms
+
+    choice = [-1]*length
+    k = 0
+
+    while k >= 0:
+        choice[k] += 1
+
+        if choice[k] == classes:
+            # Every class has been tried at node k, so backtrack.
+            choice[k] = -1
+            k -= 1
+            continue
+
+        c = choice[k]
+
+        if automorphisms is not None:
+            if any(g[c] < c for g in stabilizers[k]):
+                continue
+            stabilizers[k+1] = [g for g in stabilizers[k] if g[c] == c]
+
+        back = predecessors[k][c]
+
+        state.labels[k] = absClasses[c]
+        state.backlinks[k] = back
+        encs[k+1] = encs[k] | (back << totalLinks(k))
+        links[k+1] = links[k] + bin(back).count('1')
+
+        if k+1 == length:
+            state.enc = encs[k+1]
+            state.links = links[k+1]
+            if automorphisms is not None:
+                state.orbit = len(automorphisms) // len(stabilizers[k+1])
+            yield state
+            continue
+
+        following = predecessors[k+1]
+        following[:] = predecessors[k]
+        for t in targets[c]:
+            following[t] |= 1 << k
+
+        k += 1
 
 def frequency(length, ontology, function=None, absClasses=None,
-              samples=None, random=False, seed=None):
+              samples=None, random=False, seed=None,
+              incremental=False, symmetry=False, store=None):
     """Finds the linkographs produced by the ontology.
 
     Finds the number of derived linkographs that map to the same value
@@ -201,6 +717,22 @@ def frequency(length, ontology, function=None, absClasses=None,
     random -- If False, then the labelings are considered according to
     an internal counter. If True, the labelings are randomly selected.
     seed -- seed for the interal random number generator.
+    incremental -- If True, every labeling is enumerated depth first
+    with labelingStates and the function is given the LabelingState
+    instead of the linkograph, see labelingStates. The default
+    function then gives the enumeration without building the
+    linkograph. The samples and random arguments cannot be used.
+    symmetry -- If True, only the canonical labeling of each orbit of
+    the classAutomorphisms is considered and its count is the size of
+    the orbit, see labelingStates. The counts are the same as for
+    every labeling when the function has the same value on the
+    labelings of an orbit, as functions of the links such as
+    linkoToEnum and graphEntropy do. The samples and random arguments
+    cannot be used.
+    store -- the store.ResultStore to look the result up in and to
+    store it in. None uses store.defaultStore and False uses no
+    store. Results are not stored for random labelings without a seed
+    or for functions that store.functionIdentity cannot identify.
 
     Returns:
 
@@ -210,6 +742,22 @@ def frequency(length, ontology, function=None, absClasses=None,
 
     """
 
+    if store is not False:
+        return _storedResult(
+            store, 'frequency', length, ontology, function, absClasses,
+            _runParameters(samples, random, seed, incremental, symmetry),
+            lambda: frequency(length, ontology, function, absClasses,
+                              samples, random, seed, incremental,
+                              symmetry, store=False))
+
+    if incremental or symmetry:
+        freq = {}
+        for (value, state) in _stateValues(length, ontology, function,
+                                           absClasses, samples, random,
+                                           incremental, symmetry):
+            freq[value] = freq.get(value, 0) + state.orbit
+        return freq
+
     # Set the default function.
     if function is None:
         function = lambda x : linkoToEnum(x)
@@ -271,6 +819,64 @@ def frequency(length, ontology, function=None, absClasses=None,
 
     return freq
 
+def _runParameters(samples=None, random=False, seed=None,
+                   incremental=False, symmetry=False):
+    """The parameters of a run that identify its stored result."""
+    return {'samples': samples, 'random': random, 'seed': seed,
+            'incremental': incremental, 'symmetry': symmetry}
+
+def _storedResult(store, kind, length, ontology, function, absClasses,
+                  parameters, compute):
+    """The stored result of a run, computing and storing it if needed."""
+
+    if store is None:
+        store = lstore.defaultStore
+
+    fields = None
+    if store and not (parameters['random']
+                      and parameters['seed'] is None):
+        fields = store.describe(kind, length, ontology, function,
+                                absClasses, **parameters)
+
+    if fields is None:
+        return compute()
+
+    result = store.get(fields)
+
+    if result is None:
+        result = compute()
+        if absClasses is None:
+            absClasses = [key for key in ontology.keys()]
+        store.put(fields, result, absClasses)
+
+    return result
+
+def _stateValues(length, ontology, function, absClasses, samples,
+                 random, incremental, symmetry):
+    """The function values of the labelingStates for frequency."""
+
+    if samples is not None or random:
+        raise ValueError('The incremental and symmetry enumerations'
+                         ' consider every labeling; samples and random'
+                         ' cannot be used.')
+
+    automorphisms = None
+    if symmetry:
+        automorphisms = classAutomorphisms(ontology, absClasses)
+
+    if not incremental:
+        # The function is given the linkograph.
+        if function is None:
+            function = linkoToEnum
+        linkoFunction = function
+        function = lambda state: linkoFunction(state.linkograph())
+    elif function is None:
+        function = LabelingState.enum
+
+    for state in labelingStates(length, ontology, absClasses,
+                                automorphisms):
+        yield function(state), state
+
 def subLinkographFrequency(linkos, size, overlap=True, function=None):
     """ Finds the frequency of linkographs that appear as sublinkographs.
 
@@ -343,7 +949,8 @@ def subLinkographFrequency(linkos, size, overlap=True, function=None):
 
 
 def histogram(length, ontology, function=None, absClasses=None,
-              samples=None, random=False, seed=None):
+              samples=None, random=False, seed=None,
+              incremental=False, symmetry=False, store=None):
     """Finds the linkographs produced by the ontology.
 
     Finds every derived linkograph on length nodes according to the
@@ -366,6 +973,12 @@ def histogram(length, ontology, function=None, absClasses=None,
     random -- If False, then the labelings are considered according to
     an internal counter. If True, the labelings are randomly selected.
     seed -- seed for the interal random number generator.
+    incremental -- If True, the labelings are enumerated depth first
+    and the function is given the LabelingState, as in frequency.
+    symmetry -- If True, the function is only applied to the canonical
+    labeling of each orbit, as in frequency, and every labeling of the
+    orbit is added for its value.
+    store -- the store.ResultStore to use, as in frequency.
 
     Returns:
 
@@ -375,6 +988,33 @@ def histogram(length, ontology, function=None, absClasses=None,
 
     """
 
+    if store is not False:
+        return _storedResult(
+            store, 'histogram', length, ontology, function, absClasses,
+            _runParameters(samples, random, seed, incremental, symmetry),
+            lambda: histogram(length, ontology, function, absClasses,
+                              samples, random, seed, incremental,
+                              symmetry, store=False))
+
+    if incremental or symmetry:
+        if absClasses is None:
+            absClasses = [key for key in ontology.keys()]
+
+        automorphisms = [tuple(range(len(absClasses)))]
+        if symmetry:
+            automorphisms = classAutomorphisms(ontology, absClasses)
+        index = {label: c for (c, label) in enumerate(absClasses)}
+
+        hist = {}
+        for (value, state) in _stateValues(length, ontology, function,
+                                           absClasses, samples, random,
+                                           incremental, symmetry):
+            classes = [index[label] for label in state.labels]
+            hist.setdefault(value, set()).update(
+                tuple(absClasses[g[c]] for c in classes)
+                for g in automorphisms)
+        return hist
+
     if function is None:
         function = linkoToEnum
 
@@ -428,6 +1068,348 @@ def histogram(length, ontology, function=None, absClasses=None,
 
     return hist
 
+def rangeCounts(length, ontology, start, stop, function=None,
+                absClasses=None, labelings=False):
+    """The frequency of the labelings with counts in [start, stop).
+
+    The labelings are those of the modularCounter used by frequency,
+    from the start-th through the (stop-1)-th, so the counts of
+    contiguous ranges that cover 0 through len(absClasses)**length
+    add up to the frequency. If labelings is True, the labelings for
+    each value are collected as in histogram instead of counted.
+
+    """
+
+    if function is None:
+        function = linkoToEnum
+
+    if absClasses is None:
+        absClasses = [key for key in ontology.keys()]
+
+    counter = modularCounter(length, len(absClasses))
+    counter.setCount(start)
+
+    counts = {}
+
+    for n in range(start, stop):
+        invLabeling = counter.toInverseLabeling(absClasses)
+        linko = linkoCreate.createLinko(invLabeling, ontology)
+        value = function(linko)
+
+        if labelings:
+            counts.setdefault(value, set()).add(
+                tuple(counter.toLabeling(absClasses)))
+        else:
+            counts[value] = counts.get(value, 0) + 1
+
+        counter.inc()
+
+    return counts
+
+def parallelFrequency(length, ontology, function=None, absClasses=None,
+                      workers=None, chunkSize=100000, checkpoint=None,
+                      checkpointInterval=60, store=None):
+    """Finds the frequency of every labeling in parallel.
+
+    Gives the same dictionary as frequency, with the keys in the same
+    order, for every labeling. The counter values 0 through
+    len(absClasses)**length-1 are split into contiguous chunks of
+    chunkSize labelings, which are counted by rangeCounts in a
+    multiprocessing pool of workers processes (in this process if
+    workers is None or 1). The chunk counts are merged in chunk
+    order, so the result does not depend on the workers. The
+    function must be picklable (for example, a module level function)
+    to use workers where processes are not forked.
+
+    If checkpoint is a file name, the counts of the finished chunks
+    are written to it at most every checkpointInterval seconds and
+    when the run ends. A run with the same checkpoint file reads it
+    and only counts the chunks that are missing, so an interrupted
+    run resumes where the last checkpoint left off. The function is
+    not stored in the checkpoint, so it must be the same for both
+    runs.
+
+    The result is shared with frequency through the store, see
+    frequency.
+
+    """
+
+    return _storedResult(
+        store, 'frequency', length, ontology, function, absClasses,
+        _runParameters(),
+        lambda: _parallelCounts(length, ontology, function, absClasses,
+                                workers, chunkSize, checkpoint,
+                                checkpointInterval, False))
+
+def parallelHistogram(length, ontology, function=None, absClasses=None,
+                      workers=None, chunkSize=100000, checkpoint=None,
+                      checkpointInterval=60, store=None):
+    """Finds the histogram of every labeling in parallel.
+
+    Gives the same dictionary as histogram. The arguments are the
+    same as for parallelFrequency.
+
+    """
+
+    return _storedResult(
+        store, 'histogram', length, ontology, function, absClasses,
+        _runParameters(),
+        lambda: _parallelCounts(length, ontology, function, absClasses,
+                                workers, chunkSize, checkpoint,
+                                checkpointInterval, True))
+
+def _parallelCounts(length, ontology, function, absClasses, workers,
+                    chunkSize, checkpoint, checkpointInterval,
+                    labelings):
+    """Counts the chunks for parallelFrequency and parallelHistogram."""
+
+    # The empty labeling has no nodes for createLinko.
+    if length == 0:
+        if labelings:
+            return histogram(length, ontology, function, absClasses,
+                             store=False)
+        return frequency(length, ontology, function, absClasses,
+                         store=False)
+
+    if absClasses is None:
+        absClasses = [key for key in ontology.keys()]
+
+    total = len(absClasses)**length
+    chunks = [(start, min(start + chunkSize, total))
+              for start in range(0, total, chunkSize)]
+
+    # Identifies the run a checkpoint belongs to.
+    run = (labelings, length, json.dumps(ontology, sort_keys=True),
+           list(absClasses), chunkSize)
+
+    done = {}
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint, 'rb') as checkpointFile:
+            stored = pickle.load(checkpointFile)
+        if stored['run'] != run:
+            raise ValueError('The checkpoint {} is for a different run.'
+                             .format(checkpoint))
+        done = stored['done']
+
+    pending = [index for index in range(len(chunks))
+               if index not in done]
+
+    settings = (length, ontology, function, absClasses, labelings)
+
+    lastWrite = time.monotonic()
+    written = len(done)
+
+    def record(index, counts):
+        nonlocal lastWrite, written
+        done[index] = counts
+        if (checkpoint is not None
+            and time.monotonic() - lastWrite >= checkpointInterval):
+            _writeCheckpoint(checkpoint, run, done)
+            lastWrite = time.monotonic()
+            written = len(done)
+
+    try:
+        if workers is None or workers <= 1:
+            for index in pending:
+                record(index, _countChunk(settings, chunks[index]))
+        else:
+            with multiprocessing.Pool(processes=workers,
+                                      initializer=_countInitialize,
+                                      initargs=(settings,)) as pool:
+                tasks = [(index, chunks[index]) for index in pending]
+                for (index, counts) in pool.imap_unordered(_countWorker,
+                                                           tasks):
+                    record(index, counts)
+    finally:
+        # Keep the finished chunks if the run is interrupted.
+        if checkpoint is not None and len(done) > written:
+            _writeCheckpoint(checkpoint, run, done)
+
+    # Merge in chunk order so that the keys are in the order the
+    # serial enumeration finds them.
+    result = {}
+    for index in range(len(chunks)):
+        for (value, count) in done[index].items():
+            if labelings:
+                result.setdefault(value, set()).update(count)
+            else:
+                result[value] = result.get(value, 0) + count
+
+    return result
+
+def _writeCheckpoint(checkpoint, run, done):
+    """Writes the finished chunks, replacing the file atomically."""
+
+    partial = checkpoint + '.partial'
+    with open(partial, 'wb') as checkpointFile:
+        pickle.dump({'run': run, 'done': done}, checkpointFile)
+    os.replace(partial, checkpoint)
+
+def _countChunk(settings, chunk):
+    """Counts one chunk of labelings."""
+    length, ontology, function, absClasses, labelings = settings
+    return rangeCounts(length, ontology, chunk[0], chunk[1], function,
+                       absClasses, labelings)
+
+# The settings of a worker process.
+_countState = {}
+
+def _countInitialize(settings):
+    """Records the settings in a worker."""
+    _countState['settings'] = settings
+
+def _countWorker(task):
+    """Counts a chunk in a worker."""
+    index, chunk = task
+    return index, _countChunk(_countState['settings'], chunk)
+
+# A frequency estimated from random labelings. frequency is the count
+# of each function value among the samples and intervals gives the
+# confidence interval for the fraction of the labelings with each
+# value. When every labeling was considered, the counts are exact and
+# the intervals have no width.
+FrequencyEstimate = namedtuple('FrequencyEstimate',
+                               ['frequency', 'intervals', 'confidence',
+                                'samples'])
+
+def labelingEnums(labelings, ontology, absClasses=None):
+    """The enumerations of the linkographs of a batch of labelings.
+
+    labelings -- a NumPy array with a row for each labeling whose
+    entry n is the index in absClasses of the label of node n.
+
+    Returns the list of the linkoToEnum of the linkographs createLinko
+    gives for the labelings. The possible links of every labeling are
+    looked up in the ontology at once and packed into the encs, so no
+    linkographs are built.
+
+    """
+
+    if absClasses is None:
+        absClasses = [key for key in ontology.keys()]
+
+    labelings = numpy.asarray(labelings, dtype=numpy.int64)
+    count, length = labelings.shape
+
+    if length == 0:
+        return [(0, 0)]*count
+
+    relation = numpy.array(_classRelation(ontology, absClasses),
+                           dtype=numpy.uint8).reshape(len(absClasses),
+                                                      len(absClasses))
+
+    # The possible links in the order of the bits of an enc.
+    tails, heads = _encLinks(numpy.arange(totalLinks(length)))
+
+    encBits = relation[labelings[:, tails], labelings[:, heads]]
+    packed = numpy.packbits(encBits, axis=1, bitorder='little')
+
+    return [(length, int.from_bytes(row.tobytes(), 'little'))
+            for row in packed]
+
+def labelingLinkographs(labelings, ontology, absClasses=None):
+    """The linkographs createLinko gives for a batch of labelings.
+
+    The labelings are as in labelingEnums.
+
+    """
+
+    if absClasses is None:
+        absClasses = [key for key in ontology.keys()]
+
+    labelings = numpy.asarray(labelings, dtype=numpy.int64)
+
+    linkos = enumsToLinkos(labelingEnums(labelings, ontology, absClasses))
+
+    return [_labelLinkograph(linko, [absClasses[c] for c in row],
+                             ontology)
+            for (linko, row) in zip(linkos, labelings.tolist())]
+
+def sampleFrequency(length, ontology, function=None, absClasses=None,
+                    precision=0.01, confidence=0.95, maxSamples=None,
+                    batchSize=1000, seed=None):
+    """Estimates frequency from random labelings.
+
+    Batches of batchSize labelings are drawn uniformly at random and
+    their linkographs are built together with labelingLinkographs, or
+    only their enumerations with labelingEnums when the function is
+    the default. Batches are drawn until the Wilson score interval for
+    the fraction of the labelings with each value, at the given
+    confidence, is within precision of the estimate, or maxSamples
+    labelings have been drawn. A value that has not been sampled has
+    the interval of a count of 0, so sampling also continues until
+    any value that was missed is that rare. If that would take at
+    least as many samples as there are labelings, the exact frequency
+    is calculated instead.
+
+    Returns a FrequencyEstimate.
+
+    """
+
+    if function is None:
+        function = linkoToEnum
+
+    if absClasses is None:
+        absClasses = [key for key in ontology.keys()]
+
+    total = len(absClasses)**length
+
+    generator = numpy.random.default_rng(seed)
+    z = NormalDist().inv_cdf(0.5 + confidence/2)
+
+    freq = {}
+    samples = 0
+
+    while True:
+        batch = batchSize
+        if maxSamples is not None:
+            batch = max(1, min(batch, maxSamples - samples))
+
+        if samples + batch >= total:
+            freq = frequency(length, ontology, function, absClasses)
+            return FrequencyEstimate(
+                freq,
+                {value: (count/total, count/total)
+                 for (value, count) in freq.items()},
+                confidence, total)
+
+        labelings = generator.integers(0, len(absClasses),
+                                       (batch, length))
+
+        if function is linkoToEnum:
+            values = labelingEnums(labelings, ontology, absClasses)
+        else:
+            values = [function(linko) for linko in
+                      labelingLinkographs(labelings, ontology,
+                                          absClasses)]
+
+        for value in values:
+            freq[value] = freq.get(value, 0) + 1
+        samples += batch
+
+        intervals = {value: _wilsonInterval(count, samples, z)
+                     for (value, count) in freq.items()}
+
+        widest = _wilsonInterval(0, samples, z)[1]
+        for (value, (low, high)) in intervals.items():
+            p = freq[value]/samples
+            widest = max(widest, p - low, high - p)
+
+        if widest <= precision or (maxSamples is not None and
+                                   samples >= maxSamples):
+            return FrequencyEstimate(freq, intervals, confidence,
+                                     samples)
+
+def _wilsonInterval(count, samples, z):
+    """The Wilson score interval for count successes in samples."""
+
+    p = count / samples
+    center = (p + z*z/(2*samples)) / (1 + z*z/samples)
+    spread = (z / (1 + z*z/samples)) * math.sqrt(
+        p*(1 - p)/samples + z*z/(4*samples*samples))
+
+    return max(0.0, center - spread), min(1.0, center + spread)
+
 
 class modularCounter(list):
     """ Uses a list of n elements and counts in modular arithmetic."""
@@ -491,6 +1473,17 @@ class modularCounter(list):
 
         return [absClass[n] for n in self]
 
+    def setCount(self, count):
+        """Sets the counter to the count-th value reached by inc.
+
+        The entry 0 is the least significant digit, so the counter is
+        set to the base mod digits of count.
+
+        """
+
+        for index in range(len(self)):
+            count, self[index] = divmod(count, self.mod)
+
     def randomize(self):
         """Randomize the modular count."""
         newState = [self._random.randrange(0, self.mod)
@@ -557,10 +1550,14 @@ def cli_enumOnt():
     """ Command line interface for enumOnt. """
     pass
 
+def shannonValue(linko):
+    """The graphEntropy of the linkograph as a string with 8 decimals."""
+    return '{0:10.8f}'.format(stats.graphEntropy(linko))
+
 # Defins a map of keywords to function for use in cli utitlities.
 def functionMap():
     functions={
-        'Shannon': lambda x: '{0:10.8f}'.format(stats.graphEntropy(x)),
+        'Shannon': shannonValue,
         'enum': linkoToEnum
     }
 
@@ -571,6 +1568,24 @@ def functionMap():
     return functions, functionHelp
 
 
+def _cliFunction(functions, choice, incremental):
+    """The function of functionMap to use for frequency or histogram.
+
+    For incremental runs the function is given the LabelingState, so
+    the enumeration is used directly and the other functions are
+    applied to the linkograph of the state.
+
+    """
+
+    if not incremental:
+        return functions[choice]
+
+    if choice == 'enum':
+        return None
+
+    function = functions[choice]
+    return lambda state: function(state.linkograph())
+
 def cli_frequency():
     """ Command line interface for frequency. """
 
@@ -599,6 +1614,27 @@ def cli_frequency():
     parser.add_argument('-j', '--json', action='store_true',
                         help=('Use json format.'))
 
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help=('Enumerate the labelings depth first.'))
+
+    parser.add_argument('-s', '--symmetry', action='store_true',
+                        help=('Only enumerate one labeling for each'
+                              ' orbit of the ontology automorphisms.'))
+
+    parser.add_argument('-w', '--workers', type=int,
+                        help=('Number of processes to use.'))
+
+    parser.add_argument('-c', '--checkpoint', metavar='FILE',
+                        help=('Checkpoint file for resuming the run.'))
+
+    parser.add_argument('-p', '--precision', type=float,
+                        help=('Sample random labelings until the'
+                              ' fraction of each value is known to'
+                              ' this precision.'))
+
+    parser.add_argument('-r', '--seed', type=int,
+                        help=('Seed for the random labelings.'))
+
     args = parser.parse_args()
 
     if args.function is not None:
@@ -606,13 +1642,40 @@ def cli_frequency():
     else:
         choice = 'enum'
 
+    if ((args.incremental or args.symmetry)
+        and (args.workers is not None or args.checkpoint is not None)):
+        parser.error('--incremental and --symmetry cannot be used with'
+                     ' --workers or --checkpoint')
+
+    if args.precision is not None and (
+            args.incremental or args.symmetry
+            or args.workers is not None or args.checkpoint is not None):
+        parser.error('--precision cannot be used with the other'
+                     ' enumeration options')
+
+    function = _cliFunction(functions, choice, args.incremental)
+
     # Read in the ontology.
     ont = None
     with open(args.ontology[0], 'r') as ontFile:
         ont = json.load(ontFile)
 
     if ont is not None:
-        freq = frequency(args.length[0], ont, functions[choice], args.abstraction)
+        if args.precision is not None:
+            estimate = sampleFrequency(args.length[0], ont, function,
+                                       args.abstraction, args.precision,
+                                       seed=args.seed)
+            freq = estimate.frequency
+            print('{} samples'.format(estimate.samples), file=sys.stderr)
+        elif args.workers is not None or args.checkpoint is not None:
+            freq = parallelFrequency(args.length[0], ont, function,
+                                     args.abstraction, args.workers,
+                                     checkpoint=args.checkpoint)
+        else:
+            freq = frequency(args.length[0], ont, function,
+                             args.abstraction,
+                             incremental=args.incremental,
+                             symmetry=args.symmetry)
     else:
         return
 
@@ -700,6 +1763,19 @@ def cli_histogram():
     parser.add_argument('-j', '--json', action='store_true',
                         help=('Use json format.'))
 
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help=('Enumerate the labelings depth first.'))
+
+    parser.add_argument('-s', '--symmetry', action='store_true',
+                        help=('Only enumerate one labeling for each'
+                              ' orbit of the ontology automorphisms.'))
+
+    parser.add_argument('-w', '--workers', type=int,
+                        help=('Number of processes to use.'))
+
+    parser.add_argument('-c', '--checkpoint', metavar='FILE',
+                        help=('Checkpoint file for resuming the run.'))
+
     args = parser.parse_args()
 
     if args.function is not None:
@@ -707,15 +1783,29 @@ def cli_histogram():
     else:
         choice = 'enum'
 
+    if ((args.incremental or args.symmetry)
+        and (args.workers is not None or args.checkpoint is not None)):
+        parser.error('--incremental and --symmetry cannot be used with'
+                     ' --workers or --checkpoint')
+
+    function = _cliFunction(functions, choice, args.incremental)
+
     # Read in the ontology.
     ont = None
     with open(args.ontology[0], 'r') as ontFile:
         ont = json.load(ontFile)
 
     if ont is not None:
-        hist = histogram(args.length[0], ont,
-                         functions[choice],
-                         args.abstraction)
+        if args.workers is not None or args.checkpoint is not None:
+            hist = parallelHistogram(args.length[0], ont, function,
+                                     args.abstraction, args.workers,
+                                     checkpoint=args.checkpoint)
+        else:
+            hist = histogram(args.length[0], ont,
+                             function,
+                             args.abstraction,
+                             incremental=args.incremental,
+                             symmetry=args.symmetry)
     else:
         return
 
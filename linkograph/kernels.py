@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+
+"""Optional compiled kernels for the hot loops of the package.
+
+The loops in linkoCreate.createLinko, stats.applySliceFunction,
+stats.tComplexity and enumeration.enumToLinko work on Python sets and
+integers one element at a time. The kernels in this module are the
+same loops written over NumPy integer arrays so that they can be
+compiled with Numba. If Numba is installed, the kernels are compiled
+when first used and the functions above use them. Otherwise, or if
+the environment variable LINKOGRAPH_KERNELS is set to 0, accelerated
+is False and those functions run their original Python code, so
+nothing changes for users without Numba.
+
+The kernels are plain Python when they are not compiled, which is how
+the tests check them. The function selfCheck compares the kernels
+against the reference implementations on random linkographs.
+
+"""
+
+import argparse  # For command line parsing.
+import os
+import random
+import numpy
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# True if the kernels are compiled and should be used.
+accelerated = (numba is not None
+               and os.environ.get('LINKOGRAPH_KERNELS', '1') != '0')
+
+def jit(function):
+    """Compile the function with Numba when the kernels are in use."""
+
+    if accelerated:
+        return numba.njit(cache=True)(function)
+
+    return function
+
+# The most labels that fit in the label masks of ontologyLinks.
+maxMaskLabels = 63
+
+@jit
+def ontologyLinks(labelMasks, targetMasks):
+    """The links created by an ontology.
+
+    inputs:
+
+    labelMasks -- an integer for each node with bit k set if the node
+    has label k.
+
+    targetMasks -- an integer for each node with bit k set if the
+    ontology links one of the labels of the node to label k.
+
+    output:
+
+    (tails, heads) -- the links (tails[i], heads[i]) sorted by tail and
+    then by head.
+
+    """
+
+    n = labelMasks.shape[0]
+
+    # Count the links and then fill them in.
+    count = 0
+    for i in range(n):
+        target = targetMasks[i]
+        if target == 0:
+            continue
+        for j in range(i+1, n):
+            if target & labelMasks[j] != 0:
+                count += 1
+
+    tails = numpy.empty(count, numpy.int64)
+    heads = numpy.empty(count, numpy.int64)
+
+    k = 0
+    for i in range(n):
+        target = targetMasks[i]
+        if target == 0:
+            continue
+        for j in range(i+1, n):
+            if target & labelMasks[j] != 0:
+                tails[k] = i
+                heads[k] = j
+                k += 1
+
+    return tails, heads
+
+@jit
+def sliceCounts(tails, heads, lowerBound, upperBound, minIndices,
+                maxIndices, backlinks, forelinks):
+    """The linkCount of each node for a slice function.
+
+    The links are (tails[i], heads[i]). For each node c in
+    [lowerBound, upperBound], the links of c to the nodes in
+    [minIndices[c-lowerBound], maxIndices[c-lowerBound]] are counted,
+    backlinks if backlinks is True and forelinks if forelinks is True.
+
+    """
+
+    counts = numpy.zeros(upperBound - lowerBound + 1, numpy.int64)
+
+    for k in range(tails.shape[0]):
+        tail = tails[k]
+        head = heads[k]
+        if (forelinks and lowerBound <= tail <= upperBound
+            and head <= maxIndices[tail - lowerBound]):
+            counts[tail - lowerBound] += 1
+        if (backlinks and lowerBound <= head <= upperBound
+            and tail >= minIndices[head - lowerBound]):
+            counts[head - lowerBound] += 1
+
+    return counts
+
+@jit
+def _sameWord(symbols, start_0, end_0, start_1, end_1):
+    """Tests if two code words, given as ranges of symbols, are equal."""
+
+    if end_0 - start_0 != end_1 - start_1:
+        return False
+
+    for k in range(end_0 - start_0):
+        if symbols[start_0 + k] != symbols[start_1 + k]:
+            return False
+
+    return True
+
+@jit
+def tCodeMultiplicities(symbols):
+    """The multiplicities of the T decomposition of a string.
+
+    Gives the same multiplicities as stats.tComplexityRecurse for the
+    string whose symbols are the integers in symbols. The code words
+    are kept as ranges [starts[k], ends[k]) of the string since each
+    is a run of consecutive symbols.
+
+    """
+
+    m = symbols.shape[0]
+
+    starts = numpy.arange(m)
+    ends = starts + 1
+
+    multiplicities = numpy.empty(max(m-1, 0), numpy.int64)
+    found = 0
+
+    while m > 1:
+        # The penultimate code word and its consecutive multiplicity.
+        nextStart = starts[m-2]
+        nextEnd = ends[m-2]
+
+        count = 1
+        k = m - 3
+        while k >= 0 and _sameWord(symbols, starts[k], ends[k],
+                                   nextStart, nextEnd):
+            count += 1
+            k -= 1
+
+        multiplicities[found] = count
+        found += 1
+
+        # Join each run of up to count copies of the code word with
+        # the word that follows it. A run at the end of the string
+        # with no following word is dropped.
+        newM = 0
+        accStart = -1
+        cc = 0
+        for k in range(m):
+            if accStart < 0:
+                accStart = starts[k]
+            if (cc < count and _sameWord(symbols, starts[k], ends[k],
+                                         nextStart, nextEnd)):
+                cc += 1
+            else:
+                starts[newM] = accStart
+                ends[newM] = ends[k]
+                newM += 1
+                accStart = -1
+                cc = 0
+
+        m = newM
+
+    return multiplicities[:found]
+
+@jit
+def enumLinks(positions):
+    """The links of the bits of a linkograph enumeration.
+
+    The bit p of an enumeration is the link (b,f) with p = b +
+    totalLinks(f), see the enumeration module. Given the positions of
+    the set bits in increasing order, the tails b and the heads f are
+    returned.
+
+    """
+
+    tails = numpy.empty(positions.shape[0], numpy.int64)
+    heads = numpy.empty(positions.shape[0], numpy.int64)
+
+    # The first bit of the backlinks of node.
+    node = 1
+    base = 0
+
+    for k in range(positions.shape[0]):
+        p = positions[k]
+        while p >= base + node:
+            base += node
+            node += 1
+        tails[k] = p - base
+        heads[k] = node
+
+    return tails, heads
+
+def labelMasks(inverseLabeling, ontology, size):
+    """The arguments of ontologyLinks for createLinko.
+
+    Returns None if there are too many labels for the masks, or if
+    the nodes of a label are not in increasing order (createLinko
+    stops at the first initial node that is not before the terminal
+    node).
+
+    """
+
+    present = sorted(inverseLabeling)
+
+    if len(present) > maxMaskLabels:
+        return None
+
+    for nodes in inverseLabeling.values():
+        if any(a > b for (a, b) in zip(nodes, nodes[1:])):
+            return None
+
+    bits = {label: 1 << k for (k, label) in enumerate(present)}
+
+    labelMask = numpy.zeros(size, numpy.int64)
+    targetMask = numpy.zeros(size, numpy.int64)
+
+    for label in present:
+        targets = 0
+        for terminal in ontology.get(label, []):
+            targets |= bits.get(terminal, 0)
+        for n in inverseLabeling[label]:
+            labelMask[n] |= bits[label]
+            targetMask[n] |= targets
+
+    return labelMask, targetMask
+
+def enumPositions(enc):
+    """The positions of the set bits of an integer as a NumPy array."""
+
+    if enc == 0:
+        return numpy.zeros(0, numpy.int64)
+
+    data = numpy.frombuffer(enc.to_bytes((enc.bit_length()+7)//8,
+                                         'little'), numpy.uint8)
+
+    return numpy.flatnonzero(numpy.unpackbits(data, bitorder='little'))
+
+def selfCheck(trials=200, seed=0):
+    """Compare the kernels with the reference implementations.
+
+    Random labelings and linkographs are run through each kernel and
+    through the original Python code. The reference implementations
+    are run with accelerated set to False, so that they do not call
+    the kernels under test. Returns a list of descriptions of the
+    mismatches, which is empty if the kernels are correct.
+
+    """
+
+    global accelerated
+
+    saved = accelerated
+    accelerated = False
+
+    try:
+        return _compareKernels(trials, seed)
+    finally:
+        accelerated = saved
+
+def _compareKernels(trials, seed):
+    """The mismatches found by selfCheck."""
+
+    # The reference implementations are imported here since they use
+    # this module.
+    from linkograph import enumeration
+    from linkograph import linkoCreate
+    from linkograph import stats
+
+    generator = random.Random(seed)
+    failures = []
+
+    for trial in range(trials):
+        size = generator.randint(1, 12)
+
+        # ontologyLinks against the loops of createLinko.
+        labels = ['A', 'B', 'C', 'D']
+        inverseLabeling = {}
+        for n in range(size):
+            label = generator.choice(labels)
+            inverseLabeling.setdefault(label, []).append(n)
+        ontology = {label: [target for target in labels
+                            if generator.random() < 0.5]
+                    for label in labels if generator.random() < 0.8}
+
+        expected = linkoCreate.createLinko(inverseLabeling, ontology)
+        masks = labelMasks(inverseLabeling, ontology, size)
+        tails, heads = ontologyLinks(*masks)
+        if ((tails.tolist(), heads.tolist())
+            != tuple(a.tolist() for a in stats.linkArrays(expected))):
+            failures.append('ontologyLinks: {} {}'
+                            .format(inverseLabeling, ontology))
+
+        # enumLinks against enumToLinko.
+        enc = generator.randrange(stats.totalLinkographs(size))
+        linko = enumeration.enumToLinko((size, enc))
+        tails, heads = enumLinks(enumPositions(enc))
+        expected = stats.linkArrays(linko)
+        order = numpy.lexsort((heads, tails))
+        if ((tails[order].tolist(), heads[order].tolist())
+            != (expected[0].tolist(), expected[1].tolist())):
+            failures.append('enumLinks: {}'.format((size, enc)))
+
+        # sliceCounts against linkCount.
+        listNumber = generator.choice([[1], [2], [1,2]])
+        delta = generator.randint(1, size)
+        restrict = generator.random() < 0.5
+        lowerBound = generator.randint(0, size-1)
+        upperBound = generator.randint(lowerBound, size-1)
+        bounds = [stats._sliceBounds(linko, c, delta, restrict,
+                                     lowerBound, upperBound)
+                  for c in range(lowerBound, upperBound+1)]
+        counts = sliceCounts(expected[0], expected[1], lowerBound,
+                             upperBound,
+                             numpy.array([b[0] for b in bounds]),
+                             numpy.array([b[1] for b in bounds]),
+                             1 in listNumber, 2 in listNumber)
+        reference = [stats.linkCount(linko[c], listNumber, *b)
+                     for (c, b) in zip(range(lowerBound, upperBound+1),
+                                       bounds)]
+        if counts.tolist() != reference:
+            failures.append('sliceCounts: {} {}'.format(
+                (size, enc), (listNumber, delta, restrict, lowerBound,
+                              upperBound)))
+
+        # tCodeMultiplicities against tComplexityRecurse.
+        string = [generator.randint(0, 1)
+                  for _ in range(generator.randint(0, 40))]
+        reference = [m for (cw, m) in stats.tComplexityRecurse(
+            [[e] for e in string], [])]
+        if (tCodeMultiplicities(numpy.array(string, numpy.int64))
+            .tolist() != reference):
+            failures.append('tCodeMultiplicities: {}'.format(string))
+
+    return failures
+
+######################################################################
+#----------------------- Command Line Programs -----------------------
+
+def cli_selfCheck():
+    """Command line interface for selfCheck."""
+
+    info = 'Checks the kernels against the reference implementations.'
+
+    parser = argparse.ArgumentParser(description=info)
+
+    parser.add_argument('-t', '--trials', type=int, default=200,
+                        help='The number of random trials.')
+
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Seed for the random trials.')
+
+    args = parser.parse_args()
+
+    print('Accelerated: {}'.format(accelerated))
+
+    failures = selfCheck(args.trials, args.seed)
+
+    for failure in failures:
+        print(failure)
+
+    print('{} failures'.format(len(failures)))
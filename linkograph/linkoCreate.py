@@ -5,6 +5,7 @@
 import json  # For handling files in the json format.
 import csv  # For parsing csv style files.
 import argparse  # For command line parsing.
+from linkograph import kernels # For the compiled link loop.
 
 class Linkograph(list):
 
@@ -197,6 +198,18 @@ def createLinko(inverseLabeling, ontology):
     if not ontology or not len(inverseLabeling):
         return linko
 
+    # Use the compiled kernel for the loops below if it is available.
+    masks = None
+    if kernels.accelerated:
+        masks = kernels.labelMasks(inverseLabeling, ontology, size)
+
+    if masks is not None:
+        tails, heads = kernels.ontologyLinks(*masks)
+        for (inIndex, teIndex) in zip(tails.tolist(), heads.tolist()):
+            linko[inIndex][2].add(teIndex)
+            linko[teIndex][1].add(inIndex)
+        return linko
+
     # Loop through each edge in the rules.
     for initialLabel in ontology:
         # Get the index list for the initial label.
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+
+"""Multi-resolution link counts for zoomable linkograph analysis.
+
+A density pyramid stores, for block sizes b = 1, 2, 4, ... up to the
+number of nodes, the matrix whose (I, J) entry is the number of links
+from a node in block I (the nodes I*b through (I+1)*b-1) to a node in
+block J. The coarse levels answer link density questions about long
+ranges of nodes, and heat maps at any zoom level, without touching
+every link. Levels with more than maxBlocks blocks per side are not
+stored; they are derived from the link arrays when needed.
+
+A pyramid can be written next to the linkograph json file so that it
+is only built once per file, see pyramidForFile.
+
+"""
+
+import argparse  # For command line parsing.
+import os
+import numpy
+from linkograph import linkoCreate # For reading linkographs.
+from linkograph import stats # For the link arrays.
+
+class DensityPyramid():
+
+    """Block link counts of a linkograph at power of two block sizes."""
+
+    def __init__(self, linkograph=None, maxBlocks=1024, arrays=None):
+        """Build the pyramid for a linkograph.
+
+        inputs:
+
+        linkograph -- the linkograph.
+
+        maxBlocks -- the most blocks per side for a level to be
+        stored. The memory used by a level is about 8*blocks**2
+        bytes.
+
+        arrays -- the dictionary of arrays written by writePyramid. If
+        given, the pyramid is restored from it instead of being built
+        from the linkograph.
+
+        """
+
+        if arrays is None:
+            arrays = _buildArrays(linkograph, maxBlocks)
+
+        self.size = int(arrays['size'])
+        self.maxBlocks = int(arrays['maxBlocks'])
+        self.fingerprint = str(arrays['fingerprint'])
+
+        # The links sorted by tail and, separately, by head.
+        self.tails = arrays['tails']
+        self.heads = arrays['heads']
+        order = numpy.argsort(self.heads, kind='stable')
+        self._headsByHead = self.heads[order]
+        self._tailsByHead = self.tails[order]
+
+        # The block sizes of every level, and the stored levels.
+        self.blockSizes = [int(b) for b in arrays['blockSizes']]
+        self.levels = {int(key.split('_')[1]): arrays[key]
+                       for key in arrays if key.startswith('level_')}
+
+        # The two dimensional prefix sums of the finest stored level
+        # used to count the links in a range.
+        self._finest = min(self.levels) if self.levels else None
+        if self._finest is not None:
+            counts = self.levels[self._finest]
+            self._prefix = numpy.zeros((counts.shape[0]+1,
+                                        counts.shape[1]+1),
+                                       dtype=numpy.int64)
+            self._prefix[1:, 1:] = counts.cumsum(axis=0).cumsum(axis=1)
+
+    def links(self, lowerBound=None, upperBound=None):
+        """The number of links in [lowerBound, upperBound].
+
+        Gives the same value as stats.links. The blocks of the finest
+        stored level that lie inside the range are counted from its
+        prefix sums, and only the links that start or end in the
+        partial blocks at either end of the range are looked at.
+
+        """
+
+        lowerBound, upperBound = _bounds(self.size, lowerBound,
+                                         upperBound)
+
+        if lowerBound > upperBound:
+            return 0
+
+        b = self._finest
+
+        if b is not None:
+            # The blocks that are completely inside the range.
+            first = -(-lowerBound // b)
+            last = (upperBound + 1) // b
+        else:
+            first = last = 0
+
+        if last <= first:
+            return self._countTails(lowerBound, upperBound + 1,
+                                    upperBound)
+
+        P = self._prefix
+        inner = int(P[last, last] - P[first, last]
+                    - P[last, first] + P[first, first])
+
+        # Links starting before the first whole block.
+        lowFringe = self._countTails(lowerBound, first*b, upperBound)
+
+        # Links starting in a whole block and ending after the last
+        # whole block.
+        start = numpy.searchsorted(self._headsByHead, last*b)
+        stop = numpy.searchsorted(self._headsByHead, upperBound,
+                                  side='right')
+        highFringe = int(numpy.count_nonzero(
+            self._tailsByHead[start:stop] >= first*b))
+
+        return inner + lowFringe + highFringe
+
+    def _countTails(self, start, stop, upperBound):
+        """Counts links with tail in [start, stop) and head <= upperBound."""
+        begin = numpy.searchsorted(self.tails, start)
+        end = numpy.searchsorted(self.tails, stop)
+        return int(numpy.count_nonzero(self.heads[begin:end] <=
+                                       upperBound))
+
+    def density(self, lowerBound=None, upperBound=None):
+        """The percentage of links in [lowerBound, upperBound].
+
+        Gives the same value as stats.percentageOfLinks.
+
+        """
+
+        lowerBound, upperBound = _bounds(self.size, lowerBound,
+                                         upperBound)
+
+        possibleLinks = stats.totalLinks(upperBound - lowerBound + 1)
+
+        if possibleLinks <= 0:
+            return None
+
+        return float(self.links(lowerBound, upperBound)) / possibleLinks
+
+    def blockCounts(self, blockSize, lowerBound=None, upperBound=None):
+        """The block link count matrix at a block size.
+
+        Returns the counts for the blocks lowerBound//blockSize
+        through upperBound//blockSize. The blocks are whole blocks of
+        the level, so the blocks at the ends of the range may include
+        nodes outside of it. The block size must be one of
+        blockSizes.
+
+        """
+
+        if blockSize not in self.blockSizes:
+            raise ValueError('No level with block size {}'
+                             .format(blockSize))
+
+        lowerBound, upperBound = _bounds(self.size, lowerBound,
+                                         upperBound)
+
+        if lowerBound > upperBound:
+            return numpy.zeros((0, 0), dtype=numpy.int64)
+
+        first = lowerBound // blockSize
+        last = upperBound // blockSize + 1
+
+        counts = self.levels.get(blockSize)
+        if counts is not None:
+            return counts[first:last, first:last]
+
+        # The level is not stored, so count the links of the blocks.
+        begin = numpy.searchsorted(self.tails, first*blockSize)
+        end = numpy.searchsorted(self.tails, last*blockSize)
+        tails = self.tails[begin:end] // blockSize - first
+        heads = self.heads[begin:end] // blockSize - first
+        inside = heads < last - first
+
+        counts = numpy.zeros((last-first, last-first), dtype=numpy.int64)
+        numpy.add.at(counts, (tails[inside], heads[inside]), 1)
+
+        return counts
+
+    def heatmap(self, blockSize, lowerBound=None, upperBound=None):
+        """The link density of each pair of blocks at a block size.
+
+        The (I, J) entry is the number of links from block I to block
+        J divided by the number of possible links between them, for
+        the blocks given by blockCounts. Pairs of blocks with no
+        possible links, those with I > J, are NaN.
+
+        """
+
+        counts = self.blockCounts(blockSize, lowerBound, upperBound)
+
+        if counts.size == 0:
+            return counts.astype(float)
+
+        lowerBound, _ = _bounds(self.size, lowerBound, upperBound)
+        first = lowerBound // blockSize
+
+        # The number of nodes in each block; the last block of the
+        # linkograph may be partial.
+        starts = (first + numpy.arange(counts.shape[0])) * blockSize
+        sizes = numpy.minimum(blockSize, self.size - starts)
+
+        possible = numpy.outer(sizes, sizes).astype(float)
+        possible[numpy.tril_indices(len(sizes), -1)] = 0
+        possible[numpy.diag_indices(len(sizes))] = sizes*(sizes-1)/2
+
+        result = numpy.full(counts.shape, numpy.nan)
+        numpy.divide(counts, possible, out=result, where=possible > 0)
+
+        return result
+
+def _bounds(size, lowerBound, upperBound):
+    """The defaults of stats.boundDefaults for a number of nodes."""
+
+    lowerBound = 0 if lowerBound is None else max(0, lowerBound)
+    upperBound = size-1 if upperBound is None else min(size-1,
+                                                       upperBound)
+
+    return lowerBound, upperBound
+
+def _buildArrays(linkograph, maxBlocks):
+    """Computes the arrays that make up a pyramid."""
+
+    size = len(linkograph)
+
+    tails, heads = stats.linkArrays(linkograph)
+
+    # The block sizes 1, 2, 4, ... up to the first that covers every
+    # node with a single block.
+    blockSizes = []
+    b = 1
+    while size > 0:
+        blockSizes.append(b)
+        if b >= size:
+            break
+        b *= 2
+
+    stored = [b for b in blockSizes if -(-size // b) <= maxBlocks]
+
+    arrays = {'size': size,
+              'maxBlocks': maxBlocks,
+              'fingerprint': stats.linkoFingerprint(linkograph),
+              'tails': tails,
+              'heads': heads,
+              'blockSizes': numpy.array(blockSizes, dtype=numpy.int64)}
+
+    if not stored:
+        return arrays
+
+    # Count the finest stored level from the links and then sum pairs
+    # of rows and columns for each coarser level.
+    b = stored[0]
+    blocks = -(-size // b)
+    counts = numpy.zeros((blocks, blocks), dtype=numpy.int64)
+    numpy.add.at(counts, (tails // b, heads // b), 1)
+    arrays['level_{}'.format(b)] = counts
+
+    for b in stored[1:]:
+        if counts.shape[0] % 2 == 1:
+            counts = numpy.pad(counts, ((0, 1), (0, 1)))
+        counts = (counts[0::2, 0::2] + counts[0::2, 1::2]
+                  + counts[1::2, 0::2] + counts[1::2, 1::2])
+        arrays['level_{}'.format(b)] = counts
+
+    return arrays
+
+def writePyramid(pyramid, file):
+    """Write the pyramid to a NumPy .npz file."""
+
+    arrays = {'size': pyramid.size,
+              'maxBlocks': pyramid.maxBlocks,
+              'fingerprint': pyramid.fingerprint,
+              'tails': pyramid.tails,
+              'heads': pyramid.heads,
+              'blockSizes': numpy.array(pyramid.blockSizes,
+                                        dtype=numpy.int64)}
+
+    for b, counts in pyramid.levels.items():
+        arrays['level_{}'.format(b)] = counts
+
+    with open(file, 'wb') as pyramidFile:
+        numpy.savez_compressed(pyramidFile, **arrays)
+
+def readPyramid(file):
+    """Read a pyramid from a file written by writePyramid."""
+
+    with numpy.load(file) as arrays:
+        return DensityPyramid(arrays={key: arrays[key]
+                                      for key in arrays.files})
+
+def pyramidFileName(linkoFile):
+    """The file that holds the pyramid for a linkograph json file."""
+    return os.path.splitext(linkoFile)[0] + '.pyramid.npz'
+
+def pyramidForFile(linkoFile, linkograph=None, maxBlocks=1024):
+    """Gives the pyramid for a linkograph json file.
+
+    The pyramid is read from pyramidFileName(linkoFile) if that file
+    exists and was built for the same linkograph. Otherwise, the
+    pyramid is built and written to that file.
+
+    inputs:
+
+    linkoFile -- the linkograph json file.
+
+    linkograph -- the linkograph in the file, if it has already been
+    read.
+
+    maxBlocks -- see DensityPyramid.
+
+    """
+
+    if linkograph is None:
+        linkograph = linkoCreate.readLinkoJson(linkoFile)
+
+    file = pyramidFileName(linkoFile)
+
+    if os.path.exists(file):
+        pyramid = readPyramid(file)
+        if (pyramid.fingerprint == stats.linkoFingerprint(linkograph)
+            and pyramid.maxBlocks == maxBlocks):
+            return pyramid
+
+    pyramid = DensityPyramid(linkograph, maxBlocks)
+    writePyramid(pyramid, file)
+
+    return pyramid
+
+######################################################################
+#----------------------- Command Line Programs -----------------------
+
+def cli_pyramid():
+    """Command line interface for building a density pyramid."""
+
+    info = ('Builds the density pyramid for a linkograph and writes it'
+            ' next to the linkograph file.')
+
+    parser = argparse.ArgumentParser(description=info)
+    parser.add_argument('linkograph', metavar='LINKOGRAPH.json',
+                        nargs=1,
+                        help='The linkograph.')
+
+    parser.add_argument('-b', '--maxBlocks', type=int, default=1024,
+                        help='The most blocks per side of a stored level.')
+
+    args = parser.parse_args()
+
+    pyramid = pyramidForFile(args.linkograph[0],
+                             maxBlocks=args.maxBlocks)
+
+    print('Wrote {} (stored block sizes {})'.format(
+        pyramidFileName(args.linkograph[0]), sorted(pyramid.levels)))
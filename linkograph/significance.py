@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+"""Permutation tests for the significance of linkograph metrics.
+
+To tell if a metric of a session is unusual, the labels of its nodes
+are shuffled and the metric is compared with its values on the
+shuffled sessions. The links of a shuffled session are determined by
+the labels and the ontology, so the shuffled linkographs do not need
+to be built with createLinko. The distinct label sets of the nodes are
+the types, and the ontology gives a matrix telling which types link
+to which. For a batch of permutations of the types, the number of
+earlier and later nodes of each type before and after every node are
+cumulative sums, and the backlinks and forelinks of every node follow
+from a product with the matrix. The metrics are computed from these
+degrees.
+
+The metrics available are in nullMetrics. Each takes the forelink and
+backlink counts of a batch of sessions, as arrays with a row for each
+session, and returns an array with the value for each session.
+
+"""
+
+import argparse  # For command line parsing.
+import json
+import multiprocessing # For parallel permutations.
+from collections import namedtuple
+import numpy
+from linkograph import linkoCreate # For reading linkographs.
+from linkograph import stats # For totalLinks.
+
+# The result of a permutation test for one metric.
+Significance = namedtuple('Significance', ['observed', 'mean', 'std',
+                                           'zScore', 'pValue'])
+
+def _entropy(links, totals):
+    """The shannonEntropy of arrays of link counts and totals."""
+
+    links = numpy.asarray(links, dtype=float)
+    totals = numpy.broadcast_to(numpy.asarray(totals, dtype=float),
+                                links.shape)
+
+    result = numpy.zeros(links.shape)
+
+    mixed = (links > 0) & (links < totals)
+    p = links[mixed] / totals[mixed]
+    result[mixed] = -p*numpy.log2(p) - (1-p)*numpy.log2(1-p)
+
+    return result
+
+def _links(foreDegree, backDegree):
+    """The number of links of each session."""
+    return foreDegree.sum(axis=1)
+
+def _percentageOfLinks(foreDegree, backDegree):
+    """The percentageOfLinks of each session."""
+    return _links(foreDegree, backDegree) / stats.totalLinks(
+        foreDegree.shape[1])
+
+def _graphEntropy(foreDegree, backDegree):
+    """The graphEntropy of each session."""
+    return _entropy(_links(foreDegree, backDegree),
+                    stats.totalLinks(foreDegree.shape[1]))
+
+def _meanLinkEntropy(foreDegree, backDegree):
+    """The mean of linkEntropy over the nodes of each session."""
+    return _entropy(foreDegree + backDegree,
+                    foreDegree.shape[1] - 1).mean(axis=1)
+
+def _criticalNodeCount(foreDegree, backDegree):
+    """The critical_node_count of featureVector for each session."""
+    return ((foreDegree + backDegree) > foreDegree.shape[1] / 2).sum(axis=1)
+
+# The metrics that can be tested, as functions of the forelink and
+# backlink counts.
+nullMetrics = {'links': _links,
+               'percentageOfLinks': _percentageOfLinks,
+               'graphEntropy': _graphEntropy,
+               'meanLinkEntropy': _meanLinkEntropy,
+               'criticalNodeCount': _criticalNodeCount}
+
+def labelTypes(linkograph, ontology):
+    """The label types of the nodes and the links between the types.
+
+    Returns (types, relation) where types[i] is the type of node i,
+    the index of its label set among the distinct label sets, and
+    relation[s, t] is 1 if a node of type s is linked to a later node
+    of type t, that is, if the ontology links one of the labels of s
+    to one of the labels of t.
+
+    """
+
+    labelSets = [frozenset(entry[0]) for entry in linkograph]
+
+    kinds = sorted(set(labelSets), key=lambda s: sorted(map(str, s)))
+    index = {kind: k for (k, kind) in enumerate(kinds)}
+
+    types = numpy.array([index[s] for s in labelSets], dtype=numpy.int64)
+
+    relation = numpy.array(
+        [[any(terminal in ontology.get(initial, [])
+              for initial in s for terminal in t)
+          for t in kinds]
+         for s in kinds], dtype=float).reshape(len(kinds), len(kinds))
+
+    return types, relation
+
+def typeDegrees(samples, relation):
+    """The forelink and backlink counts of sessions of types.
+
+    inputs:
+
+    samples -- an array with a row of node types for each session.
+
+    relation -- the type relation of labelTypes.
+
+    output:
+
+    (foreDegree, backDegree) -- arrays with the same shape as samples.
+
+    """
+
+    kinds = relation.shape[0]
+
+    onehot = numpy.eye(kinds)[samples]
+    through = numpy.cumsum(onehot, axis=1)
+
+    # The number of nodes of each type before and after each node.
+    before = through - onehot
+    after = through[:, -1:, :] - through
+
+    index = samples[..., None]
+    backDegree = numpy.take_along_axis(before @ relation, index, axis=2)
+    foreDegree = numpy.take_along_axis(after @ relation.T, index, axis=2)
+
+    return (foreDegree[..., 0].astype(numpy.int64),
+            backDegree[..., 0].astype(numpy.int64))
+
+def nullDistribution(linkograph, ontology, metrics=['graphEntropy'],
+                     permutations=1000, batchSize=None, seed=None,
+                     workers=None):
+    """The metrics of the linkograph and of label permutations.
+
+    inputs:
+
+    linkograph -- the linkograph. Its links are assumed to be those
+    createLinko gives for its labels and the ontology.
+
+    ontology -- the ontology.
+
+    metrics -- a list of names in nullMetrics or functions of the
+    forelink and backlink counts, see nullMetrics.
+
+    permutations -- the number of label permutations.
+
+    batchSize -- the number of permutations computed together. The
+    default keeps each batch to a few million numbers.
+
+    seed -- seed for the permutations. The results for a seed do not
+    depend on the number of workers.
+
+    workers -- the number of processes to use. With None or 1 the
+    permutations are computed in this process.
+
+    output:
+
+    (observed, null) -- dictionaries from the metrics to the value for
+    the linkograph and to a NumPy array of the values for the
+    permutations.
+
+    """
+
+    types, relation = labelTypes(linkograph, ontology)
+
+    functions = [nullMetrics.get(metric, metric) for metric in metrics]
+
+    observed = _batchMetrics(types[None, :], relation, functions)
+    observed = {metric: values[0].item()
+                for (metric, values) in zip(metrics, observed)}
+
+    if batchSize is None:
+        batchSize = max(1, 2**22 // max(1, len(types)*len(relation)))
+
+    # Each batch has its own seed so that the permutations do not
+    # depend on how the batches are spread over the workers.
+    sizes = [min(batchSize, permutations - start)
+             for start in range(0, permutations, batchSize)]
+    seeds = numpy.random.SeedSequence(seed).spawn(len(sizes))
+    batches = list(zip(sizes, seeds))
+
+    if workers is None or workers <= 1:
+        results = [_nullBatch(types, relation, functions, batch)
+                   for batch in batches]
+    else:
+        with multiprocessing.Pool(workers,
+                                  initializer=_nullInitialize,
+                                  initargs=(types, relation,
+                                            functions)) as pool:
+            results = pool.map(_nullWorker, batches)
+
+    null = {metric: (numpy.concatenate([result[k] for result in results])
+                     if results else numpy.array([]))
+            for (k, metric) in enumerate(metrics)}
+
+    return observed, null
+
+def permutationTest(linkograph, ontology, metrics=['graphEntropy'],
+                    permutations=1000, alternative='two-sided',
+                    batchSize=None, seed=None, workers=None):
+    """Tests the metrics of the linkograph against label permutations.
+
+    The alternative is 'greater', 'less' or 'two-sided'. For
+    'greater', the p-value is the fraction of the permutations, with
+    the linkograph itself counted as one, whose value is at least the
+    observed value; 'less' is similar, and 'two-sided' uses the
+    distance from the mean of the permutations. See nullDistribution
+    for the other arguments.
+
+    Returns a dictionary from each metric to a Significance. The
+    z-score is None if the values of the permutations are all equal.
+
+    """
+
+    observed, null = nullDistribution(linkograph, ontology, metrics,
+                                      permutations, batchSize, seed,
+                                      workers)
+
+    result = {}
+
+    for metric in metrics:
+        values = null[metric]
+        value = observed[metric]
+
+        if len(values) == 0:
+            result[metric] = Significance(value, None, None, None, None)
+            continue
+
+        mean = float(values.mean())
+        std = float(values.std())
+
+        if alternative == 'greater':
+            extreme = values >= value
+        elif alternative == 'less':
+            extreme = values <= value
+        elif alternative == 'two-sided':
+            extreme = numpy.abs(values - mean) >= abs(value - mean)
+        else:
+            raise ValueError('Unknown alternative {}'.format(alternative))
+
+        pValue = (1 + int(numpy.count_nonzero(extreme))) / (len(values) + 1)
+        zScore = (value - mean) / std if std > 0 else None
+
+        result[metric] = Significance(value, mean, std, zScore, pValue)
+
+    return result
+
+def _batchMetrics(samples, relation, functions):
+    """The metrics for a batch of sessions of types."""
+
+    foreDegree, backDegree = typeDegrees(samples, relation)
+
+    return [numpy.asarray(function(foreDegree, backDegree), dtype=float)
+            for function in functions]
+
+def _nullBatch(types, relation, functions, batch):
+    """The metrics for a batch of permutations of the types."""
+
+    size, seed = batch
+
+    generator = numpy.random.default_rng(seed)
+    samples = generator.permuted(numpy.tile(types, (size, 1)), axis=1)
+
+    return _batchMetrics(samples, relation, functions)
+
+# The types, relation and metrics of a worker process.
+_nullState = {}
+
+def _nullInitialize(types, relation, functions):
+    """Records the types, relation and metrics in a worker."""
+    _nullState['types'] = types
+    _nullState['relation'] = relation
+    _nullState['functions'] = functions
+
+def _nullWorker(batch):
+    """Computes a batch of permutations in a worker."""
+    return _nullBatch(_nullState['types'], _nullState['relation'],
+                      _nullState['functions'], batch)
+
+######################################################################
+#----------------------- Command Line Programs -----------------------
+
+def cli_permutationTest():
+    """Command line interface for permutationTest."""
+
+    info = ('Tests linkograph metrics against linkographs with shuffled'
+            ' labels.')
+
+    parser = argparse.ArgumentParser(description=info)
+    parser.add_argument('linkograph', metavar='LINKOGRAPH.json',
+                        nargs=1,
+                        help='The linkograph.')
+
+    parser.add_argument('ontology', metavar='ONTOLOGY.json',
+                        nargs=1,
+                        help='The ontology used for the linkograph.')
+
+    parser.add_argument('-m', '--metrics', nargs='+',
+                        default=['graphEntropy'],
+                        choices=sorted(nullMetrics),
+                        help='The metrics to test.')
+
+    parser.add_argument('-n', '--permutations', type=int, default=1000,
+                        help='The number of permutations.')
+
+    parser.add_argument('-a', '--alternative', default='two-sided',
+                        choices=['two-sided', 'greater', 'less'],
+                        help='The alternative hypothesis.')
+
+    parser.add_argument('-s', '--seed', type=int,
+                        help='Seed for the permutations.')
+
+    parser.add_argument('-w', '--workers', type=int,
+                        help='Number of processes to use.')
+
+    args = parser.parse_args()
+
+    linko = linkoCreate.readLinkoJson(args.linkograph[0])
+
+    with open(args.ontology[0], 'r') as ontFile:
+        ontology = json.load(ontFile)
+
+    result = permutationTest(linko, ontology, args.metrics,
+                             args.permutations, args.alternative,
+                             seed=args.seed, workers=args.workers)
+
+    print(json.dumps({metric: value._asdict()
+                      for (metric, value) in result.items()},
+                     indent=4))
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+
+"""Mergeable summaries of metric values over many linkographs.
+
+Studies such as the entropy distributions in markov/scripts collect
+the value of a metric for every linkograph of a corpus or of an
+enumeration. Keeping every value, or even a dictionary of the
+distinct values, does not scale to millions of linkographs. The
+sketches in this module summarize a stream of values in bounded
+memory:
+
+Histogram -- exact counts of the distinct values of a discrete metric,
+optionally rounded to a precision.
+
+QuantileSketch -- a t-digest style summary of a continuous metric
+that gives approximate quantiles and cumulative distribution values.
+Its size is bounded by the compression, independently of the number
+of values.
+
+Sketches of the same kind can be merged, so parallel workers can each
+summarize a part of the stream, and they can be written to and read
+from json files, see writeSketches and readSketches. The function
+sketchMetrics streams linkographs through a set of metrics, optionally
+in a process pool.
+
+"""
+
+import argparse  # For command line parsing.
+import json  # For reading and writing sketches.
+import math
+import multiprocessing
+from itertools import islice
+
+class Histogram():
+
+    """Exact counts of the values of a discrete metric."""
+
+    kind = 'histogram'
+
+    def __init__(self, precision=None):
+        """Create an empty histogram.
+
+        inputs:
+
+        precision -- if not None, the values are rounded to this many
+        digits before they are counted.
+
+        """
+
+        self.precision = precision
+        self.counts = {}
+
+    def empty(self):
+        """An empty histogram with the same precision."""
+        return Histogram(self.precision)
+
+    def add(self, value, count=1):
+        """Count a value."""
+
+        if self.precision is not None:
+            value = round(value, self.precision)
+
+        self.counts[value] = self.counts.get(value, 0) + count
+
+    def update(self, values):
+        """Count each of the values."""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Add the counts of another histogram to this one.
+
+        The histograms must have the same precision, since their
+        values are rounded differently otherwise.
+
+        """
+
+        if type(other) is not Histogram:
+            raise ValueError('Cannot merge a {} into a Histogram.'
+                             .format(type(other).__name__))
+
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge histograms with precisions'
+                             ' {} and {}.'.format(self.precision,
+                                                  other.precision))
+
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+
+        return self
+
+    @property
+    def count(self):
+        """The number of values counted."""
+        return sum(self.counts.values())
+
+    def mean(self):
+        """The mean of the values, or None if there are none."""
+
+        total = self.count
+
+        if total == 0:
+            return None
+
+        return sum(value*count
+                   for value, count in self.counts.items()) / total
+
+    def std(self):
+        """The standard deviation of the values."""
+
+        mean = self.mean()
+
+        if mean is None:
+            return None
+
+        total = self.count
+
+        return math.sqrt(sum((count/total) * (value - mean)**2
+                             for value, count in self.counts.items()))
+
+    def quantile(self, q):
+        """The smallest value with at least a fraction q of the values
+        at or below it."""
+
+        total = self.count
+
+        if total == 0:
+            return None
+
+        cumulative = 0
+        for value in sorted(self.counts):
+            cumulative += self.counts[value]
+            if cumulative >= q*total:
+                return value
+
+        return value
+
+    def cdf(self, x):
+        """The fraction of the values at or below x."""
+
+        total = self.count
+
+        if total == 0:
+            return None
+
+        return sum(count for value, count in self.counts.items()
+                   if value <= x) / total
+
+    def toDict(self):
+        """A json compatible representation of the histogram."""
+        return {'kind': self.kind,
+                'precision': self.precision,
+                'counts': sorted([value, count]
+                                 for value, count in self.counts.items())}
+
+    @classmethod
+    def fromDict(cls, data):
+        """Create a histogram from the result of toDict."""
+
+        histogram = cls(data['precision'])
+        histogram.counts = {value: count
+                            for value, count in data['counts']}
+
+        return histogram
+
+class QuantileSketch():
+
+    """A t-digest style summary of the values of a continuous metric.
+
+    The values are summarized by centroids, each a mean and a weight.
+    Centroids near the extreme quantiles are kept small so that the
+    tails of the distribution are accurate, and the number of
+    centroids is about the compression. The mean and standard
+    deviation are kept exactly.
+
+    """
+
+    kind = 'quantile'
+
+    def __init__(self, compression=100):
+        """Create an empty sketch.
+
+        inputs:
+
+        compression -- controls the number of centroids and so the
+        accuracy and size of the sketch.
+
+        """
+
+        self.compression = compression
+
+        # The centroids as sorted lists of means and weights, and the
+        # values added since the last compression.
+        self.means = []
+        self.weights = []
+        self._buffer = []
+
+        self.count = 0
+        self.minimum = None
+        self.maximum = None
+
+        # The running mean and sum of squared deviations.
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def empty(self):
+        """An empty sketch with the same compression."""
+        return QuantileSketch(self.compression)
+
+    def add(self, value, count=1):
+        """Add a value."""
+
+        self._buffer.append((value, count))
+        self._addMoments(count, value, 0.0)
+
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+        if len(self._buffer) >= 5*self.compression:
+            self._compress()
+
+    def update(self, values):
+        """Add each of the values."""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Add the values summarized by another sketch to this one."""
+
+        if type(other) is not QuantileSketch:
+            raise ValueError('Cannot merge a {} into a QuantileSketch.'
+                             .format(type(other).__name__))
+
+        if other.count == 0:
+            return self
+
+        other._compress()
+
+        self._buffer.extend(zip(other.means, other.weights))
+        self._addMoments(other.count, other._mean, other._m2)
+
+        if self.minimum is None or other.minimum < self.minimum:
+            self.minimum = other.minimum
+        if self.maximum is None or other.maximum > self.maximum:
+            self.maximum = other.maximum
+
+        self._compress()
+
+        return self
+
+    def _addMoments(self, count, mean, m2):
+        """Combine the running moments with those of count values."""
+
+        total = self.count + count
+        delta = mean - self._mean
+
+        self._mean += delta*count/total
+        self._m2 += m2 + delta*delta*self.count*count/total
+        self.count = total
+
+    def _scale(self, q):
+        """The t-digest scale function; a centroid spans at most one
+        unit of it."""
+        return (self.compression / (2*math.pi)) * math.asin(2*q - 1)
+
+    def _compress(self):
+        """Merge the buffered values into the centroids."""
+
+        if not self._buffer:
+            return
+
+        points = sorted(list(zip(self.means, self.weights))
+                        + self._buffer)
+        self._buffer = []
+
+        total = sum(weight for _, weight in points)
+
+        means = []
+        weights = []
+
+        currentMean, currentWeight = points[0]
+        before = 0
+        limit = self._scale(0) + 1
+
+        for mean, weight in points[1:]:
+            q = (before + currentWeight + weight) / total
+            if self._scale(min(q, 1.0)) <= limit:
+                # Fold the point into the current centroid.
+                currentWeight += weight
+                currentMean += (mean - currentMean)*weight/currentWeight
+            else:
+                means.append(currentMean)
+                weights.append(currentWeight)
+                before += currentWeight
+                limit = self._scale(before/total) + 1
+                currentMean, currentWeight = mean, weight
+
+        means.append(currentMean)
+        weights.append(currentWeight)
+
+        self.means = means
+        self.weights = weights
+
+    def mean(self):
+        """The mean of the values, or None if there are none."""
+        return self._mean if self.count else None
+
+    def std(self):
+        """The standard deviation of the values."""
+
+        if self.count == 0:
+            return None
+
+        return math.sqrt(max(self._m2, 0.0) / self.count)
+
+    def _centers(self):
+        """The positions of the values and the centroid means.
+
+        The position of a centroid is the number of values before its
+        center. The minimum and maximum values are included at the
+        positions 0 and count.
+
+        """
+
+        self._compress()
+
+        positions = [0.0]
+        values = [self.minimum]
+
+        before = 0
+        for mean, weight in zip(self.means, self.weights):
+            positions.append(before + weight/2)
+            values.append(mean)
+            before += weight
+
+        positions.append(float(self.count))
+        values.append(self.maximum)
+
+        return positions, values
+
+    def quantile(self, q):
+        """The approximate value with a fraction q of the values below
+        it."""
+
+        if self.count == 0:
+            return None
+
+        positions, values = self._centers()
+        target = min(max(q, 0.0), 1.0) * self.count
+
+        for i in range(1, len(positions)):
+            if target <= positions[i]:
+                width = positions[i] - positions[i-1]
+                if width <= 0:
+                    return values[i]
+                t = (target - positions[i-1]) / width
+                return values[i-1] + t*(values[i] - values[i-1])
+
+        return self.maximum
+
+    def cdf(self, x):
+        """The approximate fraction of the values at or below x."""
+
+        if self.count == 0:
+            return None
+
+        if x < self.minimum:
+            return 0.0
+        if x >= self.maximum:
+            return 1.0
+
+        positions, values = self._centers()
+
+        for i in range(1, len(values)):
+            if x < values[i]:
+                width = values[i] - values[i-1]
+                t = (x - values[i-1]) / width if width > 0 else 1.0
+                position = positions[i-1] + t*(positions[i]
+                                               - positions[i-1])
+                return position / self.count
+
+        return 1.0
+
+    def toDict(self):
+        """A json compatible representation of the sketch."""
+
+        self._compress()
+
+        return {'kind': self.kind,
+                'compression': self.compression,
+                'means': self.means,
+                'weights': self.weights,
+                'count': self.count,
+                'minimum': self.minimum,
+                'maximum': self.maximum,
+                'mean': self._mean,
+                'm2': self._m2}
+
+    @classmethod
+    def fromDict(cls, data):
+        """Create a sketch from the result of toDict."""
+
+        sketch = cls(data['compression'])
+        sketch.means = list(data['means'])
+        sketch.weights = list(data['weights'])
+        sketch.count = data['count']
+        sketch.minimum = data['minimum']
+        sketch.maximum = data['maximum']
+        sketch._mean = data['mean']
+        sketch._m2 = data['m2']
+
+        return sketch
+
+# The sketch classes by their kind.
+sketchKinds = {Histogram.kind: Histogram,
+               QuantileSketch.kind: QuantileSketch}
+
+def writeSketches(sketches, fileName):
+    """Write a dictionary of sketches to a json file."""
+
+    with open(fileName, 'w') as sketchFile:
+        json.dump({name: sketch.toDict()
+                   for name, sketch in sketches.items()},
+                  sketchFile, indent=4)
+
+def readSketches(fileName):
+    """Read a dictionary of sketches written by writeSketches."""
+
+    with open(fileName, 'r') as sketchFile:
+        data = json.load(sketchFile)
+
+    return {name: sketchKinds[value['kind']].fromDict(value)
+            for name, value in data.items()}
+
+def mergeSketches(sketchList):
+    """Merge dictionaries of sketches by name.
+
+    The sketches in the first dictionary are updated in place and
+    returned. Sketches with the same name must be of the same type,
+    and histograms of the same precision; otherwise the ValueError of
+    merge is raised with the name of the metric.
+
+    """
+
+    result = None
+
+    for sketches in sketchList:
+        if result is None:
+            result = sketches
+            continue
+        for name, sketch in sketches.items():
+            if name in result:
+                try:
+                    result[name].merge(sketch)
+                except ValueError as error:
+                    raise ValueError('{}: {}'.format(name, error))
+            else:
+                result[name] = sketch
+
+    return {} if result is None else result
+
+def sketchMetrics(linkographs, metrics, sketches=None, workers=None,
+                  chunkSize=1000):
+    """Summarize metrics over a stream of linkographs.
+
+    inputs:
+
+    linkographs -- an iterable of linkographs. It is consumed lazily,
+    so it may be a generator over a corpus or an enumeration.
+
+    metrics -- a dictionary from names to functions that take a
+    linkograph and give a number. A metric whose value is None for a
+    linkograph is not counted for it.
+
+    sketches -- a dictionary from the names to empty sketches. The
+    default is a QuantileSketch for each metric.
+
+    workers -- the number of processes to use. With None or 1 the
+    linkographs are processed in this process. Otherwise, the
+    metrics must be picklable, for example functions defined at the
+    top level of a module.
+
+    chunkSize -- the number of linkographs sent to a worker at a time.
+
+    output:
+
+    the dictionary of sketches.
+
+    """
+
+    if sketches is None:
+        sketches = {name: QuantileSketch() for name in metrics}
+
+    iterator = iter(linkographs)
+
+    if workers is None or workers <= 1:
+        _sketchChunk(iterator, metrics, sketches)
+        return sketches
+
+    # Only a few chunks are handed to the pool at a time so that the
+    # linkographs are not all read into memory.
+    pending = []
+    with multiprocessing.Pool(workers) as pool:
+        while True:
+            chunk = list(islice(iterator, chunkSize))
+            if chunk:
+                empty = {name: sketch.empty()
+                         for name, sketch in sketches.items()}
+                pending.append(pool.apply_async(
+                    _sketchChunk, (chunk, metrics, empty)))
+            if pending and (not chunk or len(pending) >= 2*workers):
+                mergeSketches([sketches, pending.pop(0).get()])
+            if not chunk and not pending:
+                break
+
+    return sketches
+
+def _sketchChunk(linkographs, metrics, sketches):
+    """Add the metric values of the linkographs to the sketches."""
+
+    for linko in linkographs:
+        for name, metric in metrics.items():
+            value = metric(linko)
+            if value is not None:
+                sketches[name].add(value)
+
+    return sketches
+
+######################################################################
+#----------------------- Command Line Programs -----------------------
+
+def cli_mergeSketches():
+    """Command line interface for merging sketch files."""
+
+    info = ('Merges the sketches in several files and prints a summary'
+            ' of each.')
+
+    parser = argparse.ArgumentParser(description=info)
+    parser.add_argument('sketches', metavar='SKETCHES.json',
+                        nargs='+',
+                        help='The sketch files written by writeSketches.')
+
+    parser.add_argument('-o', '--out',
+                        help='File to write the merged sketches to.')
+
+    parser.add_argument('-q', '--quantiles', type=float, nargs='+',
+                        default=[0.05, 0.25, 0.5, 0.75, 0.95],
+                        help='The quantiles to print.')
+
+    args = parser.parse_args()
+
+    sketches = mergeSketches(readSketches(fileName)
+                             for fileName in args.sketches)
+
+    if args.out:
+        writeSketches(sketches, args.out)
+
+    summary = {name: {'count': sketch.count,
+                      'mean': sketch.mean(),
+                      'std': sketch.std(),
+                      'quantiles': {str(q): sketch.quantile(q)
+                                    for q in args.quantiles}}
+               for name, sketch in sketches.items()}
+
+    print(json.dumps(summary, indent=4))
@@ -3,11 +3,22 @@
 """Statistics package for linkographs."""
 
 from collections import Counter
-from functools import reduce
+from collections import namedtuple # For packed link strings.
+from collections import OrderedDict # For the LRU cache.
+from functools import wraps
 from linkograph import linkoCreate
+from linkograph import kernels # For the compiled loops.
 import math # For logs
 import argparse  # For command line parsing.
+import copy # For copying cached values.
+import hashlib # For linkograph fingerprints.
+import inspect # For binding cached metric arguments.
+import itertools # For flattening sweep chunks.
 import json
+import os
+import pickle # For the on-disk cache.
+from statistics import NormalDist # For confidence intervals.
+import multiprocessing # For parallel sweeps.
 import numpy
 
 def similarity(lg_0, lg_1):
@@ -34,6 +45,206 @@ def similarity(lg_0, lg_1):
 
     return underlink_count, overlink_count, accuracy
     
+def linkRows(linkograph):
+    """Gives the forelinks as packed rows of bits.
+
+    Returns an n by ceil(n/8) uint8 NumPy array, where n is the number
+    of nodes, such that row i is the link string of node i packed in
+    the numpy.packbits layout: bit j of row i is set exactly when j is a forelink
+    of i.
+
+    """
+
+    size = len(linkograph)
+
+    tails, heads = linkArrays(linkograph)
+
+    # Set the bits directly in the packed rows, rather than packing an
+    # n by n matrix, so that only n*n/8 bytes are used.
+    rows = numpy.zeros((size, (size+7)//8), dtype=numpy.uint8)
+    bits = (numpy.uint8(0x80) >> (heads % 8).astype(numpy.uint8))
+    numpy.bitwise_or.at(rows, (tails, heads // 8), bits)
+
+    return rows
+
+# The number of set bits for each byte value.
+_popcountTable = numpy.array([bin(n).count('1') for n in range(256)],
+                             dtype=numpy.int64)
+
+def _popcount(packed):
+    """Counts the set bits in an array of packed bits."""
+    return int(_popcountTable[packed].sum())
+
+def _windowRows(rows, size):
+    """Restricts packed link rows to the first size nodes."""
+
+    window = rows[:size, :(size+7)//8].copy()
+
+    # Clear the bits past size in the last byte. numpy.packbits puts
+    # the first node in the high bit.
+    if size % 8 != 0 and window.size > 0:
+        window[:, -1] &= numpy.uint8((0xFF << (8 - size % 8)) & 0xFF)
+
+    return window
+
+def bitSimilarity(lg_0, lg_1, rows_0=None, rows_1=None):
+    """Compares two linkographs of the same length using packed links.
+
+    Gives the same (underlinks, overlinks, accuracy) as similarity:
+    underlinks are the links of lg_0 that are missing from lg_1,
+    overlinks are the links of lg_1 that are missing from lg_0, and
+    accuracy is the fraction of possible links on which the two
+    agree. The counts are popcounts of the XOR of the packed link rows
+    (see linkRows) ANDed with each linkograph's rows. The rows can be
+    passed in as rows_0 and rows_1 if they have already been
+    computed. Returns None if the lengths differ.
+
+    """
+
+    if len(lg_0) != len(lg_1):
+        return None
+    elif len(lg_0) <= 1:
+        return 0, 0, 1.0
+
+    if rows_0 is None:
+        rows_0 = linkRows(lg_0)
+    if rows_1 is None:
+        rows_1 = linkRows(lg_1)
+
+    return _rowSimilarity(rows_0, rows_1, len(lg_0))
+
+def _rowSimilarity(rows_0, rows_1, size):
+    """The similarity for packed link rows of linkographs of a size."""
+
+    if size <= 1:
+        return 0, 0, 1.0
+
+    difference = rows_0 ^ rows_1
+
+    underlink_count = _popcount(difference & rows_0)
+    overlink_count = _popcount(difference & rows_1)
+
+    possible_links = totalLinks(size)
+    accuracy = ((possible_links - underlink_count - overlink_count)
+                / possible_links)
+
+    return underlink_count, overlink_count, accuracy
+
+def similarityMatrix(linkos, workers=None, aligned=False,
+                     blockSize=None):
+    """Computes the similarity between every pair of linkographs.
+
+    Arguments:
+
+    linkos -- a list of linkographs.
+
+    workers -- the number of processes to use. If None or 1, the
+    matrix is computed in this process. Otherwise, the rows of the
+    matrix are split into blocks that are computed by a
+    multiprocessing pool.
+
+    aligned -- If False, pairs of linkographs of different lengths
+    are not compared. If True, such pairs are compared on the window
+    of nodes 0 through m-1 where m is the length of the shorter one.
+
+    blockSize -- the number of matrix rows in each block given to a
+    worker.
+
+    Returns:
+
+    (underlinks, overlinks, accuracy) -- N by N NumPy arrays, where N
+    is len(linkos), such that bitSimilarity(linkos[i], linkos[j]) is
+    (underlinks[i,j], overlinks[i,j], accuracy[i,j]). Pairs that are
+    not compared have the value NaN in all three arrays.
+
+    """
+
+    count = len(linkos)
+
+    rows = [linkRows(linko) for linko in linkos]
+    sizes = [len(linko) for linko in linkos]
+
+    underlinks = numpy.full((count, count), numpy.nan)
+    overlinks = numpy.full((count, count), numpy.nan)
+    accuracy = numpy.full((count, count), numpy.nan)
+
+    if count == 0:
+        return underlinks, overlinks, accuracy
+
+    if blockSize is None:
+        if workers is None or workers <= 1:
+            blockSize = count
+        else:
+            blockSize = max(1, count // (4*workers))
+
+    blocks = [range(start, min(start + blockSize, count))
+              for start in range(0, count, blockSize)]
+
+    if workers is None or workers <= 1:
+        results = map(lambda block: _similarityBlock(rows, sizes,
+                                                     aligned, block),
+                      blocks)
+        for result in results:
+            _fillSimilarity(result, underlinks, overlinks, accuracy)
+    else:
+        with multiprocessing.Pool(processes=workers,
+                                  initializer=_similarityInitialize,
+                                  initargs=(rows, sizes,
+                                            aligned)) as pool:
+            for result in pool.imap_unordered(_similarityWorker,
+                                              blocks):
+                _fillSimilarity(result, underlinks, overlinks,
+                                accuracy)
+
+    return underlinks, overlinks, accuracy
+
+def _similarityBlock(rows, sizes, aligned, block):
+    """Computes the upper triangle similarities for a block of rows."""
+
+    result = []
+
+    for i in block:
+        for j in range(i, len(rows)):
+            if sizes[i] == sizes[j]:
+                size = sizes[i]
+                rows_i, rows_j = rows[i], rows[j]
+            elif aligned:
+                size = min(sizes[i], sizes[j])
+                rows_i = _windowRows(rows[i], size)
+                rows_j = _windowRows(rows[j], size)
+            else:
+                continue
+
+            result.append((i, j,
+                           _rowSimilarity(rows_i, rows_j, size)))
+
+    return result
+
+def _fillSimilarity(result, underlinks, overlinks, accuracy):
+    """Records the similarities of a block in both triangles."""
+
+    for (i, j, (under, over, acc)) in result:
+        underlinks[i, j], overlinks[i, j] = under, over
+        underlinks[j, i], overlinks[j, i] = over, under
+        accuracy[i, j] = accuracy[j, i] = acc
+
+# The packed link rows for the similarity workers. They are set once
+# per worker process by _similarityInitialize.
+_similarityState = {}
+
+def _similarityInitialize(rows, sizes, aligned):
+    """Records the packed link rows in a similarity worker."""
+    _similarityState['rows'] = rows
+    _similarityState['sizes'] = sizes
+    _similarityState['aligned'] = aligned
+
+def _similarityWorker(block):
+    """Computes a block of similarities in a similarity worker."""
+    return _similarityBlock(_similarityState['rows'],
+                            _similarityState['sizes'],
+                            _similarityState['aligned'],
+                            block)
+
 def totalLinks(n):
     """Gives the number of possible links for a linkograph of size n."""
 
@@ -99,6 +310,150 @@ def percentageOfEntries(linkograph, lowerBound=None, upperBound=None):
                                                lowerBound,
                                                upperBound).items()}
 
+class LabelCounts():
+
+    """Cumulative label counts for label frequencies of any range.
+
+    For each label, the number of entries with the label among the
+    first m entries is stored for every m, so the frequencies of the
+    labels in a range [lowerBound, upperBound] are a difference of two
+    columns. Building the counts takes one pass over the entries; each
+    range query after that takes time proportional to the number of
+    labels. The counts are a snapshot: build a new LabelCounts after
+    changing the labels of the linkograph.
+
+    """
+
+    def __init__(self, linkograph, labels=None):
+        """Count the labels of the linkograph.
+
+        inputs:
+
+        linkograph -- the linkograph.
+
+        labels -- the labels to count, in the order of the rows of
+        the counts. The default is linkograph.labels followed by any
+        other labels that appear in the entries.
+
+        """
+
+        if labels is None:
+            labels = list(getattr(linkograph, 'labels', []))
+            known = set(labels)
+            extra = {label for entry in linkograph for label in entry[0]
+                     if label not in known}
+            labels.extend(sorted(extra, key=str))
+
+        self.labels = list(labels)
+        self.size = len(linkograph)
+
+        index = {label: row for (row, label) in enumerate(self.labels)}
+
+        present = numpy.zeros((len(self.labels), self.size + 1),
+                              dtype=numpy.int64)
+        for (node, entry) in enumerate(linkograph):
+            for label in entry[0]:
+                row = index.get(label)
+                if row is not None:
+                    present[row, node+1] = 1
+
+        # prefix[r, m] is the number of the first m entries with the
+        # label self.labels[r].
+        self.prefix = numpy.cumsum(present, axis=1)
+
+    def _bounds(self, lowerBound, upperBound):
+        """The bounds of boundDefaults for the counted linkograph."""
+
+        lowerBound = 0 if lowerBound is None else max(lowerBound, 0)
+        upperBound = (self.size - 1 if upperBound is None
+                      else min(upperBound, self.size - 1))
+
+        return lowerBound, upperBound
+
+    def frequencies(self, lowerBound=None, upperBound=None):
+        """The number of entries in the range with each label.
+
+        Returns a NumPy array in the order of self.labels.
+
+        """
+
+        lowerBound, upperBound = self._bounds(lowerBound, upperBound)
+
+        if upperBound < lowerBound:
+            return numpy.zeros(len(self.labels), dtype=numpy.int64)
+
+        return (self.prefix[:, upperBound+1]
+                - self.prefix[:, lowerBound])
+
+    def totalLabels(self, lowerBound=None, upperBound=None):
+        """The value of totalLabels for the range."""
+
+        return Counter({label: int(count)
+                        for (label, count) in
+                        zip(self.labels, self.frequencies(lowerBound,
+                                                          upperBound))
+                        if count > 0})
+
+    def percentageOfEntries(self, lowerBound=None, upperBound=None):
+        """The value of percentageOfEntries for the range."""
+
+        lowerBound, upperBound = self._bounds(lowerBound, upperBound)
+
+        total = upperBound - lowerBound + 1
+
+        if total <= 0:
+            return {}
+
+        return {k: v/total for k, v in self.totalLabels(
+            lowerBound, upperBound).items()}
+
+    def ratios(self, windows):
+        """The fraction of the entries with each label for many ranges.
+
+        inputs:
+
+        windows -- a list of (lowerBound, upperBound) pairs. Either
+        bound may be None for its default.
+
+        output:
+
+        a NumPy array with a row for each window and a column for each
+        of self.labels. The rows of empty windows are NaN.
+
+        """
+
+        bounds = [self._bounds(lowerBound, upperBound)
+                  for (lowerBound, upperBound) in windows]
+
+        result = numpy.full((len(bounds), len(self.labels)), numpy.nan)
+
+        if not bounds:
+            return result
+
+        lowerBounds, upperBounds = (numpy.array(b, dtype=numpy.int64)
+                                    for b in zip(*bounds))
+        totals = upperBounds - lowerBounds + 1
+        valid = totals > 0
+
+        counts = (self.prefix[:, upperBounds[valid] + 1]
+                  - self.prefix[:, lowerBounds[valid]])
+        result[valid] = (counts / totals[valid]).T
+
+        return result
+
+def labelRatios(linkograph, windows, labels=None):
+    """The label ratios of many windows.
+
+    Returns (labels, ratios) where ratios is the matrix of
+    LabelCounts.ratios for the windows, whose columns are in the order
+    of labels.
+
+    """
+
+    counts = LabelCounts(linkograph, labels)
+
+    return counts.labels, counts.ratios(windows)
+
 def links(linkograph, lowerBound=None, upperBound=None):
     """The total number of links."""
 
@@ -117,6 +472,33 @@ def links(linkograph, lowerBound=None, upperBound=None):
     # node with index upperBound+1.
     return sum(map(f, linkograph[lowerBound: upperBound+1]))
 
+def linkArrays(linkograph, lowerBound=None, upperBound=None):
+    """Gives the links as a pair of NumPy arrays.
+
+    Returns (tails, heads) where the ith link is (tails[i],
+    heads[i]), that is, tails[i] has heads[i] as a forelink. The links
+    are sorted by tail and then by head. Only the links with both ends
+    in [lowerBound, upperBound] are included, and the node numbers are
+    those of the linkograph (they are not shifted to start at 0).
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    tails = []
+    heads = []
+
+    for (offset, entry) in enumerate(linkograph[lowerBound:
+                                                upperBound+1]):
+        current = sorted(link for link in entry[2]
+                         if link <= upperBound)
+        tails.extend([lowerBound + offset]*len(current))
+        heads.extend(current)
+
+    return (numpy.array(tails, dtype=numpy.int64),
+            numpy.array(heads, dtype=numpy.int64))
+
 def linkCount(tupleOfLists, listNumber, lowerBound, upperBound):
     """Counts the number of links in one of the lists passed.
 
@@ -273,44 +655,159 @@ def linkEntropy(linkograph, listNumber=[1,2], delta=None,
                               upperBound,
                               lineNumbers)
 
-def topCover(linkograph):
-    if 0 == len(linkograph):
-        return None
+def topCover(linkograph, lowerBound=None, upperBound=None):
+    """The mean fraction of earlier nodes with links reaching past a node.
 
-    ongoing = []
-    percentageAtEach = [0]
+    For each node idx from 1 to n-2, the fraction (out of idx) of the
+    nodes 2 through idx whose longest forelink reaches past idx is
+    found, and the mean of these fractions together with an initial 0
+    is returned. If the bounds are given, the value is that of the
+    sublinkograph on [lowerBound, upperBound]. Returns None for an
+    empty linkograph.
 
-    for idx, v in enumerate(linkograph[2:]):
-        idx = idx + 1
-        percentageAtEach.append(len(ongoing) / idx)
-        if len(v[2]) > 0:
-            ongoing.append(max(v[2]))
-        ongoing = [x for x in ongoing if x > (idx+1)]
+    The open links are tracked with a difference array over the
+    longest link of each node, so the work is O(n + links).
 
-    if len(percentageAtEach) == 0:
-        result = None
-    else:
-        result = reduce(lambda x,y: x + y, percentageAtEach) / len(percentageAtEach)
+    """
 
-    return result
+    size, tails, lengths = _windowLinks(linkograph, lowerBound,
+                                        upperBound)
+
+    return _topCover(size, _longestLinks(size, tails, lengths))
 
 # humpiness takes each link and measures what percentage of the entire linkograph
 # it covers. those numbers are aggregated to get the mean.
-def meanLinkCoverage(linkograph):
-    humpiness = []
+def meanLinkCoverage(linkograph, lowerBound=None, upperBound=None):
+    """The mean over nodes of the mean coverage of the node's forelinks.
 
-    for idx, v in enumerate(linkograph[1:]):
-        forelinks = v[2]
-        ratios = list(map(lambda x: (x - idx) / len(linkograph), forelinks))
-        if (len(ratios) > 0):
-            humpiness.append(reduce(lambda x,y: x + y, ratios) / len(ratios))
+    The coverage of a forelink of length d is (d+1)/n, and node 0 is
+    not considered. If the bounds are given, the value is that of the
+    sublinkograph on [lowerBound, upperBound]. Returns None if no
+    node other than node 0 has a forelink.
 
-    if 0 == len(humpiness):
-        result = None
-    else:
-        result = reduce(lambda x,y: x + y, humpiness) / len(humpiness)
+    """
 
-    return result
+    size, tails, lengths = _windowLinks(linkograph, lowerBound,
+                                        upperBound)
+
+    foreDegree = numpy.bincount(tails, minlength=size)
+
+    return _meanLinkCoverage(size, tails, lengths, foreDegree)
+
+def _windowLinks(linkograph, lowerBound, upperBound):
+    """The size, link tails and link lengths of a window.
+
+    The tails are renumbered so that lowerBound is node 0, as in the
+    sublinkograph given by linkoCreate.createSubLinko.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    size = max(0, upperBound - lowerBound + 1)
+
+    tails, heads = linkArrays(linkograph, lowerBound, upperBound)
+
+    return size, tails - lowerBound, heads - tails
+
+def _longestLinks(size, tails, lengths):
+    """The longest link from each node, or 0 if there is none."""
+
+    longest = numpy.zeros(size, dtype=numpy.int64)
+    numpy.maximum.at(longest, tails, lengths)
+
+    return longest
+
+# The metrics available to rolling. Each takes the number of links in
+# a window and the total possible links in the window.
+rollingMetrics = {
+    'links': lambda l, t: l,
+    'percentageOfLinks': lambda l, t: l/t if t > 0 else numpy.nan,
+    'graphEntropy': shannonEntropy,
+}
+
+def rolling(linkograph, k, metrics=['graphEntropy'], step=1,
+            lowerBound=None, upperBound=None):
+    """Calculates metrics on a window of k nodes sliding along the nodes.
+
+    The windows are [lowerBound + m*step, lowerBound + m*step + k-1]
+    for m = 0, 1, ... as long as the window fits below upperBound.
+
+    The number of links in the window is maintained as the window
+    slides: moving the window one node forward drops the links from
+    the leaving node to the rest of the window and adds the links from
+    the window to the entering node. Both amounts are gathered from
+    the link arrays in one pass, so the total work is O(n + links)
+    regardless of k.
+
+    Arguments:
+
+    linkograph -- the linkograph.
+
+    k -- the number of nodes in each window.
+
+    metrics -- a list of names in rollingMetrics or functions that
+    take the number of links and the total possible links in a window.
+
+    step -- the number of nodes the window moves between values.
+
+    lowerBound, upperBound -- the nodes to slide the window over.
+
+    Returns:
+
+    {metric: values} -- a dictionary from each entry of metrics to a
+    NumPy array with the value for each window in order.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    # The number of window positions when sliding one node at a time.
+    positions = upperBound - lowerBound - k + 2
+
+    if k <= 0 or positions <= 0:
+        return {metric: numpy.array([]) for metric in metrics}
+
+    tails, heads = linkArrays(linkograph, lowerBound, upperBound)
+
+    # Only links shorter than k can be inside a window.
+    short = (heads - tails) < k
+    tails, heads = tails[short], heads[short]
+
+    size = upperBound - lowerBound + 1
+
+    # entering[i] is the number of backlinks the node lowerBound+i
+    # brings into the window that it enters at the top, and leaving[i]
+    # is the number of forelinks the node lowerBound+i takes with it
+    # when it leaves the window at the bottom.
+    entering = numpy.bincount(heads - lowerBound, minlength=size)
+    leaving = numpy.bincount(tails - lowerBound, minlength=size)
+
+    first = int(numpy.count_nonzero(heads < lowerBound + k))
+
+    # change[p] is the change in links moving from window p to p+1.
+    change = entering[k:k+positions-1] - leaving[:positions-1]
+
+    counts = numpy.empty(positions, dtype=numpy.int64)
+    counts[0] = first
+    counts[1:] = first + numpy.cumsum(change)
+
+    counts = counts[::step]
+    total = totalLinks(k)
+
+    series = {}
+    for metric in metrics:
+        if callable(metric):
+            func = metric
+        else:
+            func = rollingMetrics[metric]
+        series[metric] = numpy.array([func(int(l), total)
+                                      for l in counts],
+                                     dtype=float)
+
+    return series
 
 def entropyDeviation(linkograph):
     ents = linkEntropy(linkograph)
@@ -339,6 +836,13 @@ def applySliceFunction(func, linkograph,
     if delta is None:
         delta = len(linkograph)-1
 
+    # The slice functions that only need link counts can use the
+    # compiled kernel.
+    if kernels.accelerated and func in _sliceCountFunctions and not kwargs:
+        return _kernelSliceFunction(func, linkograph, listNumber, delta,
+                                    restrict, lowerBound, upperBound,
+                                    lineNumbers)
+
     # Collects the value for each node considered.
     values = []
 
@@ -351,18 +855,9 @@ def applySliceFunction(func, linkograph,
         # The current index in the linkograph
         cindex = lowerBound + offset
 
-        # The mininum index to consider
-        minindex = max(cindex - delta, 0)
-        
-        # The maximum index to consider
-        maxindex = min(cindex + delta, len(linkograph)-1)
-
-        # If the restrict flag is True, restrict the bounds to the
-        # subgraph.
-        if restrict:
-            minindex = max(minindex, lowerBound)
-            maxindex = min(maxindex, upperBound)
-
+        minindex, maxindex = _sliceBounds(linkograph, cindex, delta,
+                                          restrict, lowerBound,
+                                          upperBound)
 
         # l = linkCount(entry, listNumber, minindex, maxindex)
         # t = linkTotal(cindex, listNumber, minindex, maxindex)
@@ -380,6 +875,64 @@ def applySliceFunction(func, linkograph,
     return values
 
 
+def _kernelSliceFunction(func, linkograph, listNumber, delta,
+                         restrict, lowerBound, upperBound, lineNumbers):
+    """applySliceFunction for entropySlice and percentLinkSlice.
+
+    The link counts of every node are found by kernels.sliceCounts in
+    one pass over the links.
+
+    """
+
+    bounds = [_sliceBounds(linkograph, cindex, delta, restrict,
+                           lowerBound, upperBound)
+              for cindex in range(lowerBound, upperBound+1)]
+
+    if not bounds:
+        return []
+
+    minIndices, maxIndices = (numpy.array(b, dtype=numpy.int64)
+                              for b in zip(*bounds))
+
+    tails, heads = linkArrays(linkograph)
+
+    counts = kernels.sliceCounts(tails, heads, lowerBound, upperBound,
+                                 minIndices, maxIndices,
+                                 1 in listNumber, 2 in listNumber)
+
+    values = []
+
+    for (offset, l) in enumerate(counts.tolist()):
+        cindex = lowerBound + offset
+        t = linkTotal(cindex, listNumber, *bounds[offset])
+
+        currentValue = _sliceCountFunctions[func](l, t)
+
+        if lineNumbers:
+            values.append((cindex, currentValue))
+        else:
+            values.append(currentValue)
+
+    return values
+
+def _sliceBounds(linkograph, cindex, delta, restrict, lowerBound,
+                 upperBound):
+    """The range of nodes considered for node cindex by a slice function."""
+
+    # The mininum index to consider
+    minindex = max(cindex - delta, 0)
+
+    # The maximum index to consider
+    maxindex = min(cindex + delta, len(linkograph)-1)
+
+    # If the restrict flag is True, restrict the bounds to the
+    # subgraph.
+    if restrict:
+        minindex = max(minindex, lowerBound)
+        maxindex = min(maxindex, upperBound)
+
+    return minindex, maxindex
+
 def boundDefaults(linkograph, lowerBound, upperBound):
     """The common defualt bounds for most of the methods.
 
@@ -444,13 +997,99 @@ def entryToString(entry, currentIndex, listNumber,
     return "".join(preString)
 
 def linkographToString(lg):
-    encoded_lg = ""
-    for index in range(len(lg)-1):
-        encoded_lg += entryToString(lg[index], index, [2], index, len(lg)-1)
-    return encoded_lg
+    """The link string of the forelinks of every node, concatenated.
+
+    Gives the string of entryToString(lg[i], i, [2], i, len(lg)-1)
+    for i = 0, 1, ..., len(lg)-2, joined in that order. See
+    linkographToPacked for the packed form.
+
+    """
+    return packedToString(linkographToPacked(lg))
+
+# A link string stored as packed bits. The bits field is a uint8 NumPy
+# array in the numpy.packbits layout (the first character is the high
+# bit of the first byte) and length is the number of characters.
+PackedString = namedtuple('PackedString', ['bits', 'length'])
+
+def _packPositions(positions, length):
+    """Creates a PackedString with 1s at the given positions."""
+
+    bits = numpy.zeros((length+7)//8, dtype=numpy.uint8)
+    positions = numpy.asarray(positions, dtype=numpy.int64)
+    numpy.bitwise_or.at(bits, positions // 8,
+                        numpy.uint8(0x80) >> (positions % 8).astype(
+                            numpy.uint8))
+
+    return PackedString(bits, length)
+
+def entryToPacked(entry, currentIndex, listNumber,
+                  lowerBound, upperBound):
+    """The link string of entryToString as a PackedString."""
+
+    size = linkTotal(currentIndex, listNumber,
+                     lowerBound, upperBound)
+
+    positions = []
+
+    # See entryToString for the layout of the link string.
+    shiftAmount = currentIndex+1
+
+    if 1 in listNumber:
+        positions.extend(n - lowerBound for n in entry[1]
+                         if lowerBound <= n)
+        shiftAmount = lowerBound + 1
+
+    if 2 in listNumber:
+        positions.extend(n - shiftAmount for n in entry[2]
+                         if n <= upperBound)
+
+    return _packPositions(positions, size)
+
+def linkographToPacked(lg):
+    """The link string of linkographToString as a PackedString.
+
+    The positions of the links are computed from the link arrays, so
+    the text string is never built. The forelinks of node i start
+    after the n-1-r possible forelinks of each node r < i.
+
+    """
+
+    tails, heads = linkArrays(lg)
+
+    return _packLinks(len(lg), tails, heads)
+
+def _packLinks(size, tails, heads):
+    """The PackedString of linkographToPacked from the link arrays."""
+
+    offsets = tails*(size-1) - tails*(tails-1)//2
+
+    return _packPositions(offsets + (heads - tails) - 1,
+                          totalLinks(size))
+
+def unpackString(packed):
+    """The characters of a PackedString as a NumPy array of 0s and 1s."""
+    return numpy.unpackbits(packed.bits, count=packed.length)
+
+def packedToString(packed):
+    """Converts a PackedString to a string of '0' and '1' characters."""
+    return (unpackString(packed) + ord('0')).tobytes().decode('ascii')
 
 def tComplexity(stringList):
-    """Calculates t-code complexity for a string."""
+    """Calculates t-code complexity for a string.
+
+    The string can be any sequence of symbols, such as a string of
+    '0' and '1' characters. A PackedString is converted with
+    packedToString first.
+
+    """
+
+    if kernels.accelerated:
+        # Give each distinct symbol an integer code.
+        codes = {}
+        symbols = numpy.array([codes.setdefault(e, len(codes))
+                               for e in stringList], dtype=numpy.int64)
+        mult = kernels.tCodeMultiplicities(symbols).tolist()
+        return sum([math.log(m+1,2) for m in mult])
 
     sl = [[e] for e in stringList]
 
@@ -460,40 +1099,42 @@ def tComplexity(stringList):
 
 def tComplexityRecurse(codeWords, codeMult):
 
-    if len(codeWords) <= 1:
-        return codeMult
+    # Each pass replaces codeWords with the next level of the T
+    # decomposition. A loop is used in place of recursion so that long
+    # strings do not exceed the recursion limit.
+    while len(codeWords) > 1:
 
-    # get the next codeword
-    nextCW = codeWords[-2]
+        # get the next codeword
+        nextCW = codeWords[-2]
 
-    # count the consecutive multiplicity of the penultimate code word
-    count = 1
+        # count the consecutive multiplicity of the penultimate code word
+        count = 1
 
-    for cw in codeWords[-3::-1]:
-        if cw != nextCW:
-            break
+        for cw in codeWords[-3::-1]:
+            if cw != nextCW:
+                break
 
-        count += 1
+            count += 1
 
-    # add the code word and its multiplicity
-    codeMult.append((nextCW, count))
+        # add the code word and its multiplicity
+        codeMult.append((nextCW, count))
 
-    newCW = []
+        newCW = []
 
-    acc = []
-    cc = 0
-    for cw in codeWords:
-        acc.extend(cw)
-        if cw == nextCW and cc < count:
-            cc += 1
-        else:
-            newCW.append(acc)
-            acc = []
-            cc = 0
+        acc = []
+        cc = 0
+        for cw in codeWords:
+            acc.extend(cw)
+            if cw == nextCW and cc < count:
+                cc += 1
+            else:
+                newCW.append(acc)
+                acc = []
+                cc = 0
 
-    codeWords[::] = newCW
+        codeWords[::] = newCW
 
-    return tComplexityRecurse(codeWords, codeMult)
+    return codeMult
 
 def tComplexitySlice(entry, currentIndex, listNumber,
                      lowerBound, upperBound, difference=False,
@@ -535,7 +1176,8 @@ def linkTComplexity(linkograph, listNumber=[1,2], delta=None,
 
 def subgraphMetric(linkograph, metric, lowerThreshold=None,
                    upperThreshold = None, minSize=2, maxSize=None,
-                   step=1, lowerBound=None, upperBound=None):
+                   step=1, lowerBound=None, upperBound=None,
+                   monotone=None, workers=None):
     """ Finds the subgraphs whose metric value is within a given interval.
 
     linkograph -- The linkograph to consider
@@ -548,6 +1190,62 @@ def subgraphMetric(linkograph, metric, lowerThreshold=None,
                size of the linkograph.
     lowerBound -- the lowest bound to consider
     upperBound -- the highest bound to consider
+    monotone -- see subgraphSweep.
+    workers -- see subgraphSweep.
+
+    The subgraphs are returned as a list of tuples (lowerBound,
+    upperBound, metric value). See subgraphSweep for a generator
+    version.
+
+    """
+
+    return list(subgraphSweep(linkograph, metric, lowerThreshold,
+                              upperThreshold, minSize, maxSize, step,
+                              lowerBound, upperBound, monotone,
+                              workers))
+
+# Metrics whose value never decreases ('increasing') or never
+# increases ('decreasing') as the upper index of a window grows and
+# the lower index is held fixed. subgraphSweep uses this map to stop
+# extending a window once the threshold can no longer be met.
+monotoneMetrics = {
+    links: 'increasing',
+}
+
+def subgraphSweep(linkograph, metric, lowerThreshold=None,
+                  upperThreshold=None, minSize=2, maxSize=None,
+                  step=1, lowerBound=None, upperBound=None,
+                  monotone=None, workers=None, chunkSize=None):
+    """Generates the subgraphs whose metric value is within an interval.
+
+    This is the generator behind subgraphMetric. The tuples
+    (lowerIndex, upperIndex, metric value) are yielded in the same
+    order that subgraphMetric lists them, without holding all the
+    candidate windows in memory.
+
+    Arguments:
+
+    linkograph, metric, lowerThreshold, upperThreshold, minSize,
+    maxSize, step, lowerBound, upperBound -- as in subgraphMetric.
+
+    monotone -- 'increasing' if the metric never decreases when the
+    upper index of a window grows, 'decreasing' if it never
+    increases, and None if neither is known. When None, the
+    monotoneMetrics map is consulted. For an increasing metric, the
+    windows starting at a given lower index stop being extended once
+    the value exceeds upperThreshold (and similarly for a decreasing
+    metric and lowerThreshold), since no larger window can pass.
+
+    workers -- the number of processes used to evaluate the
+    windows. If None or 1, the windows are evaluated in this
+    process. Otherwise, the lower indices are split into contiguous
+    chunks that are evaluated by a multiprocessing pool, with the
+    thresholds applied in the workers. The metric must be picklable
+    (for example, a module level function) to use workers.
+
+    chunkSize -- the number of lower indices in each chunk handed to
+    a worker. Defaults to a size that gives each worker several
+    chunks.
 
     """
 
@@ -560,53 +1258,92 @@ def subgraphMetric(linkograph, metric, lowerThreshold=None,
     else:
         maxSize = min(maxSize, len(linkograph))
 
-    # The subgraphs are returned as a list of tuples (lowerBound, upperBound, metric value)
-    graphs = []
-
-    # Loop through the possible subgraphs. The value
-    # upperBound-minSize+1 gives the largest index that can occur as a
-    # lower bound to get a minSize subgraph. For example, if a minimum
-    # size of 3 is required and last index is 21, then 21-3+1=19,
-    # which gives the subgraph 19, 20, 21. A second 1 is added to
-    # accomodate that the python range function does not include the
-    # upper bound.
-    for lowerIndex in range(lowerBound, upperBound-minSize+2, step):
-        for upperIndex in range(lowerIndex+minSize-1,
-                                min(lowerIndex+maxSize, upperBound+1)):
-            metricValue = metric(linkograph, lowerIndex, upperIndex)
-
-            # Flag to indicated when a subgraph has the required
-            # metric value.
-            include = True
-
-            # Check if lower threshold is defined and value is not smaller.
-            if (lowerThreshold is not None) and (metricValue <
-                                               lowerThreshold):
-                include &= False
-
-            # Check if upper threshold is defined and value is not bigger.
-            if (upperThreshold is not None) and (metricValue >
-                                                upperThreshold):
-                include &= False
-
-            if include:
-                graphs.append((lowerIndex, upperIndex, metricValue))
-
-    return graphs
+    if monotone is None:
+        monotone = monotoneMetrics.get(metric)
+
+    # The value upperBound-minSize+1 gives the largest index that can
+    # occur as a lower bound to get a minSize subgraph. For example,
+    # if a minimum size of 3 is required and last index is 21, then
+    # 21-3+1=19, which gives the subgraph 19, 20, 21. A second 1 is
+    # added to accomodate that the python range function does not
+    # include the upper bound.
+    lowerIndices = range(lowerBound, upperBound-minSize+2, step)
+
+    settings = (lowerThreshold, upperThreshold, minSize, maxSize,
+                upperBound, monotone)
+
+    if workers is None or workers <= 1 or len(lowerIndices) <= 1:
+        for lowerIndex in lowerIndices:
+            yield from _sweepLowerIndex(linkograph, metric, lowerIndex,
+                                        settings)
+        return
+
+    if chunkSize is None:
+        chunkSize = max(1, len(lowerIndices) // (4*workers))
+
+    chunks = [(lowerIndices[start: start+chunkSize], settings)
+              for start in range(0, len(lowerIndices), chunkSize)]
+
+    with multiprocessing.Pool(processes=workers,
+                              initializer=_sweepInitialize,
+                              initargs=(linkograph, metric)) as pool:
+        # imap keeps the chunks in order, so flattening the chunks
+        # gives the same sequence as the serial sweep.
+        yield from itertools.chain.from_iterable(
+            pool.imap(_sweepChunk, chunks))
+
+def _sweepLowerIndex(linkograph, metric, lowerIndex, settings):
+    """Yields the passing windows that start at lowerIndex."""
+
+    (lowerThreshold, upperThreshold, minSize, maxSize, upperBound,
+     monotone) = settings
+
+    for upperIndex in range(lowerIndex+minSize-1,
+                            min(lowerIndex+maxSize, upperBound+1)):
+        metricValue = metric(linkograph, lowerIndex, upperIndex)
+
+        # Check if lower threshold is defined and value is not smaller.
+        if (lowerThreshold is not None) and (metricValue <
+                                           lowerThreshold):
+            if monotone == 'decreasing':
+                break
+            continue
+
+        # Check if upper threshold is defined and value is not bigger.
+        if (upperThreshold is not None) and (metricValue >
+                                            upperThreshold):
+            if monotone == 'increasing':
+                break
+            continue
+
+        yield (lowerIndex, upperIndex, metricValue)
+
+# The linkograph and metric for the sweep workers. They are set once
+# per worker process by _sweepInitialize so that they are not sent
+# with every chunk.
+_sweepState = {}
+
+def _sweepInitialize(linkograph, metric):
+    """Records the linkograph and metric in a sweep worker."""
+    _sweepState['linkograph'] = linkograph
+    _sweepState['metric'] = metric
+
+def _sweepChunk(chunk):
+    """Evaluates a chunk of lower indices in a sweep worker."""
+    lowerIndices, settings = chunk
+    hits = []
+    for lowerIndex in lowerIndices:
+        hits.extend(_sweepLowerIndex(_sweepState['linkograph'],
+                                     _sweepState['metric'],
+                                     lowerIndex, settings))
+    return hits
 
 def linkDifference(linko):
     """The longest link from the nodes."""
 
-    differences=[]
-
-    for (node, entry) in enumerate(linko):
-        if len(entry[2]) != 0:
-            differences.append(max({fl - node for fl in entry[2]}))
-        else:
-            differences.append(0)
-
+    tails, heads = linkArrays(linko)
 
-    return differences
+    return _longestLinks(len(linko), tails, heads - tails).tolist()
 
 def summaryDifference(linko):
     if 0 == len(linko):
@@ -627,6 +1364,10 @@ def percentLinkSlice(entry, currentIndex, listNumber,
 
     return l/t
 
+# The slice functions that are a function of linkCount and linkTotal.
+_sliceCountFunctions = {entropySlice: shannonEntropy,
+                        percentLinkSlice: lambda l, t: l/(t if t else 1)}
+
 def linkSlicePercents(linkograph, listNumber=[1,2], delta=None,
                       restrict=False, lowerBound=None,
                       upperBound=None, lineNumbers=False):
@@ -641,42 +1382,1147 @@ def linkSlicePercents(linkograph, listNumber=[1,2], delta=None,
                               upperBound,
                               lineNumbers)
 
+def entropySpectrum(linkograph, maxDelta, listNumber=[1,2],
+                    restrict=False, lowerBound=None, upperBound=None):
+    """Calculates linkEntropy for every delta from 1 to maxDelta.
+
+    Returns a NumPy array with a row for each node in [lowerBound,
+    upperBound] and a column for each delta, such that column d-1 is
+    linkEntropy(linkograph, listNumber, d, restrict, lowerBound,
+    upperBound). The links of each node are counted by link length
+    once and accumulated over the lengths, so the work is
+    O(n*maxDelta + links) rather than a pass per delta.
+
+    """
+
+    counts, totals = _linkSpectrum(linkograph, maxDelta, listNumber,
+                                   restrict, lowerBound, upperBound)
+
+    result = numpy.zeros(counts.shape)
+
+    # shannonEntropy is 0 unless there are some links and some
+    # missing links.
+    mixed = (counts > 0) & (counts < totals)
+    p = counts[mixed] / totals[mixed]
+    result[mixed] = (-p*numpy.log(p) - (1-p)*numpy.log(1-p)) / math.log(2)
+
+    return result
+
+def percentSpectrum(linkograph, maxDelta, listNumber=[1,2],
+                    restrict=False, lowerBound=None, upperBound=None):
+    """Calculates linkSlicePercents for every delta from 1 to maxDelta.
+
+    Returns a NumPy array with a row for each node in [lowerBound,
+    upperBound] and a column for each delta, such that column d-1 is
+    linkSlicePercents(linkograph, listNumber, d, restrict,
+    lowerBound, upperBound). See entropySpectrum.
+
+    """
+
+    counts, totals = _linkSpectrum(linkograph, maxDelta, listNumber,
+                                   restrict, lowerBound, upperBound)
+
+    # percentLinkSlice uses a total of 1 when there are no possible
+    # links.
+    return counts / numpy.maximum(totals, 1)
+
+def _linkSpectrum(linkograph, maxDelta, listNumber, restrict,
+                  lowerBound, upperBound):
+    """The link counts and possible links for every node and delta.
+
+    Gives two arrays with a row for each node in [lowerBound,
+    upperBound] and a column for each delta from 1 to maxDelta: the
+    number of links within delta of the node (see linkCount) and the
+    number of possible such links (see linkTotal).
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    nodes = numpy.arange(lowerBound, upperBound+1, dtype=numpy.int64)
+    rows = len(nodes)
+
+    counts = numpy.zeros((rows, maxDelta), dtype=numpy.int64)
+    totals = numpy.zeros((rows, maxDelta), dtype=numpy.int64)
+
+    if rows == 0 or maxDelta <= 0:
+        return counts, totals
+
+    deltas = numpy.arange(1, maxDelta+1, dtype=numpy.int64)
+
+    # The range of nodes a slice function may consider, before delta
+    # is applied (see _sliceBounds).
+    minLimit = lowerBound if restrict else 0
+    maxLimit = upperBound if restrict else len(linkograph)-1
+
+    tails, heads = linkArrays(linkograph)
+    lengths = heads - tails
+
+    # Tally each link by the node it belongs to and its length, and
+    # accumulate over the lengths so that column d-1 counts the links
+    # no longer than d.
+    if 1 in listNumber:
+        backlinks = ((heads >= lowerBound) & (heads <= upperBound)
+                     & (tails >= minLimit) & (lengths <= maxDelta))
+        numpy.add.at(counts, (heads[backlinks] - lowerBound,
+                              lengths[backlinks] - 1), 1)
+        totals += (nodes[:, None]
+                   - numpy.maximum(nodes[:, None] - deltas, minLimit))
+
+    if 2 in listNumber:
+        forelinks = ((tails >= lowerBound) & (tails <= upperBound)
+                     & (heads <= maxLimit) & (lengths <= maxDelta))
+        numpy.add.at(counts, (tails[forelinks] - lowerBound,
+                              lengths[forelinks] - 1), 1)
+        totals += (numpy.minimum(nodes[:, None] + deltas, maxLimit)
+                   - nodes[:, None])
+
+    return numpy.cumsum(counts, axis=1), totals
+
+def horizontalLinkCounts(linkograph, maxDistance=None, restrict=False,
+                         lowerBound=None, upperBound=None):
+    """The links and possible links at each link distance.
+
+    Returns two NumPy arrays whose entries d-1 are the number of links
+    (i, i+d) and the number of possible such pairs, for d from 1 to
+    maxDistance, where i is a node in [lowerBound, upperBound]. If the
+    restrict flag is True, i+d must also be in [lowerBound,
+    upperBound]; otherwise it may be any node of the linkograph. The
+    links are bucketed by distance in a single pass over the link
+    arrays.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    # The highest node a link may end at.
+    maxIndex = upperBound if restrict else len(linkograph)-1
+
+    if maxDistance is None:
+        maxDistance = max(maxIndex - lowerBound, 0)
+
+    distances = numpy.arange(1, maxDistance+1, dtype=numpy.int64)
+
+    # The pairs (i, i+d) with i in [lowerBound, upperBound] and i+d
+    # at most maxIndex.
+    totals = numpy.maximum(
+        numpy.minimum(upperBound, maxIndex - distances) - lowerBound + 1,
+        0)
+
+    tails, heads = linkArrays(linkograph)
+    lengths = heads - tails
+
+    considered = ((tails >= lowerBound) & (tails <= upperBound)
+                  & (heads <= maxIndex) & (lengths <= maxDistance))
+
+    counts = numpy.bincount(lengths[considered] - 1,
+                            minlength=maxDistance)[:maxDistance]
+
+    return counts, totals
+
+def horizontalLinkEntropy(linkograph, maxDistance=None, restrict=False,
+                          lowerBound=None, upperBound=None,
+                          lineNumbers=False):
+    """Calculates the horizontal link entropies.
+
+    The horizontal link entropy at distance d is the entropy of the
+    presence of the links (i, i+d), that is, of the links drawn at the
+    same height in the linkograph. This function returns a list of the
+    horizontal link entropies for the distances 1 to maxDistance.
+
+    Parameters:
+    linkograph -- the linkograph
+
+    maxDistance -- the largest link distance. If left unset, every
+    distance with a possible link is considered.
+
+    restrict -- restrict all calculations to the subgraph
+
+    lowerBound -- the lowest index for the first node of a link
+
+    upperBound -- the highest index for the first node of a link
+
+    lineNumbers -- give (distance, entropy) pairs
+
+    See horizontalLinkCounts for the links considered.
+
+    """
+
+    counts, totals = horizontalLinkCounts(linkograph, maxDistance,
+                                          restrict, lowerBound,
+                                          upperBound)
+
+    values = []
+
+    for (distance, (l, t)) in enumerate(zip(counts.tolist(),
+                                            totals.tolist()), 1):
+        currentValue = shannonEntropy(l, t)
+
+        if lineNumbers:
+            values.append((distance, currentValue))
+        else:
+            values.append(currentValue)
+
+    return values
+
 def countCriticalNodes(linkograph, threshold):
-    count = 0
-    for node in linkograph:
-        if len(node[1]) + len(node[2]) > threshold:
-            count += 1
-    return count
+    return criticalNodeCounts(linkograph, [threshold])[0]
 
 def calculateCartesianStatistics(linkograph):
-    Sigma_x = 0
-    min_x = len(linkograph)
-    max_x = 0
-    Sigma_y = 0
-    min_y = len(linkograph)
-    max_y = 0
-    x = []
-    y = []
-    for node_index in range(len(linkograph)):
-        node = linkograph[node_index]
-        for forelink in node[2]:
-            x.append(float(node_index + forelink) / 2)
-            y.append(forelink - node_index)
-    if 0 < links(linkograph):
-        Sigma_x = sum(x)
-        Sigma_y = sum(y)
-        x_bar = sum(x) / links(linkograph)
-        y_bar = sum(y) / links(linkograph)
-        range_x = max(x) - min(x)
-        range_y = max(y) - min(y)
+    tails, heads = linkArrays(linkograph)
+    lengths = heads - tails
+
+    return tuple(_cartesianFeature(feature, tails, heads, lengths)
+                 for feature in ['x_bar', 'Sigma_x', 'range_x',
+                                 'y_bar', 'Sigma_y', 'range_y'])
+
+def linkLengthHistogram(linkograph, lowerBound=None, upperBound=None):
+    """The number of links of each length.
+
+    Returns a NumPy array whose entry d is the number of links (i,
+    i+d) with both ends in [lowerBound, upperBound]. There is an entry
+    for each length from 0 to upperBound - lowerBound, and entry 0 is
+    always 0.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    tails, heads = linkArrays(linkograph, lowerBound, upperBound)
+
+    return numpy.bincount(heads - tails,
+                          minlength=max(upperBound - lowerBound + 1, 0))
+
+def degreeArrays(linkograph, lowerBound=None, upperBound=None):
+    """The number of forelinks and backlinks of each node.
+
+    Returns (foreDegree, backDegree), NumPy arrays with an entry for
+    each node in [lowerBound, upperBound]. Only the links with both
+    ends in [lowerBound, upperBound] are counted, so the degrees are
+    those of the sublinkograph.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    size = max(upperBound - lowerBound + 1, 0)
+
+    tails, heads = linkArrays(linkograph, lowerBound, upperBound)
+
+    return (numpy.bincount(tails - lowerBound, minlength=size),
+            numpy.bincount(heads - lowerBound, minlength=size))
+
+def criticalNodeCounts(linkograph, thresholds, lowerBound=None,
+                       upperBound=None):
+    """The number of critical nodes for each threshold.
+
+    A node is critical for a threshold if it has more than threshold
+    links, as in countCriticalNodes. The degrees are found and sorted
+    once, so each threshold only costs a binary search. Returns a list
+    with the count for each threshold in thresholds.
+
+    """
+
+    foreDegree, backDegree = degreeArrays(linkograph, lowerBound,
+                                          upperBound)
+
+    return _criticalCounts(foreDegree + backDegree, thresholds)
+
+def _criticalCounts(degrees, thresholds):
+    """The number of degrees above each threshold."""
+
+    ordered = numpy.sort(degrees)
+    above = len(ordered) - numpy.searchsorted(ordered, thresholds,
+                                              side='right')
+
+    return [int(count) for count in numpy.atleast_1d(above)]
+
+# The features given by featureVector, in the order of the columns
+# written by bin/extractSessionFeatures.py.
+sessionFeatures = ['node_count', 'critical_node_count', 'x_bar',
+                   'Sigma_x', 'range_x', 'y_bar', 'Sigma_y', 'range_y',
+                   'percentage_of_links', 'entropy', 't_complexity',
+                   'link_index', 'graph_differences',
+                   'entropy_deviation', 'mean_link_coverage',
+                   'top_cover']
+
+def featureVector(linkograph, features=None, criticalThreshold=None):
+    """Calculates the session features of a linkograph in one pass.
+
+    The links are gathered once with linkArrays and the link lengths
+    and node degrees derived from them are shared by all the
+    features. The features are named as in sessionFeatures and have
+    the values of the stats functions used by
+    bin/extractSessionFeatures.py:
+
+    node_count -- len(linkograph)
+    critical_node_count -- countCriticalNodes(linkograph,
+        criticalThreshold)
+    x_bar, Sigma_x, range_x, y_bar, Sigma_y, range_y --
+        calculateCartesianStatistics(linkograph)
+    percentage_of_links -- percentageOfLinks(linkograph)
+    entropy -- graphEntropy(linkograph)
+    t_complexity -- tComplexity(linkographToString(linkograph))
+    link_index -- links(linkograph)/len(linkograph)
+    graph_differences -- summaryDifference(linkograph)
+    entropy_deviation -- entropyDeviation(linkograph)
+    mean_link_coverage -- meanLinkCoverage(linkograph)
+    top_cover -- topCover(linkograph)
+
+    For the empty linkograph, link_index and entropy_deviation are
+    None.
+
+    Arguments:
+
+    linkograph -- the linkograph.
+
+    features -- the list of features to calculate. Defaults to all of
+    sessionFeatures.
+
+    criticalThreshold -- the threshold for critical_node_count. The
+    default is half the number of nodes.
+
+    Returns:
+
+    {feature: value} -- a dictionary with the features in the order
+    they were requested.
+
+    """
+
+    if features is None:
+        features = sessionFeatures
+
+    size = len(linkograph)
+
+    if criticalThreshold is None:
+        criticalThreshold = size / 2
+
+    tails, heads = linkArrays(linkograph)
+    lengths = heads - tails
+    linkTotal = len(tails)
+    possibleLinks = totalLinks(size)
+
+    foreDegree = numpy.bincount(tails, minlength=size)
+    backDegree = numpy.bincount(heads, minlength=size)
+
+    longest = _longestLinks(size, tails, lengths)
+
+    result = {}
+
+    for feature in features:
+        if feature == 'node_count':
+            value = size
+
+        elif feature == 'critical_node_count':
+            value = _criticalCounts(foreDegree + backDegree,
+                                    [criticalThreshold])[0]
+
+        elif feature in ['x_bar', 'Sigma_x', 'range_x',
+                         'y_bar', 'Sigma_y', 'range_y']:
+            value = _cartesianFeature(feature, tails, heads, lengths)
+
+        elif feature == 'percentage_of_links':
+            value = (float(linkTotal) / possibleLinks
+                     if possibleLinks else None)
+
+        elif feature == 'entropy':
+            value = shannonEntropy(linkTotal, possibleLinks)
+
+        elif feature == 't_complexity':
+            value = tComplexity(packedToString(
+                _packLinks(size, tails, heads)))
+
+        elif feature == 'link_index':
+            value = linkTotal / size if size else None
+
+        elif feature == 'graph_differences':
+            value = int(longest.sum()) / size if size else None
+
+        elif feature == 'entropy_deviation':
+            # Without bounds or delta, every node has n-1 possible
+            # links in linkEntropy.
+            value = (numpy.std([shannonEntropy(int(degree), size-1)
+                                for degree in foreDegree + backDegree])
+                     if size else None)
+
+        elif feature == 'mean_link_coverage':
+            value = _meanLinkCoverage(size, tails, lengths, foreDegree)
+
+        elif feature == 'top_cover':
+            value = _topCover(size, longest)
+
+        else:
+            raise ValueError('Unknown feature {}'.format(feature))
+
+        result[feature] = value
+
+    return result
+
+def _cartesianFeature(feature, tails, heads, lengths):
+    """A calculateCartesianStatistics value from the link arrays."""
+
+    if len(tails) == 0:
+        return None
+
+    if 'x' in feature.split('_'):
+        # The midpoints are multiples of 1/2, so their sum is exact.
+        values = (tails + heads) / 2
     else:
-        Sigma_x = None
-        Sigma_y = None
-        x_bar = None
-        y_bar = None
-        range_x = None
-        range_y = None
-    return x_bar, Sigma_x, range_x, y_bar, Sigma_y, range_y
+        values = lengths
+
+    total = values.sum().item()
+
+    if feature.startswith('Sigma'):
+        return total
+    if feature.endswith('bar'):
+        return total / len(tails)
+    return (values.max() - values.min()).item()
+
+def _meanLinkCoverage(size, tails, lengths, foreDegree):
+    """The value of meanLinkCoverage from the link arrays."""
+
+    # meanLinkCoverage skips node 0 and measures the coverage of a
+    # link from node i as (length + 1)/n.
+    considered = tails >= 1
+    coverage = numpy.bincount(tails[considered],
+                              weights=(lengths[considered] + 1) / size,
+                              minlength=size)
+
+    nodes = numpy.nonzero(foreDegree[1:])[0] + 1
+
+    if len(nodes) == 0:
+        return None
+
+    return sum((coverage[nodes] / foreDegree[nodes]).tolist()) / len(nodes)
+
+def _topCover(size, longest):
+    """The value of topCover from the longest link of each node."""
+
+    if size == 0:
+        return None
+
+    # topCover considers the nodes m >= 2 and, at each node idx
+    # between 1 and n-2, the fraction idx of the nodes 2 through idx
+    # whose longest link reaches past idx. Node m is counted for
+    # idx in [m, m + longest[m] - 1], which is recorded in a
+    # difference array.
+    difference = numpy.zeros(size + 1, dtype=numpy.int64)
+    nodes = numpy.nonzero(longest)[0]
+    nodes = nodes[nodes >= 2]
+    numpy.add.at(difference, nodes, 1)
+    numpy.add.at(difference, nodes + longest[nodes], -1)
+    covered = numpy.cumsum(difference).tolist()
+
+    percentageAtEach = [0] + [covered[idx] / idx
+                              for idx in range(1, size-1)]
+
+    return sum(percentageAtEach) / len(percentageAtEach)
+
+def chainDepths(linkograph, lowerBound=None, upperBound=None):
+    """The depth of each node in the link DAG.
+
+    The depth of a node is the number of links in the longest chain
+    of links i_0 -> i_1 -> ... -> node, following forelinks. Returns a
+    NumPy array with the depth of each node in [lowerBound,
+    upperBound], using only the links with both ends in the range.
+    Since every link goes forward, the depths are found in one pass
+    over the links in the order of their heads.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    size = max(upperBound - lowerBound + 1, 0)
+
+    tails, heads = linkArrays(linkograph, lowerBound, upperBound)
+
+    order = numpy.argsort(heads, kind='stable')
+    tails = (tails[order] - lowerBound).tolist()
+    heads = (heads[order] - lowerBound).tolist()
+
+    depths = [0]*size
+
+    # The depth of a tail is final before any link ending at a later
+    # node is reached.
+    for (tail, head) in zip(tails, heads):
+        if depths[tail] + 1 > depths[head]:
+            depths[head] = depths[tail] + 1
+
+    return numpy.array(depths, dtype=numpy.int64)
+
+def longestChain(linkograph, lowerBound=None, upperBound=None):
+    """The number of links in the longest chain of links."""
+
+    depths = chainDepths(linkograph, lowerBound, upperBound)
+
+    return int(depths.max()) if len(depths) else 0
+
+def reachableCounts(linkograph, lowerBound=None, upperBound=None,
+                    blockSize=16384):
+    """The number of nodes reachable from each node through forelinks.
+
+    Returns a NumPy array with, for each node in [lowerBound,
+    upperBound], the number of other nodes in the range that can be
+    reached from it by following forelinks in the range.
+
+    The reachable nodes of a node are the union of its forelinks and
+    the reachable nodes of its forelinks, which are found first by
+    going through the nodes from last to first. The sets are packed
+    rows of bits as in linkRows, so each union is an OR of rows. To
+    bound the memory, the targets are handled blockSize nodes at a
+    time, using about n*blockSize/8 bytes.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    size = max(upperBound - lowerBound + 1, 0)
+
+    counts = numpy.zeros(size, dtype=numpy.int64)
+
+    tails, heads = linkArrays(linkograph, lowerBound, upperBound)
+    tails, heads = tails - lowerBound, heads - lowerBound
+
+    # The forelinks of node i are heads[starts[i]:starts[i+1]], in
+    # increasing order.
+    starts = numpy.searchsorted(tails, numpy.arange(size + 1)).tolist()
+
+    blockSize = max(8, blockSize - blockSize % 8)
+
+    for first in range(0, size, blockSize):
+        last = min(first + blockSize, size)
+
+        # rows[i] holds the nodes in [first, last) reachable from i.
+        # Only the nodes before last can reach the block.
+        rows = numpy.zeros((last, (last - first + 7)//8),
+                           dtype=numpy.uint8)
+
+        for node in range(last - 2, -1, -1):
+            forelinks = heads[starts[node]:starts[node+1]]
+            forelinks = forelinks[:numpy.searchsorted(forelinks, last)]
+
+            if len(forelinks) == 0:
+                continue
+
+            row = numpy.bitwise_or.reduce(rows[forelinks], axis=0)
+
+            inside = forelinks[forelinks >= first] - first
+            numpy.bitwise_or.at(row, inside // 8,
+                                (numpy.uint8(0x80)
+                                 >> (inside % 8).astype(numpy.uint8)))
+
+            rows[node] = row
+            counts[node] += _popcount(row)
+
+    return counts
+
+######################################################################
+#---------------------------- Patterns -------------------------------
+
+# Detectors for Goldschmidt's structural patterns. Each returns a list
+# of (lowerBound, upperBound, score) tuples, like subgraphMetric, with
+# the node numbers of the linkograph.
+
+def findChunks(linkograph, maxCrossing=0, minSize=3, maxLength=None,
+               lowerBound=None, upperBound=None, minDegree=0):
+    """Finds the chunks, blocks of nodes linked mostly among themselves.
+
+    The nodes in [lowerBound, upperBound] are split between nodes m
+    and m+1 wherever at most maxCrossing links (i, j) have i <= m < j.
+    With maxCrossing 0, the blocks are the unions of overlapping link
+    spans. The blocks of at least minSize nodes are the chunks and the
+    score of a chunk is the percentage of its possible links that are
+    present. Only the links with both ends in [lowerBound, upperBound]
+    and, if maxLength is given, at most maxLength long are considered.
+    A chunk must have a core node with at least minDegree of the
+    considered links to other nodes of the chunk.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    size = upperBound - lowerBound + 1
+
+    if size <= 0:
+        return []
+
+    tails, heads = _patternLinks(linkograph, maxLength, lowerBound,
+                                 upperBound)
+
+    # cover[m] is the number of links crossing the gap between the
+    # nodes lowerBound+m and lowerBound+m+1.
+    difference = numpy.zeros(size, dtype=numpy.int64)
+    numpy.add.at(difference, tails, 1)
+    numpy.add.at(difference, heads, -1)
+    cover = numpy.cumsum(difference)[:size-1]
+
+    splits = numpy.flatnonzero(cover <= maxCrossing)
+    starts = numpy.concatenate(([0], splits + 1))
+    ends = numpy.concatenate((splits, [size - 1]))
+
+    return _rangeScores(starts, ends, tails, heads, minSize, lowerBound,
+                        minDegree)
+
+def findWebs(linkograph, windowSize=5, minDensity=0.5,
+             lowerBound=None, upperBound=None, minDegree=0):
+    """Finds the webs, ranges of nodes that are densely linked.
+
+    Every window of windowSize nodes whose percentage of links is at
+    least minDensity is dense, and overlapping dense windows are
+    joined into a web. The score of a web is the percentage of its
+    possible links that are present. A web must have a core node with
+    at least minDegree links to other nodes of the web. The window
+    link counts come from rolling, so the work is O(n + links).
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    if windowSize < 2 or upperBound - lowerBound + 1 < windowSize:
+        return []
+
+    tails, heads = _patternLinks(linkograph, None, lowerBound,
+                                 upperBound)
+
+    density = rolling(linkograph, windowSize, ['percentageOfLinks'],
+                      1, lowerBound, upperBound)['percentageOfLinks']
+
+    # Windows starting at consecutive nodes overlap, so each run of
+    # dense window starts gives one web.
+    starts, ends = _runs(density >= minDensity)
+
+    return _rangeScores(starts, ends + windowSize - 1, tails, heads,
+                        windowSize, lowerBound, minDegree)
+
+def findSawtooths(linkograph, minSize=3, lowerBound=None,
+                  upperBound=None):
+    """Finds the sawtooth tracks, runs of nodes each linked to the next.
+
+    A sawtooth track is a range of nodes such that every node is
+    linked to the node before it. The tracks of at least minSize
+    nodes are returned with the number of their nodes as the score.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    if upperBound - lowerBound < 1:
+        return []
+
+    tails, heads = _patternLinks(linkograph, 1, lowerBound, upperBound)
+
+    # linked[m] is True if the node lowerBound+m is linked to the
+    # node after it.
+    linked = numpy.zeros(upperBound - lowerBound, dtype=bool)
+    linked[tails] = True
+
+    starts, ends = _runs(linked)
+
+    return [(int(start) + lowerBound, int(end) + 1 + lowerBound,
+             int(end - start) + 2)
+            for (start, end) in zip(starts, ends)
+            if end - start + 2 >= minSize]
+
+def _patternLinks(linkograph, maxLength, lowerBound, upperBound):
+    """The links in the bounds, numbered from lowerBound."""
+
+    tails, heads = linkArrays(linkograph, lowerBound, upperBound)
+
+    if maxLength is not None:
+        short = (heads - tails) <= maxLength
+        tails, heads = tails[short], heads[short]
+
+    return tails - lowerBound, heads - lowerBound
+
+def _runs(mask):
+    """The first and last index of each run of True values in mask."""
+
+    padded = numpy.concatenate(([0], mask, [0])).astype(numpy.int8)
+    change = numpy.diff(padded)
+
+    return (numpy.flatnonzero(change == 1),
+            numpy.flatnonzero(change == -1) - 1)
+
+def _rangeScores(starts, ends, tails, heads, minSize, lowerBound,
+                 minDegree=0):
+    """The percentage of links of the ranges [starts[i], ends[i]].
+
+    The ranges are sorted by start and given with the link arrays
+    numbered from lowerBound. Ranges with fewer than minSize nodes, or
+    whose nodes all have fewer than minDegree links inside the range,
+    are left out.
+
+    """
+
+    result = []
+
+    for (start, end) in zip(starts.tolist(), ends.tolist()):
+        size = end - start + 1
+        if size < minSize or size < 2:
+            continue
+
+        first = numpy.searchsorted(tails, start)
+        last = numpy.searchsorted(tails, end, side='right')
+        inside = heads[first:last] <= end
+        count = int(numpy.count_nonzero(inside))
+
+        if minDegree > 0:
+            # The degrees within the range, as in degreeArrays.
+            degree = (numpy.bincount(tails[first:last][inside] - start,
+                                     minlength=size)
+                      + numpy.bincount(heads[first:last][inside] - start,
+                                       minlength=size))
+            if degree.max() < minDegree:
+                continue
+
+        result.append((start + lowerBound, end + lowerBound,
+                       count / totalLinks(size)))
+
+    return result
+
+######################################################################
+#-------------------------- Approximation ----------------------------
+
+# An approximate metric value. The value is within relativeError of the
+# exact value (as a fraction of value) with the probability given by
+# confidence, and was estimated from the given number of samples. When
+# the exact value was calculated, relativeError is 0.
+Approximation = namedtuple('Approximation', ['value', 'relativeError',
+                                             'confidence', 'samples'])
+
+def approximatePercentageOfLinks(linkograph, relativeError=0.05,
+                                 confidence=0.95, lowerBound=None,
+                                 upperBound=None, maxSamples=None,
+                                 batchSize=1000, seed=None):
+    """Estimates percentageOfLinks by sampling pairs of nodes.
+
+    Pairs of distinct nodes in [lowerBound, upperBound] are drawn
+    uniformly and checked for a link. Batches of samples are drawn,
+    each as large as all the previous ones together, until the Wilson
+    score interval for the link density at the given confidence is
+    within relativeError of the estimate, or maxSamples samples have
+    been drawn. If that would take at least as many samples as there
+    are possible links, the exact value is calculated instead.
+
+    Returns an Approximation. Its value is None when percentageOfLinks
+    would be None, and its relativeError is infinite when no link was
+    sampled.
+
+    """
+
+    return _approximatePairs(linkograph, percentageOfLinks,
+                             lambda low, p, high: (p, low, high),
+                             relativeError, confidence, lowerBound,
+                             upperBound, maxSamples, batchSize, seed)
+
+def approximateGraphEntropy(linkograph, relativeError=0.05,
+                            confidence=0.95, lowerBound=None,
+                            upperBound=None, maxSamples=None,
+                            batchSize=1000, seed=None):
+    """Estimates graphEntropy by sampling pairs of nodes.
+
+    The link density is sampled as in approximatePercentageOfLinks and
+    the entropy of the estimate is returned. The achieved bound is the
+    largest change in entropy over the confidence interval of the
+    density. Returns an Approximation.
+
+    """
+
+    def entropyRange(low, p, high):
+        values = [_binaryEntropy(low), _binaryEntropy(high)]
+        if low <= 0.5 <= high:
+            values.append(1.0)
+        return _binaryEntropy(p), min(values), max(values)
+
+    return _approximatePairs(linkograph, graphEntropy, entropyRange,
+                             relativeError, confidence, lowerBound,
+                             upperBound, maxSamples, batchSize, seed)
+
+def approximateLinkEntropy(linkograph, listNumber=[1,2], delta=None,
+                           restrict=False, relativeError=0.05,
+                           confidence=0.95, lowerBound=None,
+                           upperBound=None, maxSamples=None,
+                           batchSize=100, seed=None):
+    """Estimates the mean of linkEntropy by sampling nodes.
+
+    Nodes in [lowerBound, upperBound] are drawn uniformly (with
+    replacement) and their link entropy is calculated as in
+    linkEntropy with the same listNumber, delta, and restrict. Batches
+    are drawn until the normal confidence interval for the mean is
+    within relativeError of the estimate, or maxSamples nodes have
+    been drawn. If that would take at least as many samples as there
+    are nodes, the exact mean is calculated instead. Returns an
+    Approximation whose value is None for an empty range.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    size = upperBound - lowerBound + 1
+
+    if delta is None:
+        delta = len(linkograph)-1
+
+    def exact():
+        values = linkEntropy(linkograph, listNumber, delta, restrict,
+                             lowerBound, upperBound)
+        value = sum(values)/len(values) if values else None
+        return Approximation(value, 0.0, confidence, size)
+
+    generator = numpy.random.default_rng(seed)
+    z = NormalDist().inv_cdf(0.5 + confidence/2)
+
+    values = []
+    batch = batchSize
+    if maxSamples is not None:
+        batch = max(1, min(batch, maxSamples))
+
+    while True:
+        if size <= 0 or len(values) + batch >= size:
+            return exact()
+
+        for cindex in (lowerBound +
+                       generator.integers(0, size, batch)).tolist():
+            minindex, maxindex = _sliceBounds(linkograph, cindex,
+                                              delta, restrict,
+                                              lowerBound, upperBound)
+            values.append(entropySlice(linkograph[cindex], cindex,
+                                       listNumber, minindex,
+                                       maxindex))
+
+        mean = numpy.mean(values)
+
+        # The sample deviation needs at least two samples.
+        if len(values) >= 2 and mean > 0:
+            halfWidth = (z * numpy.std(values, ddof=1)
+                         / math.sqrt(len(values)))
+            bound = halfWidth / mean
+        else:
+            bound = math.inf
+
+        if bound <= relativeError or (maxSamples is not None and
+                                      len(values) >= maxSamples):
+            return Approximation(float(mean), float(bound), confidence,
+                                 len(values))
+
+        batch = len(values)
+        if maxSamples is not None:
+            batch = min(batch, maxSamples - len(values))
+
+def _binaryEntropy(p):
+    """The Shannon entropy of a link present with probability p."""
+    return shannonEntropy(p, 1)
+
+def _approximatePairs(linkograph, exactMetric, estimate, relativeError,
+                      confidence, lowerBound, upperBound, maxSamples,
+                      batchSize, seed):
+    """Adaptively samples node pairs for a function of the link density.
+
+    The estimate function takes the lower end, the estimate, and the
+    upper end of the confidence interval for the link density and
+    returns the metric value, and the smallest and largest values
+    that the metric takes over the interval.
+
+    """
+
+    lowerBound, upperBound = boundDefaults(linkograph, lowerBound,
+                                           upperBound)
+
+    size = upperBound - lowerBound + 1
+    total = totalLinks(max(size, 0))
+
+    generator = numpy.random.default_rng(seed)
+    z = NormalDist().inv_cdf(0.5 + confidence/2)
+
+    hits = 0
+    samples = 0
+    batch = batchSize
+    if maxSamples is not None:
+        batch = max(1, min(batch, maxSamples))
+
+    while True:
+        if total == 0 or samples + batch >= total:
+            return Approximation(exactMetric(linkograph, lowerBound,
+                                             upperBound),
+                                 0.0, confidence, total)
+
+        first = generator.integers(0, size, batch)
+        second = generator.integers(0, size, batch)
+
+        # Drawing two nodes and keeping them when they differ gives
+        # each pair of distinct nodes the same probability.
+        distinct = first != second
+        tails = numpy.minimum(first, second)[distinct] + lowerBound
+        heads = numpy.maximum(first, second)[distinct] + lowerBound
+
+        for (tail, head) in zip(tails.tolist(), heads.tolist()):
+            if head in linkograph[tail][2]:
+                hits += 1
+        samples += len(tails)
+
+        if samples == 0:
+            continue
+
+        # The Wilson score interval for the link density.
+        p = hits / samples
+        center = (p + z*z/(2*samples)) / (1 + z*z/samples)
+        spread = (z / (1 + z*z/samples)) * math.sqrt(
+            p*(1 - p)/samples + z*z/(4*samples*samples))
+        low, high = max(0.0, center - spread), min(1.0, center + spread)
+
+        value, smallest, largest = estimate(low, p, high)
+
+        if value > 0:
+            bound = max(value - smallest, largest - value) / value
+        else:
+            bound = math.inf
+
+        if bound <= relativeError or (maxSamples is not None and
+                                      samples >= maxSamples):
+            return Approximation(value, bound, confidence, samples)
+
+        batch = samples
+        if maxSamples is not None:
+            batch = max(1, min(batch, maxSamples - samples))
+
+######################################################################
+#----------------------------- Caching -------------------------------
+
+def linkoFingerprint(linkograph):
+    """Gives a content hash for a linkograph.
+
+    Two linkographs have the same fingerprint exactly when they have
+    the same number of nodes and each node has the same labels,
+    backlinks, and forelinks. The fingerprint is a hex string suitable
+    for use as a key in a cache or as a file name.
+
+    The linkograph is hashed on every call unless its fingerprint was
+    pinned with rememberFingerprint.
+
+    """
+
+    remembered = getattr(linkograph, '_fingerprint', None)
+    if remembered is not None:
+        return remembered
+
+    return _contentFingerprint(linkograph)
+
+def rememberFingerprint(linkograph):
+    """Pins the current fingerprint of a Linkograph.
+
+    Later calls to linkoFingerprint, and so cachedMetric, return the
+    pinned fingerprint without hashing the linkograph, which makes
+    cache hits cheap for a large linkograph that is queried many
+    times. The caller must call forgetFingerprint after changing the
+    linkograph. Returns the fingerprint.
+
+    """
+
+    fingerprint = _contentFingerprint(linkograph)
+    linkograph._fingerprint = fingerprint
+
+    return fingerprint
+
+def forgetFingerprint(linkograph):
+    """Unpins a fingerprint pinned with rememberFingerprint."""
+    if hasattr(linkograph, '__dict__'):
+        linkograph.__dict__.pop('_fingerprint', None)
+
+def _contentFingerprint(linkograph):
+    """Hashes the labels and links of every node."""
+
+    digest = hashlib.sha1()
+
+    digest.update(str(len(linkograph)).encode())
+
+    for entry in linkograph:
+        record = (sorted(map(str, entry[0])), sorted(entry[1]),
+                  sorted(entry[2]))
+        digest.update(repr(record).encode())
+
+    return digest.hexdigest()
+
+class StatsCache:
+
+    """A size bounded LRU cache for linkograph statistics.
+
+    The entries are keyed by (linkograph fingerprint, metric name,
+    arguments), see cachedMetric. At most maxSize entries are held in
+    memory and the least recently used entry is evicted when that size
+    is exceeded. If a directory is given, every stored entry is also
+    pickled to that directory and entries that are missing from memory
+    are looked for there before they count as a miss. The disk tier
+    is not bounded and can be emptied with clear(disk=True).
+
+    The counters hits, diskHits, and misses record how lookups have
+    been satisfied.
+
+    """
+
+    def __init__(self, maxSize=1024, directory=None):
+        self.maxSize = maxSize
+        self.directory = directory
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        path = self._diskPath(key)
+        return key in self._entries or (path is not None
+                                        and os.path.exists(path))
+
+    def _diskPath(self, key):
+        """The file that holds key in the disk tier, if there is one."""
+        if self.directory is None:
+            return None
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, name + '.pickle')
+
+    def get(self, key, default=None):
+        """Returns the value for key, or default if it is not cached."""
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        path = self._diskPath(key)
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as cacheFile:
+                storedKey, value = pickle.load(cacheFile)
+            # Guard against a hash collision on the file name.
+            if storedKey == key:
+                self.diskHits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Stores value under key."""
+
+        self._remember(key, value)
+
+        path = self._diskPath(key)
+        if path is not None:
+            with open(path, 'wb') as cacheFile:
+                pickle.dump((key, value), cacheFile)
+
+    def _remember(self, key, value):
+        """Adds an entry to the memory tier and evicts as needed."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+
+    def clear(self, disk=False):
+        """Empties the memory tier and, optionally, the disk tier."""
+
+        self._entries.clear()
+        self.hits = self.diskHits = self.misses = 0
+
+        if disk and self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith('.pickle'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def info(self):
+        """Returns a dictionary with the counters and current size."""
+        return {'hits': self.hits,
+                'diskHits': self.diskHits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxSize': self.maxSize}
+
+# The cache used by cachedMetric when no cache is given.
+statsCache = StatsCache()
+
+def cachedMetric(metric=None, cache=None):
+    """Decorator that memoizes a linkograph metric.
+
+    The metric must take the linkograph as its first argument. The
+    remaining arguments are bound to the metric's signature, with
+    defaults filled in and the lowerBound and upperBound arguments
+    normalized by boundDefaults, so that equivalent calls share an
+    entry. Lists in the arguments are treated as tuples. The key is
+    then (linkoFingerprint(linkograph), metric name, arguments). The
+    cached values are copied on the way in and out so that callers
+    may modify the results. Each call hashes the linkograph unless its
+    fingerprint is pinned with rememberFingerprint.
+
+    Can be used as @cachedMetric, @cachedMetric(cache=someCache), or
+    cachedMetric(graphEntropy). The cache defaults to statsCache.
+
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = '{}.{}'.format(func.__module__, func.__qualname__)
+
+        @wraps(func)
+        def wrapper(linkograph, *args, **kwargs):
+            currentCache = statsCache if cache is None else cache
+
+            bound = signature.bind(linkograph, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            arguments.pop(next(iter(signature.parameters)))
+
+            if 'lowerBound' in arguments and 'upperBound' in arguments:
+                (arguments['lowerBound'],
+                 arguments['upperBound']) = boundDefaults(
+                     linkograph, arguments['lowerBound'],
+                     arguments['upperBound'])
+
+            key = (linkoFingerprint(linkograph), name,
+                   _freeze(arguments))
+
+            value = currentCache.get(key, _missing)
+            if value is _missing:
+                value = func(linkograph, *args, **kwargs)
+                currentCache.put(key, copy.deepcopy(value))
+                return value
+
+            return copy.deepcopy(value)
+
+        return wrapper
+
+    if metric is not None:
+        return decorator(metric)
+
+    return decorator
+
+# Marks a cache miss, since None is a valid metric value.
+_missing = object()
+
+def _freeze(value):
+    """Converts a value to a hashable form for use in cache keys."""
+
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    return value
 
 ######################################################################
 #----------------------- Command Line Programs -----------------------
@@ -829,6 +2675,50 @@ def cli_linkEntropy():
     else:
         print(json.dumps(result, indent=4))
 
+def cli_horizontalLinkEntropy():
+    """Command line interface for horizontalLinkEntropy."""
+
+    info = 'Calculates the entropy of the links at each link distance.'
+
+    parser = argparse.ArgumentParser(description=info)
+    parser.add_argument('linkograph', metavar='LINKOGRAPH.json',
+                        nargs=1,
+                        help='The linkograph.')
+
+    parser.add_argument('-d', '--maxDistance', type=int,
+                        help='The largest link distance to consider.')
+
+    parser.add_argument('-r', '--restrict', action='store_true',
+                        help='Restrict to subgraph.')
+
+    parser.add_argument('-l', '--lowerBound', type=int,
+                        help='The lowest index to consider.')
+
+    parser.add_argument('-u', '--upperBound', type=int,
+                        help='The highest index to consider.')
+
+    parser.add_argument('-m', '--lineNumbers', action='store_true',
+                        help='Print link distance.')
+
+    args = parser.parse_args()
+
+    # Read in the linkograph.
+    linko = linkoCreate.readLinkoJson(args.linkograph[0])
+
+    result = horizontalLinkEntropy(linko,
+                                   args.maxDistance,
+                                   args.restrict,
+                                   args.lowerBound,
+                                   args.upperBound,
+                                   args.lineNumbers)
+
+    if args.lineNumbers:
+        for entry in result:
+            print(entry,end='\n')
+
+    else:
+        print(json.dumps(result, indent=4))
+
 def cli_linkTComplexity():
     """Command line interface for linkTComplexity."""
 
@@ -945,33 +2835,89 @@ def cli_subgraphMetric():
     parser.add_argument('-u', '--upperBound', type=int,
                         help='The highest index to consider.')
 
+    parser.add_argument('-w', '--workers', type=int,
+                        help='The number of worker processes.')
+
     args = parser.parse_args()
         
     # Read in the linkograph.
     linko = linkoCreate.readLinkoJson(args.linkograph[0])
 
     if args.entropy:
-        result = subgraphMetric(linko, graphEntropy,
-                                args.lowerThreshold,
-                                args.upperThreshold,
-                                args.minSize, args.maxSize,
-                                args.step,
-                                args.lowerBound,
-                                args.upperBound)
+        result = subgraphSweep(linko, graphEntropy,
+                               args.lowerThreshold,
+                               args.upperThreshold,
+                               args.minSize, args.maxSize,
+                               args.step,
+                               args.lowerBound,
+                               args.upperBound,
+                               workers=args.workers)
 
     else:
-        result = subgraphMetric(linko, percentageOfLinks,
-                                args.lowerThreshold,
-                                args.upperThreshold,
-                                args.minSize, args.maxSize,
-                                args.step,
-                                args.lowerBound,
-                                args.upperBound)
+        result = subgraphSweep(linko, percentageOfLinks,
+                               args.lowerThreshold,
+                               args.upperThreshold,
+                               args.minSize, args.maxSize,
+                               args.step,
+                               args.lowerBound,
+                               args.upperBound,
+                               workers=args.workers)
 
     #print(json.dumps(result, indent=4))
     for entry in result:
         print(entry,end='\n')
 
+def cli_patterns():
+    """Command line interface for the pattern detectors."""
+
+    info = 'Finds the chunks, webs, and sawtooth tracks of a linkograph.'
+
+    parser = argparse.ArgumentParser(description=info)
+    parser.add_argument('linkograph', metavar='LINKOGRAPH.json',
+                        nargs=1,
+                        help='The linkograph.')
+
+    parser.add_argument('-c', '--maxCrossing', type=int, default=0,
+                        help='Most links crossing a chunk boundary.')
+
+    parser.add_argument('-s', '--minSize', type=int, default=3,
+                        help='Fewest nodes in a chunk or sawtooth track.')
+
+    parser.add_argument('-w', '--windowSize', type=int, default=5,
+                        help='Number of nodes in a web window.')
+
+    parser.add_argument('-d', '--minDensity', type=float, default=0.5,
+                        help='Least percentage of links for a web window.')
+
+    parser.add_argument('-k', '--minDegree', type=int, default=0,
+                        help=('Fewest links of the core node of a chunk'
+                              ' or web.'))
+
+    parser.add_argument('-l', '--lowerBound', type=int,
+                        help='The lowest index to consider.')
+
+    parser.add_argument('-u', '--upperBound', type=int,
+                        help='The highest index to consider.')
+
+    args = parser.parse_args()
+
+    # Read in the linkograph.
+    linko = linkoCreate.readLinkoJson(args.linkograph[0])
+
+    result = {'chunks': findChunks(linko, args.maxCrossing,
+                                   args.minSize,
+                                   lowerBound=args.lowerBound,
+                                   upperBound=args.upperBound,
+                                   minDegree=args.minDegree),
+              'webs': findWebs(linko, args.windowSize, args.minDensity,
+                               args.lowerBound, args.upperBound,
+                               args.minDegree),
+              'sawtooths': findSawtooths(linko, args.minSize,
+                                         args.lowerBound,
+                                         args.upperBound)}
+
+    print(json.dumps(result, indent=4))
+
 def cli_linkSlicePercents():
     """Command line interface for linkSlicePercents."""
 
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+
+"""A persistent store for enumeration results.
+
+The exhaustive runs of enumeration.frequency and enumeration.histogram
+can take hours, and the same runs are repeated by different
+scripts. A ResultStore keeps their results on disk, keyed by the kind
+of run, a hash of the ontology, the abstraction classes, the number of
+nodes, the identity of the function, and the sampling parameters.
+
+Each result is a NumPy .npz file holding the result as columns: the
+function values, which are packed by type (the enums as a column of
+lengths and a column of encs as bytes, numbers and strings as NumPy
+arrays), the counts, and for histograms the labelings as a matrix of
+class indices. The files are evicted, least recently used first, when
+the store grows past maxBytes, and entries can be removed with
+invalidate or clear.
+
+The store is used by enumeration.frequency and enumeration.histogram
+when it is given to them or when the environment variable
+LINKOGRAPH_STORE names a directory for the default store, see
+defaultStore.
+
+A result is found again only for the same function, but a function
+is identified by its own code and not by the code it calls. After a
+change to a function that a stored function calls, such as
+stats.graphEntropy for enumeration.shannonValue, remove the results
+with invalidate or give the store a new version.
+
+"""
+
+import argparse  # For command line parsing.
+import hashlib
+import json
+import os
+import pickle # For values that have no column type.
+import numpy
+
+class ResultStore:
+
+    """A size bounded directory of frequency and histogram results.
+
+    The counters hits and misses record how lookups have been
+    satisfied.
+
+    """
+
+    def __init__(self, directory, maxBytes=None, version=None):
+        """Use the store in a directory.
+
+        The directory is created when the first result is stored. If
+        maxBytes is not None, results are evicted to keep the files
+        within that many bytes. The version, which must be json
+        serializable, is part of the fields of every result, so a new
+        version does not find the results stored under the old one.
+
+        """
+
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+    def describe(self, kind, length, ontology, function=None,
+                 absClasses=None, **parameters):
+        """The fields that identify a result.
+
+        Returns a dictionary of the kind ('frequency' or 'histogram'),
+        the ontology hash, the abstraction classes, the length, the
+        function identity (see functionIdentity), the format and the
+        version of the store, and the parameters, which must be json
+        serializable. Returns None if the function cannot be
+        identified, in which case the result is not stored.
+
+        """
+
+        identity = functionIdentity(function)
+
+        if identity is None:
+            return None
+
+        if absClasses is None:
+            absClasses = list(ontology.keys())
+
+        fields = {'kind': kind,
+                  'ontology': ontologyHash(ontology),
+                  'absClasses': [repr(c) for c in absClasses],
+                  'length': length,
+                  'function': identity,
+                  'format': formatVersion,
+                  'version': self.version}
+        fields.update(parameters)
+
+        return fields
+
+    def _path(self, fields):
+        """The file that holds the result with the fields."""
+        name = hashlib.sha1(json.dumps(fields, sort_keys=True)
+                            .encode()).hexdigest()
+        return os.path.join(self.directory, name + '.npz')
+
+    def __contains__(self, fields):
+        return os.path.exists(self._path(fields))
+
+    def get(self, fields, default=None):
+        """Returns the result for the fields, or default."""
+
+        path = self._path(fields)
+
+        if not os.path.exists(path):
+            self.misses += 1
+            return default
+
+        with numpy.load(path) as arrays:
+            stored, result = _decodeResult(arrays)
+
+        # Guard against a hash collision on the file name.
+        if stored != fields:
+            self.misses += 1
+            return default
+
+        # Mark the entry as recently used for eviction.
+        os.utime(path)
+
+        self.hits += 1
+        return result
+
+    def put(self, fields, result, absClasses=None):
+        """Stores the result for the fields.
+
+        For histograms, absClasses are the classes of the labelings.
+
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        path = self._path(fields)
+        partial = path + '.partial'
+
+        with open(partial, 'wb') as storeFile:
+            numpy.savez_compressed(storeFile, **_encodeResult(fields,
+                                                              result,
+                                                              absClasses))
+        os.replace(partial, path)
+
+        self._evict(path)
+
+    def _files(self):
+        """The stored files, least recently used first."""
+
+        if not os.path.isdir(self.directory):
+            return []
+
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                path = os.path.join(self.directory, name)
+                info = os.stat(path)
+                files.append((info.st_mtime, info.st_size, path))
+
+        return sorted(files)
+
+    def _evict(self, newest):
+        """Removes the least recently used files above maxBytes."""
+
+        if self.maxBytes is None:
+            return
+
+        files = self._files()
+        total = sum(size for (_, size, _) in files)
+
+        for (_, size, path) in files:
+            if total <= self.maxBytes:
+                break
+            # Keep the entry that was just stored if it fits.
+            if path == newest and size <= self.maxBytes:
+                continue
+            os.remove(path)
+            total -= size
+
+    def entries(self):
+        """The fields and the file size of each stored result."""
+
+        result = []
+        for (_, size, path) in self._files():
+            with numpy.load(path) as arrays:
+                fields = json.loads(str(arrays['fields']))
+            result.append((fields, size))
+
+        return result
+
+    def invalidate(self, **fields):
+        """Removes the results whose fields have the given values.
+
+        The ontology may be given as an ontology or as its hash.
+        Returns the number of results removed. With no fields, every
+        result is removed.
+
+        """
+
+        if isinstance(fields.get('ontology'), dict):
+            fields['ontology'] = ontologyHash(fields['ontology'])
+
+        if 'function' in fields and not isinstance(fields['function'],
+                                                   str):
+            fields['function'] = functionIdentity(fields['function'])
+
+        removed = 0
+        for (_, _, path) in self._files():
+            with numpy.load(path) as arrays:
+                stored = json.loads(str(arrays['fields']))
+            if all(stored.get(name) == value
+                   for (name, value) in fields.items()):
+                os.remove(path)
+                removed += 1
+
+        return removed
+
+    def clear(self):
+        """Removes every result and resets the counters."""
+        self.invalidate()
+        self.hits = self.misses = 0
+
+    def size(self):
+        """The number of bytes used by the stored results."""
+        return sum(size for (_, size, _) in self._files())
+
+    def info(self):
+        """Returns a dictionary with the counters and current size."""
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._files()),
+                'bytes': self.size(),
+                'maxBytes': self.maxBytes}
+
+def ontologyHash(ontology):
+    """A hex digest of an ontology that does not depend on key order."""
+    return hashlib.sha1(json.dumps(ontology, sort_keys=True)
+                        .encode()).hexdigest()
+
+def functionIdentity(function):
+    """A string that identifies a function across runs.
+
+    The identity is the module and name of the function with a digest
+    of its code, including the code of the lambdas and generator
+    expressions in it, so that a change to the function does not match
+    results stored for the old one. Changes to the functions it calls
+    are not seen, see the module documentation. None gives 'default'.
+    Functions defined inside other functions, including lambdas,
+    cannot be identified and give None.
+
+    """
+
+    if function is None:
+        return 'default'
+
+    name = getattr(function, '__qualname__', None)
+    module = getattr(function, '__module__', None)
+
+    if name is None or '<lambda>' in name or '<locals>' in name:
+        return None
+
+    identity = '{}.{}'.format(module, name)
+
+    code = getattr(function, '__code__', None)
+    if code is not None:
+        digest = hashlib.sha1()
+        _hashCode(code, digest)
+        identity += ':' + digest.hexdigest()[:12]
+
+    return identity
+
+def _hashCode(code, digest):
+    """Adds a code object to a digest without any memory addresses.
+
+    The repr of a nested code object holds its address, so the nested
+    code objects are hashed in turn, and sets are sorted since their
+    order can change between runs.
+
+    """
+
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            digest.update(b'code')
+            _hashCode(const, digest)
+        elif isinstance(const, frozenset):
+            digest.update(repr(sorted(map(repr, const))).encode())
+        else:
+            digest.update(repr(const).encode())
+
+# The version of the layout of the stored results.
+formatVersion = 1
+
+# The most bytes the default store uses when LINKOGRAPH_STORE_MAX_BYTES
+# is not set.
+defaultMaxBytes = 2**30
+
+# The store used by enumeration.frequency when none is given, or None.
+# It is in the directory LINKOGRAPH_STORE, limited to
+# LINKOGRAPH_STORE_MAX_BYTES bytes (defaultMaxBytes if that is not
+# set), with the version LINKOGRAPH_STORE_VERSION.
+defaultStore = None
+
+if os.environ.get('LINKOGRAPH_STORE'):
+    defaultStore = ResultStore(
+        os.environ['LINKOGRAPH_STORE'],
+        int(os.environ.get('LINKOGRAPH_STORE_MAX_BYTES',
+                           defaultMaxBytes)),
+        os.environ.get('LINKOGRAPH_STORE_VERSION'))
+
+def _encodeResult(fields, result, absClasses):
+    """The arrays of the .npz file for a result."""
+
+    arrays = {'fields': numpy.array(json.dumps(fields, sort_keys=True))}
+
+    kinds = {}
+
+    values = list(result.keys())
+    kinds['values'] = _encodeColumn('values', values, arrays)
+
+    if fields['kind'] == 'histogram':
+        index = {label: c for (c, label) in enumerate(absClasses)}
+        kinds['labels'] = _encodeColumn('labels', list(absClasses),
+                                        arrays)
+
+        labelings = [sorted(tuple(index[label] for label in labeling)
+                            for labeling in result[value])
+                     for value in values]
+        arrays['offsets'] = numpy.cumsum(
+            [0] + [len(group) for group in labelings], dtype=numpy.int64)
+        arrays['labelings'] = numpy.array(
+            [row for group in labelings for row in group],
+            dtype=numpy.int16).reshape(-1, fields['length'])
+    else:
+        arrays['counts'] = numpy.array([result[value] for value in values],
+                                       dtype=numpy.int64)
+
+    arrays['kinds'] = numpy.array(json.dumps(kinds))
+
+    return arrays
+
+def _decodeResult(arrays):
+    """The fields and the result of the arrays of a .npz file."""
+
+    fields = json.loads(str(arrays['fields']))
+    kinds = json.loads(str(arrays['kinds']))
+
+    values = _decodeColumn('values', kinds['values'], arrays)
+
+    if fields['kind'] == 'histogram':
+        labels = _decodeColumn('labels', kinds['labels'], arrays)
+        offsets = arrays['offsets'].tolist()
+        rows = arrays['labelings'].tolist()
+        result = {value: {tuple(labels[c] for c in row)
+                          for row in rows[offsets[k]:offsets[k+1]]}
+                  for (k, value) in enumerate(values)}
+    else:
+        result = dict(zip(values, arrays['counts'].tolist()))
+
+    return fields, result
+
+def _encodeColumn(name, values, arrays):
+    """Adds the arrays for a column of values and returns its kind.
+
+    Linkograph enums are stored as a column of lengths and a column of
+    little endian encs, integers that fit and floats as NumPy
+    columns, and strings as a unicode column. Other values are
+    pickled.
+
+    """
+
+    if all(type(v) is tuple and len(v) == 2 and type(v[0]) is int
+           and type(v[1]) is int and v[0] >= 0 and v[1] >= 0
+           for v in values):
+        width = max([(v[1].bit_length() + 7)//8 for v in values] + [1])
+        arrays[name + '_length'] = numpy.array([v[0] for v in values],
+                                               dtype=numpy.int64)
+        arrays[name + '_enc'] = numpy.array(
+            [v[1].to_bytes(width, 'little') for v in values],
+            dtype='S{}'.format(width))
+        return 'enum'
+
+    if all(type(v) is int and -2**63 <= v < 2**63 for v in values):
+        arrays[name] = numpy.array(values, dtype=numpy.int64)
+        return 'int'
+
+    if all(type(v) is float for v in values):
+        arrays[name] = numpy.array(values, dtype=numpy.float64)
+        return 'float'
+
+    if all(type(v) is str for v in values):
+        arrays[name] = numpy.array(values, dtype=str)
+        return 'str'
+
+    arrays[name] = numpy.frombuffer(pickle.dumps(values), dtype=numpy.uint8)
+    return 'pickle'
+
+def _decodeColumn(name, kind, arrays):
+    """The list of values of a column written by _encodeColumn."""
+
+    if kind == 'enum':
+        # NumPy drops the trailing zero bytes, which are the high
+        # bytes of the little endian encs.
+        return [(length, int.from_bytes(enc, 'little'))
+                for (length, enc) in zip(arrays[name + '_length'].tolist(),
+                                         arrays[name + '_enc'].tolist())]
+
+    if kind == 'pickle':
+        return pickle.loads(arrays[name].tobytes())
+
+    return arrays[name].tolist()
+
+######################################################################
+#----------------------- Command Line Programs -----------------------
+
+def cli_resultStore():
+    """Command line interface for managing a result store."""
+
+    info = ('Lists, invalidates, or clears the results in a result'
+            ' store directory.')
+
+    parser = argparse.ArgumentParser(description=info)
+    parser.add_argument('directory', metavar='DIRECTORY',
+                        nargs=1,
+                        help='The store directory.')
+
+    parser.add_argument('-i', '--invalidate', action='store_true',
+                        help=('Remove the results that match the'
+                              ' options below.'))
+
+    parser.add_argument('-c', '--clear', action='store_true',
+                        help='Remove every result.')
+
+    parser.add_argument('-o', '--ontology', metavar='ONTOLOGY.json',
+                        help='Only results for this ontology.')
+
+    parser.add_argument('-n', '--length', type=int,
+                        help='Only results for this number of nodes.')
+
+    parser.add_argument('-k', '--kind', choices=['frequency',
+                                                 'histogram'],
+                        help='Only results of this kind.')
+
+    args = parser.parse_args()
+
+    store = ResultStore(args.directory[0])
+
+    if args.clear:
+        store.clear()
+        return
+
+    fields = {}
+    if args.ontology is not None:
+        with open(args.ontology, 'r') as ontFile:
+            fields['ontology'] = ontologyHash(json.load(ontFile))
+    if args.length is not None:
+        fields['length'] = args.length
+    if args.kind is not None:
+        fields['kind'] = args.kind
+
+    if args.invalidate:
+        print('Removed {} results'.format(store.invalidate(**fields)))
+        return
+
+    for (stored, size) in store.entries():
+        if all(stored.get(name) == value
+               for (name, value) in fields.items()):
+            print('{}\t{}'.format(json.dumps(stored, sort_keys=True),
+                                  size))
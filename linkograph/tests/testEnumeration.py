@@ -2,7 +2,11 @@
 
 """Tests the enumeration.py package."""
 
+import itertools # For every ontology.
+import os
+import tempfile # For checkpoint files.
 import unittest
+import numpy
 from linkograph import enumeration # The package under test.
 from linkograph import linkoCreate # For constructing linkographs
 from linkograph import stats # For getting the number of linkographs
@@ -281,7 +285,7 @@ class Test_enumOnt(unittest.TestCase):
 
 
 
-        if self.id().split('.')[-1] == 'test_enumOnt':
+        if self.id().split('.')[-1] in ['test_enumOnt', 'test_ontEnum']:
             self.testParams = [
                 # {'enum': (0),
                 #  'ExpectedOntology': ont0},
@@ -340,6 +344,56 @@ class Test_enumOnt(unittest.TestCase):
         """Tests for the correct enumeration."""
         self.performTestForParams()
 
+    def test_ontEnum(self):
+        """Tests that ontEnum is the inverse of enumOnt."""
+        for params in self.testParams:
+            self.assertEqual(
+                enumeration.ontEnum(params['ExpectedOntology']),
+                params['enum'])
+
+        ontology = {'A':['A','C'], 'B':['A'], 'C':['B','C']}
+        enum = enumeration.ontEnum(ontology, ['C', 'B', 'A'])
+        self.assertEqual(enum, (3, 4, 5))
+        self.assertEqual(enumeration.enumOnt(enum, ['C', 'B', 'A']),
+                         {'C':['C','B'], 'B':['A'], 'A':['C','A']})
+
+        self.assertRaises(ValueError, enumeration.ontEnum, ontology,
+                          ['A', 'B'])
+
+
+class Test_canonicalOntologies(unittest.TestCase):
+    """ Tests the canonical enumeration of the ontologies. """
+
+    def setUp(self):
+        """ Set up parameters for individual tests. """
+
+        # The number of directed graphs with self loops on n nodes up
+        # to isomorphism.
+        self.classes = [1, 2, 10, 104]
+
+    def test_counts(self):
+        """Tests the number of classes and their sizes."""
+        for (size, classes) in enumerate(self.classes):
+            canonical = list(enumeration.canonicalOntologies(size))
+            self.assertEqual(len(canonical), classes)
+            self.assertEqual(sum(count for (enum, count) in canonical),
+                             2**(size*size))
+
+    def test_classes(self):
+        """Tests against the classes of every ontology."""
+        for size in range(4):
+            expected = {}
+            for enum in itertools.product(range(2**size), repeat=size):
+                canonical, count = enumeration.canonicalOntEnum(enum)
+                expected.setdefault(canonical, []).append(enum)
+                self.assertEqual(
+                    enumeration.canonicalOntEnum(canonical),
+                    (canonical, count))
+            self.assertEqual(
+                dict(enumeration.canonicalOntologies(size)),
+                {canonical: len(enums)
+                 for (canonical, enums) in expected.items()})
+
 
 class Test_frequency(unittest.TestCase):
     """ Tests the fruquency function. """
@@ -370,7 +424,9 @@ class Test_frequency(unittest.TestCase):
 
 
 
-        if self.id().split('.')[-1] == 'test_frequency_count':
+        if self.id().split('.')[-1] in ['test_frequency_count',
+                                        'test_frequency_incremental',
+                                        'test_frequency_symmetry']:
             self.testParams = [
                 {'length': 3,
                  'ontology': ont2_1,
@@ -433,13 +489,16 @@ class Test_frequency(unittest.TestCase):
                  'absClasses': None,
                  'ExpectedFreq': {(0,0): 1}}]
 
-    def performTestForParams(self, function):
+    def performTestForParams(self, function, incremental=False,
+                             symmetry=False):
         """"Performs the tests for each set of parameters."""
         for (number, params) in enumerate(self.testParams):
             actualFreq = enumeration.frequency(params['length'],
                                                params['ontology'],
                                                function,
-                                               params['absClasses'])
+                                               params['absClasses'],
+                                               incremental=incremental,
+                                               symmetry=symmetry)
             self.assertEqual(
                 actualFreq,
                 params['ExpectedFreq'],
@@ -462,6 +521,284 @@ class Test_frequency(unittest.TestCase):
         # distinct linkographs.
         self.performTestForParams(None)
 
+    def test_frequency_incremental(self):
+        """Tests the depth first enumeration."""
+        self.performTestForParams(None, incremental=True)
+
+    def test_frequency_symmetry(self):
+        """Tests the enumeration of the canonical labelings."""
+        self.performTestForParams(None, symmetry=True)
+
+
+class Test_classAutomorphisms(unittest.TestCase):
+    """ Tests the classAutomorphisms function and its use. """
+
+    def setUp(self):
+        """ Set up parameters for individual tests. """
+
+        self.testParams = [
+            {'ontology': {'0':[], '1':[]},
+             'absClasses': None,
+             'ExpectedAutomorphisms': [(0,1), (1,0)]},
+            {'ontology': {'0':['1'], '1':['0']},
+             'absClasses': None,
+             'ExpectedAutomorphisms': [(0,1), (1,0)]},
+            {'ontology': {'0':['0'], '1':[]},
+             'absClasses': None,
+             'ExpectedAutomorphisms': [(0,1)]},
+            {'ontology': {'A':['B'], 'B':['C'], 'C':['A'], 'D':[]},
+             'absClasses': None,
+             'ExpectedAutomorphisms': [(0,1,2,3), (1,2,0,3),
+                                       (2,0,1,3)]},
+            {'ontology': {'A':['A','C'], 'B':['A'], 'C':['B','C']},
+             'absClasses': None,
+             'ExpectedAutomorphisms': [(0,1,2)]},
+            {'ontology': {'A':['B']},
+             'absClasses': ['A', 'B', 'C', 'D'],
+             'ExpectedAutomorphisms': [(0,1,2,3), (0,1,3,2)]}]
+
+    def test_automorphisms(self):
+        """Tests for the correct automorphisms."""
+        for params in self.testParams:
+            self.assertEqual(
+                enumeration.classAutomorphisms(params['ontology'],
+                                               params['absClasses']),
+                params['ExpectedAutomorphisms'])
+
+    def test_frequency(self):
+        """Tests that the orbit counts give the brute force counts."""
+        function = lambda linko: stats.graphEntropy(linko)
+        for params in self.testParams:
+            for length in range(1, 6):
+                expected = enumeration.frequency(length,
+                                                 params['ontology'],
+                                                 None,
+                                                 params['absClasses'])
+                for incremental in [False, True]:
+                    self.assertEqual(
+                        enumeration.frequency(length, params['ontology'],
+                                              None, params['absClasses'],
+                                              incremental=incremental,
+                                              symmetry=True),
+                        expected)
+                self.assertEqual(
+                    enumeration.frequency(length, params['ontology'],
+                                          function, params['absClasses'],
+                                          symmetry=True),
+                    enumeration.frequency(length, params['ontology'],
+                                          function, params['absClasses']))
+
+    def test_histogram(self):
+        """Tests that every labeling of an orbit is recorded."""
+        for params in self.testParams:
+            for length in range(1, 5):
+                self.assertEqual(
+                    enumeration.histogram(length, params['ontology'],
+                                          None, params['absClasses'],
+                                          symmetry=True),
+                    enumeration.histogram(length, params['ontology'],
+                                          None, params['absClasses']))
+
+    def test_canonical(self):
+        """Tests that only the canonical labelings are generated."""
+        ontology = {'0':[], '1':[], '2':[]}
+        automorphisms = enumeration.classAutomorphisms(ontology)
+        states = [(tuple(state.labels), state.orbit)
+                  for state in enumeration.labelingStates(
+                          3, ontology, automorphisms=automorphisms)]
+        self.assertEqual(states, [(('0','0','0'), 3),
+                                  (('0','0','1'), 6),
+                                  (('0','1','0'), 6),
+                                  (('0','1','1'), 6),
+                                  (('0','1','2'), 6)])
+
+
+class Test_labelingStates(unittest.TestCase):
+    """ Tests the incremental enumeration of the labelings. """
+
+    def setUp(self):
+        """ Set up parameters for individual tests. """
+
+        self.ontologies = [{'0':['1'], '1':['0']},
+                           {'0':['0','1'], '1':['0']},
+                           {'A':['A','C'], 'B':['A'], 'C':['B','C']}]
+
+    def test_states(self):
+        """Tests the states against createLinko."""
+        for ontology in self.ontologies:
+            for length in range(1, 5):
+                labelings = set()
+                for state in enumeration.labelingStates(length, ontology):
+                    labelings.add(tuple(state.labels))
+                    inverse = {}
+                    for (node, label) in enumerate(state.labels):
+                        inverse.setdefault(label, []).append(node)
+                    linko = linkoCreate.createLinko(inverse, ontology)
+                    self.assertEqual(state.enum(),
+                                     enumeration.linkoToEnum(linko))
+                    self.assertEqual(state.links, stats.links(linko))
+                    self.assertEqual(state.linkograph(), linko)
+                self.assertEqual(len(labelings), len(ontology)**length)
+
+    def test_function(self):
+        """Tests functions of the linkographs."""
+        function = lambda linko: stats.graphEntropy(linko)
+        for ontology in self.ontologies:
+            for length in range(1, 5):
+                self.assertEqual(
+                    enumeration.frequency(
+                        length, ontology,
+                        lambda state: function(state.linkograph()),
+                        incremental=True),
+                    enumeration.frequency(length, ontology, function))
+
+    def test_histogram(self):
+        """Tests the incremental histogram."""
+        for ontology in self.ontologies:
+            for length in range(1, 5):
+                self.assertEqual(
+                    enumeration.histogram(length, ontology,
+                                          incremental=True),
+                    enumeration.histogram(length, ontology))
+
+    def test_samples(self):
+        """Tests that samples cannot be used."""
+        self.assertRaises(ValueError, enumeration.frequency, 3,
+                          self.ontologies[0], samples=2,
+                          incremental=True)
+
+
+class Test_parallelFrequency(unittest.TestCase):
+    """ Tests the parallelFrequency and parallelHistogram functions. """
+
+    def setUp(self):
+        """ Set up parameters for individual tests. """
+
+        self.ontology = {'A':['A','C'], 'B':['A'], 'C':['B','C']}
+
+    def test_frequency(self):
+        """Tests agreement with frequency, including the key order."""
+        for length in range(6):
+            expected = enumeration.frequency(length, self.ontology)
+            for workers in [None, 2]:
+                actual = enumeration.parallelFrequency(
+                    length, self.ontology, workers=workers, chunkSize=37)
+                self.assertEqual(list(actual.items()),
+                                 list(expected.items()))
+
+    def test_histogram(self):
+        """Tests agreement with histogram."""
+        for length in range(1, 5):
+            self.assertEqual(
+                enumeration.parallelHistogram(length, self.ontology,
+                                              workers=2, chunkSize=10),
+                enumeration.histogram(length, self.ontology))
+
+    def test_resume(self):
+        """Tests resuming an interrupted run from its checkpoint."""
+
+        calls = []
+
+        def interrupted(linko):
+            calls.append(linko)
+            if len(calls) > 100:
+                raise KeyboardInterrupt
+            return enumeration.linkoToEnum(linko)
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'run.checkpoint')
+
+            with self.assertRaises(KeyboardInterrupt):
+                enumeration.parallelFrequency(5, self.ontology,
+                                              interrupted, chunkSize=30,
+                                              checkpoint=checkpoint)
+            self.assertTrue(os.path.exists(checkpoint))
+
+            # Only the chunks missing from the checkpoint are counted.
+            calls.clear()
+            counted = lambda linko: (calls.append(linko)
+                                     or enumeration.linkoToEnum(linko))
+            actual = enumeration.parallelFrequency(5, self.ontology,
+                                                   counted, chunkSize=30,
+                                                   checkpoint=checkpoint)
+            self.assertEqual(len(calls), 3**5 - 90)
+            self.assertEqual(list(actual.items()),
+                             list(enumeration.frequency(
+                                 5, self.ontology).items()))
+
+            self.assertRaises(ValueError, enumeration.parallelFrequency,
+                              5, self.ontology, chunkSize=31,
+                              checkpoint=checkpoint)
+
+
+class Test_sampleFrequency(unittest.TestCase):
+    """ Tests the batch labeling functions and sampleFrequency. """
+
+    def setUp(self):
+        """ Set up parameters for individual tests. """
+
+        self.ontology = {'A':['A','C'], 'B':['A'], 'C':['B','C']}
+        self.absClasses = ['A', 'B', 'C', 'D']
+
+    def test_labelingLinkographs(self):
+        """Tests agreement with createLinko."""
+        generator = numpy.random.default_rng(0)
+        for length in range(1, 8):
+            labelings = generator.integers(0, len(self.absClasses),
+                                           (20, length))
+            enums = enumeration.labelingEnums(labelings, self.ontology,
+                                              self.absClasses)
+            linkos = enumeration.labelingLinkographs(labelings,
+                                                     self.ontology,
+                                                     self.absClasses)
+            for (row, enum, linko) in zip(labelings.tolist(), enums,
+                                          linkos):
+                inverse = {}
+                for (node, c) in enumerate(row):
+                    inverse.setdefault(self.absClasses[c],
+                                       []).append(node)
+                expected = linkoCreate.createLinko(inverse,
+                                                   self.ontology)
+                self.assertEqual(enum, enumeration.linkoToEnum(expected))
+                self.assertEqual(linko, expected)
+                self.assertEqual(linko.labels, expected.labels)
+
+    def test_exact(self):
+        """Tests that small spaces are counted exactly."""
+        estimate = enumeration.sampleFrequency(4, self.ontology)
+        expected = enumeration.frequency(4, self.ontology)
+        self.assertEqual(estimate.frequency, expected)
+        self.assertEqual(estimate.samples, 3**4)
+        for (value, count) in expected.items():
+            self.assertEqual(estimate.intervals[value],
+                             (count/81, count/81))
+
+    def test_precision(self):
+        """Tests the stopping rule."""
+        function = lambda linko: stats.links(linko)
+        estimate = enumeration.sampleFrequency(10, self.ontology,
+                                               function, precision=0.02,
+                                               batchSize=500, seed=1)
+        self.assertEqual(sum(estimate.frequency.values()),
+                         estimate.samples)
+        self.assertEqual(estimate.samples % 500, 0)
+        for (value, (low, high)) in estimate.intervals.items():
+            p = estimate.frequency[value] / estimate.samples
+            self.assertTrue(low <= p <= high)
+            self.assertLessEqual(max(p - low, high - p), 0.02)
+
+        # The same seed gives the same estimate.
+        self.assertEqual(enumeration.sampleFrequency(
+            10, self.ontology, function, precision=0.02, batchSize=500,
+            seed=1), estimate)
+
+    def test_maxSamples(self):
+        """Tests that sampling stops at maxSamples."""
+        estimate = enumeration.sampleFrequency(12, self.ontology,
+                                               precision=0.0001,
+                                               maxSamples=1500, seed=2)
+        self.assertEqual(estimate.samples, 1500)
+
 
 class Test_modularCounter(unittest.TestCase):
     """ Tests the enumOnt function. """
@@ -509,7 +846,7 @@ class Test_modularCounter_inc(unittest.TestCase):
     def setUp(self):
         """ Set up parameters for individual tests. """
 
-        if self.id().split('.')[-1] == 'test_enumOnt':
+        if self.id().split('.')[-1] in ['test_enumOnt', 'test_setCount']:
             self.testParams = [
                 {'len': 1,
                  'mod': 2,
@@ -584,6 +921,14 @@ class Test_modularCounter_inc(unittest.TestCase):
         """Tests for the correct enumeration."""
         self.performTestForParams()
 
+    def test_setCount(self):
+        """Tests setting the counter to the same values as inc."""
+        for params in self.testParams:
+            actual = enumeration.modularCounter(params['len'],
+                                                params['mod'])
+            actual.setCount(params['interations'])
+            self.assertEqual(actual, params['ExpectedList'])
+
 class Test_modularCounter_toInverseLabeling(unittest.TestCase):
     """ Tests the enumOnt function. """
 
@@ -704,3 +1049,48 @@ class Test_Enum_For_Large_Linkographs(unittest.TestCase):
                      "result_enum = {}")
                     .format(target_enum,
                             result_enum))
+
+class Test_packedToEnum(unittest.TestCase):
+    """ Tests the packedToEnum function. """
+
+    def test_packedToEnum(self):
+        """Tests agreement with linkoToEnum for all small linkographs."""
+
+        for size in range(6):
+            for i in range(stats.totalLinkographs(size)):
+                linko = enumeration.enumToLinko((size, i))
+                packed = stats.linkographToPacked(linko)
+                self.assertEqual(enumeration.packedToEnum(packed, size),
+                                 (size, i))
+
+class Test_batchEnum(unittest.TestCase):
+    """ Tests the linkosToEnums and enumsToLinkos functions. """
+
+    def setUp(self):
+        """Set up the enumerations for the tests."""
+
+        # Every linkograph on up to 5 nodes, mixed with some larger
+        # ones, so that the sizes are interleaved.
+        self.enums = [(size, i) for size in range(6)
+                      for i in range(stats.totalLinkographs(size))]
+        self.enums.insert(3, (30, 2**400 + 12345))
+        self.enums.insert(10, (30, stats.totalLinkographs(30) - 1))
+
+    def test_enumsToLinkos(self):
+        """Tests agreement with enumToLinko."""
+        self.assertEqual(enumeration.enumsToLinkos(self.enums),
+                         [enumeration.enumToLinko(enum)
+                          for enum in self.enums])
+
+    def test_linkosToEnums(self):
+        """Tests agreement with linkoToEnum."""
+        linkos = [enumeration.enumToLinko(enum) for enum in self.enums]
+        self.assertEqual(enumeration.linkosToEnums(linkos), self.enums)
+        self.assertEqual([enumeration.linkoToEnum(linko)
+                          for linko in linkos], self.enums)
+
+    def test_invalid(self):
+        """Tests that an invalid enumeration raises an exception."""
+        self.assertRaises(enumeration.invalidEnumerationObject,
+                          enumeration.enumsToLinkos,
+                          [(2, 0), (3, 8)])
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""Tests the kernels.py package."""
+
+import unittest
+from unittest import mock # For selecting the kernels.
+import random # For generating linkographs.
+from linkograph import kernels # The package under test.
+from linkograph import enumeration # For enumToLinko.
+from linkograph import linkoCreate # For createLinko.
+from linkograph import stats # For the slice functions.
+
+
+class Test_selfCheck(unittest.TestCase):
+
+    """Tests that the kernels match the reference implementations."""
+
+    def test_selfCheck(self):
+        """Tests that selfCheck finds no mismatches."""
+        self.assertEqual(kernels.selfCheck(trials=100, seed=3), [])
+
+    def test_brokenKernel(self):
+        """Tests that selfCheck does not compare a kernel with itself."""
+        def brokenLinks(positions):
+            tails, heads = enumLinks(positions)
+            return heads, tails
+
+        enumLinks = kernels.enumLinks
+        with mock.patch.object(kernels, 'accelerated', True), \
+             mock.patch.object(kernels, 'enumLinks', brokenLinks):
+            failures = kernels.selfCheck(trials=20, seed=3)
+            self.assertTrue(kernels.accelerated)
+
+        self.assertTrue(any(failure.startswith('enumLinks')
+                            for failure in failures))
+
+class Test_accelerated(unittest.TestCase):
+
+    """Tests the functions that use the kernels when accelerated."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        generator = random.Random(5)
+
+        self.enums = [(size, generator.randrange(
+                           stats.totalLinkographs(size)))
+                      for size in [0, 1, 2, 5, 9, 14]]
+
+        self.labelings = [
+            ({'A': [0, 2, 4], 'B': [1, 3], 'C': [5]},
+             {'A': ['B', 'C'], 'B': ['A'], 'C': ['C']}),
+            ({'A': [0, 1, 2, 3]},
+             {'A': ['A']}),
+            ({'A': [2, 0], 'B': [1]},
+             {'A': ['B'], 'B': ['A']})]
+
+    def both(self, function, *args):
+        """The results of a function without and with the kernels."""
+
+        with mock.patch.object(kernels, 'accelerated', False):
+            reference = function(*args)
+
+        with mock.patch.object(kernels, 'accelerated', True):
+            accelerated = function(*args)
+
+        return reference, accelerated
+
+    def test_enumToLinko(self):
+        """Tests enumToLinko."""
+        for enum in self.enums:
+            reference, accelerated = self.both(enumeration.enumToLinko,
+                                               enum)
+            self.assertEqual(accelerated, reference,
+                             "Test fail: enum = {}".format(enum))
+
+    def test_createLinko(self):
+        """Tests createLinko."""
+        for (inverseLabeling, ontology) in self.labelings:
+            reference, accelerated = self.both(linkoCreate.createLinko,
+                                               inverseLabeling, ontology)
+            self.assertEqual(accelerated, reference,
+                             "Test fail: labeling = {}"
+                             .format(inverseLabeling))
+
+    def test_slices(self):
+        """Tests linkEntropy and linkSlicePercents."""
+        for enum in self.enums:
+            linko = enumeration.enumToLinko(enum)
+            for args in [([1,2], None, False, None, None, False),
+                         ([1], 2, True, 1, 4, True),
+                         ([2], 3, False, 2, None, False)]:
+                for function in [stats.linkEntropy,
+                                 stats.linkSlicePercents]:
+                    reference, accelerated = self.both(function, linko,
+                                                       *args)
+                    self.assertEqual(accelerated, reference,
+                                     "Test fail: enum = {}, args = {}"
+                                     .format(enum, args))
+
+    def test_tComplexity(self):
+        """Tests tComplexity."""
+        for string in ['', '0', '0110100110010110', '111111110',
+                       'abcabcabd']:
+            reference, accelerated = self.both(stats.tComplexity, string)
+            self.assertEqual(accelerated, reference,
+                             "Test fail: string = {}".format(string))
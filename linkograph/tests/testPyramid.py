@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""Tests the pyramid.py package."""
+
+import unittest
+import os # For file names.
+import tempfile # For writing pyramids.
+import math # For isnan.
+from linkograph import pyramid # The package under test.
+from linkograph import linkoCreate # For creating linkographs.
+from linkograph import stats # For the expected values.
+
+
+class Test_DensityPyramid(unittest.TestCase):
+
+    """Basic unit tests for DensityPyramid."""
+
+    def setUp(self):
+        """Set up the linkographs for the individual tests."""
+
+        self.linko = linkoCreate.Linkograph(
+            [(set(), set(), {2,7}),
+             (set(), set(), {2,3,9}),
+             (set(), {0,1}, {8}),
+             (set(), {1}, {4,5,6}),
+             (set(), {3}, set()),
+             (set(), {3}, {9}),
+             (set(), {3}, {7}),
+             (set(), {0,6}, set()),
+             (set(), {2}, set()),
+             (set(), {1,5}, set())])
+        self.linko.uuids = [None]*len(self.linko)
+
+        # Store every level, some levels, and no levels.
+        self.pyramids = [pyramid.DensityPyramid(self.linko, maxBlocks)
+                         for maxBlocks in [16, 3, 0]]
+
+    def test_blockSizes(self):
+        """Tests the levels of the pyramid."""
+        self.assertEqual(self.pyramids[0].blockSizes, [1, 2, 4, 8, 16])
+        self.assertEqual(sorted(self.pyramids[1].levels), [4, 8, 16])
+        self.assertEqual(self.pyramids[2].levels, {})
+
+    def test_links(self):
+        """Tests the range link counts and densities."""
+        for current in self.pyramids:
+            for lowerBound in range(-1, 11):
+                for upperBound in range(-1, 11):
+                    self.assertEqual(
+                        current.links(lowerBound, upperBound),
+                        stats.links(self.linko, lowerBound, upperBound))
+                    self.assertEqual(
+                        current.density(lowerBound, upperBound),
+                        stats.percentageOfLinks(self.linko, lowerBound,
+                                                upperBound))
+
+    def test_blockCounts(self):
+        """Tests the block link counts."""
+        for current in self.pyramids:
+            self.assertEqual(current.blockCounts(4).tolist(),
+                             [[3, 4, 2],
+                              [0, 1, 1],
+                              [0, 0, 0]])
+            self.assertEqual(current.blockCounts(4, 5, 9).tolist(),
+                             [[1, 1],
+                              [0, 0]])
+            self.assertEqual(current.blockCounts(16).tolist(), [[11]])
+
+    def test_heatmap(self):
+        """Tests the block link densities."""
+        heatmap = self.pyramids[1].heatmap(8)
+
+        # Block 0 has 8 nodes and block 1 has the last 2 nodes.
+        self.assertEqual(heatmap[0, 0], 8/28)
+        self.assertEqual(heatmap[0, 1], 3/16)
+        self.assertEqual(heatmap[1, 1], 0)
+        self.assertTrue(math.isnan(heatmap[1, 0]))
+
+    def test_pyramidForFile(self):
+        """Tests that a pyramid is written once per file."""
+        with tempfile.TemporaryDirectory() as directory:
+            linkoFile = os.path.join(directory, 'linko.json')
+            linkoCreate.writeLinkoJson(self.linko, linkoFile)
+
+            built = pyramid.pyramidForFile(linkoFile, maxBlocks=3)
+            pyramidFile = pyramid.pyramidFileName(linkoFile)
+            self.assertTrue(os.path.exists(pyramidFile))
+
+            modified = os.path.getmtime(pyramidFile)
+            read = pyramid.pyramidForFile(linkoFile, maxBlocks=3)
+
+            self.assertEqual(os.path.getmtime(pyramidFile), modified)
+            self.assertEqual(read.fingerprint, built.fingerprint)
+            self.assertEqual(sorted(read.levels), sorted(built.levels))
+            for lowerBound in range(10):
+                self.assertEqual(read.links(lowerBound, 9),
+                                 built.links(lowerBound, 9))
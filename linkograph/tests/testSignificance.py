@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""Tests the significance.py package."""
+
+import unittest
+import random # For generating labelings.
+import numpy
+from linkograph import significance # The package under test.
+from linkograph import linkoCreate # For creating linkographs.
+from linkograph import stats # For the expected values.
+
+
+def createFromLabels(labelSets, ontology):
+    """Create the linkograph for a list of label sets."""
+
+    inverseLabeling = {}
+    for (node, labels) in enumerate(labelSets):
+        for label in labels:
+            inverseLabeling.setdefault(label, []).append(node)
+
+    return linkoCreate.createLinko(inverseLabeling, ontology)
+
+class Test_typeDegrees(unittest.TestCase):
+
+    """Tests the degrees from label-count arithmetic."""
+
+    def setUp(self):
+        """Set up the labelings for the individual tests."""
+
+        generator = random.Random(11)
+
+        self.ontology = {'A': ['B', 'C'], 'B': ['B'], 'C': ['A', 'D'],
+                         'D': []}
+
+        self.labelings = [[{generator.choice('ABCD')}
+                           for _ in range(size)]
+                          for size in [2, 5, 9, 14]]
+        self.labelings.append([{'A', 'D'}, {'B'}, {'C'}, {'A', 'D'},
+                               {'D'}])
+
+    def test_degrees(self):
+        """Tests the degrees against createLinko."""
+        for labelSets in self.labelings:
+            linko = createFromLabels(labelSets, self.ontology)
+            types, relation = significance.labelTypes(linko,
+                                                      self.ontology)
+            foreDegree, backDegree = significance.typeDegrees(
+                types[None, :], relation)
+
+            self.assertEqual(list(foreDegree[0]),
+                             [len(entry[2]) for entry in linko])
+            self.assertEqual(list(backDegree[0]),
+                             [len(entry[1]) for entry in linko])
+
+class Test_permutationTest(unittest.TestCase):
+
+    """Basic unit tests for permutationTest."""
+
+    def setUp(self):
+        """Set up the linkograph for the individual tests."""
+
+        self.ontology = {'A': ['A'], 'B': ['C'], 'C': []}
+
+        # The links among the A nodes do not depend on the order, and
+        # with every B before every C the observed linkograph has as
+        # many links as any permutation.
+        self.linko = createFromLabels(
+            [{'A'}]*3 + [{'B'}]*5 + [{'C'}]*5, self.ontology)
+
+        self.metrics = ['links', 'percentageOfLinks', 'graphEntropy',
+                        'meanLinkEntropy', 'criticalNodeCount']
+
+    def test_observed(self):
+        """Tests the observed values against the stats functions."""
+        observed, null = significance.nullDistribution(
+            self.linko, self.ontology, self.metrics, permutations=10,
+            seed=1)
+
+        self.assertEqual(observed['links'], stats.links(self.linko))
+        self.assertAlmostEqual(observed['percentageOfLinks'],
+                               stats.percentageOfLinks(self.linko))
+        self.assertAlmostEqual(observed['graphEntropy'],
+                               stats.graphEntropy(self.linko))
+        self.assertAlmostEqual(observed['meanLinkEntropy'],
+                               numpy.mean(stats.linkEntropy(self.linko)))
+        self.assertEqual(observed['criticalNodeCount'],
+                         stats.countCriticalNodes(self.linko,
+                                                  len(self.linko)/2))
+
+        for metric in self.metrics:
+            self.assertEqual(len(null[metric]), 10)
+
+    def test_pValues(self):
+        """Tests the p-values and z-scores."""
+        result = significance.permutationTest(
+            self.linko, self.ontology, ['links'], permutations=200,
+            alternative='greater', seed=2)['links']
+
+        self.assertLess(result.pValue, 0.05)
+        self.assertGreater(result.zScore, 0)
+
+        result = significance.permutationTest(
+            self.linko, self.ontology, ['links'], permutations=200,
+            alternative='less', seed=2)['links']
+        self.assertEqual(result.pValue, 1.0)
+
+    def test_workers(self):
+        """Tests that the workers give the same permutations."""
+        serial = significance.permutationTest(
+            self.linko, self.ontology, self.metrics, permutations=100,
+            batchSize=30, seed=4)
+        parallel = significance.permutationTest(
+            self.linko, self.ontology, self.metrics, permutations=100,
+            batchSize=30, seed=4, workers=2)
+
+        self.assertEqual(serial, parallel)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""Tests the sketch.py package."""
+
+import unittest
+import os # For file names.
+import random # For generating values.
+import tempfile # For writing sketches.
+from linkograph import sketch # The package under test.
+from linkograph import enumeration # For generating linkographs.
+from linkograph import stats # For the metrics.
+
+
+class Test_Histogram(unittest.TestCase):
+
+    """Basic unit tests for Histogram."""
+
+    def setUp(self):
+        """Set up the histograms for the individual tests."""
+
+        self.values = [0.123, 0.5, 0.5, 0.119, 1.0, 0.5]
+
+        self.histogram = sketch.Histogram(precision=2)
+        self.histogram.update(self.values)
+
+    def test_counts(self):
+        """Tests the counts of the rounded values."""
+        self.assertEqual(self.histogram.counts,
+                         {0.12: 2, 0.5: 3, 1.0: 1})
+        self.assertEqual(self.histogram.count, 6)
+
+    def test_summary(self):
+        """Tests the mean, standard deviation and quantiles."""
+        self.assertAlmostEqual(self.histogram.mean(), 2.74/6)
+        self.assertEqual(self.histogram.quantile(0.0), 0.12)
+        self.assertEqual(self.histogram.quantile(0.5), 0.5)
+        self.assertEqual(self.histogram.quantile(1.0), 1.0)
+        self.assertEqual(self.histogram.cdf(0.5), 5/6)
+        self.assertIsNone(sketch.Histogram().mean())
+
+    def test_merge(self):
+        """Tests that merging adds the counts."""
+        other = sketch.Histogram(precision=2)
+        other.update([0.5, 0.7])
+        self.histogram.merge(other)
+        self.assertEqual(self.histogram.counts,
+                         {0.12: 2, 0.5: 4, 0.7: 1, 1.0: 1})
+
+    def test_mergeMismatch(self):
+        """Tests that other precisions and sketches are not merged."""
+        for other in [sketch.Histogram(), sketch.Histogram(precision=3),
+                      sketch.QuantileSketch()]:
+            other.add(0.5)
+            with self.assertRaises(ValueError):
+                self.histogram.merge(other)
+        self.assertEqual(self.histogram.counts,
+                         {0.12: 2, 0.5: 3, 1.0: 1})
+
+class Test_QuantileSketch(unittest.TestCase):
+
+    """Basic unit tests for QuantileSketch."""
+
+    def setUp(self):
+        """Set up the sketches for the individual tests."""
+
+        generator = random.Random(7)
+        self.values = sorted(generator.random()**2
+                             for _ in range(20000))
+
+        self.sketch = sketch.QuantileSketch(compression=100)
+        for value in self.values:
+            self.sketch.add(value)
+
+    def exactQuantile(self, q):
+        """The quantile of the values."""
+        return self.values[min(int(q*len(self.values)),
+                               len(self.values)-1)]
+
+    def test_quantile(self):
+        """Tests the quantiles against the sorted values."""
+        for q in [0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999]:
+            position = self.sketch.cdf(self.exactQuantile(q))
+            self.assertAlmostEqual(position, q, delta=0.005,
+                                   msg="Test fail: q = {}".format(q))
+        self.assertEqual(self.sketch.quantile(0), self.values[0])
+        self.assertEqual(self.sketch.quantile(1), self.values[-1])
+
+    def test_size(self):
+        """Tests that the number of centroids is bounded."""
+        self.assertLessEqual(len(self.sketch.toDict()['means']), 100)
+
+    def test_merge(self):
+        """Tests that merged sketches match a single sketch."""
+        parts = [sketch.QuantileSketch(compression=100)
+                 for _ in range(4)]
+        for (index, value) in enumerate(self.values):
+            parts[index % 4].add(value)
+
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+
+        self.assertEqual(merged.count, len(self.values))
+        self.assertAlmostEqual(merged.mean(), self.sketch.mean())
+        self.assertAlmostEqual(merged.std(), self.sketch.std())
+        for q in [0.01, 0.5, 0.99]:
+            self.assertAlmostEqual(merged.quantile(q),
+                                   self.sketch.quantile(q), delta=0.01)
+
+    def test_mergeMismatch(self):
+        """Tests that a histogram is not merged into a sketch."""
+        other = sketch.Histogram()
+        other.add(0.5)
+        with self.assertRaises(ValueError):
+            self.sketch.merge(other)
+
+class Test_sketchMetrics(unittest.TestCase):
+
+    """Basic unit tests for sketchMetrics and the sketch files."""
+
+    def setUp(self):
+        """Set up the linkographs for the individual tests."""
+
+        self.linkos = [enumeration.enumToLinko((5, number))
+                       for number in range(stats.totalLinkographs(5))]
+
+        self.metrics = {'links': stats.links,
+                        'graphEntropy': stats.graphEntropy}
+
+    def makeSketches(self):
+        """The sketches for the metrics."""
+        return {'links': sketch.Histogram(),
+                'graphEntropy': sketch.QuantileSketch()}
+
+    def test_sketchMetrics(self):
+        """Tests the serial and parallel summaries."""
+        expected = {}
+        for linko in self.linkos:
+            count = stats.links(linko)
+            expected[count] = expected.get(count, 0) + 1
+
+        for workers in [None, 2]:
+            sketches = sketch.sketchMetrics(iter(self.linkos),
+                                            self.metrics,
+                                            self.makeSketches(),
+                                            workers=workers,
+                                            chunkSize=100)
+
+            self.assertEqual(sketches['links'].counts, expected)
+            self.assertEqual(sketches['graphEntropy'].count,
+                             len(self.linkos))
+
+    def test_files(self):
+        """Tests writing, reading and merging sketch files."""
+        sketches = sketch.sketchMetrics(self.linkos, self.metrics,
+                                        self.makeSketches())
+
+        with tempfile.TemporaryDirectory() as directory:
+            fileName = os.path.join(directory, 'sketches.json')
+            sketch.writeSketches(sketches, fileName)
+            first = sketch.readSketches(fileName)
+            second = sketch.readSketches(fileName)
+
+        self.assertEqual(first['links'].counts, sketches['links'].counts)
+        self.assertEqual(first['graphEntropy'].quantile(0.5),
+                         sketches['graphEntropy'].quantile(0.5))
+
+        merged = sketch.mergeSketches([first, second])
+        self.assertEqual(merged['links'].count, 2*len(self.linkos))
+        self.assertEqual(merged['graphEntropy'].count,
+                         2*len(self.linkos))
+
+    def test_mergeTypes(self):
+        """Tests that sketches of different types are not merged."""
+        first = {'links': sketch.Histogram()}
+        second = {'links': sketch.QuantileSketch()}
+        second['links'].add(1.0)
+
+        with self.assertRaisesRegex(ValueError, 'links'):
+            sketch.mergeSketches([first, second])
+
+        first = {'links': sketch.Histogram(2)}
+        second = {'links': sketch.Histogram(3)}
+        with self.assertRaisesRegex(ValueError, 'links'):
+            sketch.mergeSketches([first, second])
@@ -5,8 +5,11 @@
 import unittest
 from linkograph import stats # The package under test.
 from linkograph import linkoCreate # For creating linkographs.
+from linkograph import enumeration # For generating linkographs.
 import math # For the log function.
 from collections import Counter # For Counter data structures.
+import tempfile # For the on-disk cache tests.
+import warnings # For checking the sampling warnings.
 
 
 class Test_totalLinks(unittest.TestCase):
@@ -2901,3 +2904,1069 @@ class Test_tComplexity(unittest.TestCase):
     def test_tComplexity(self):
         """Tests for correct T complexity."""
         self.performTestForParams()
+
+class Test_subgraphSweep(unittest.TestCase):
+
+    """Basic unit tests for subgraphSweep in the stats package."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        simpleLinko = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+        # The entropy when two thirds of the links are present.
+        entropyTwoThirds = (-(2/3)*math.log(2/3, 2)
+                            - (1/3)*math.log(1/3, 2))
+
+        self.testParams = [
+            {'linko': simpleLinko,
+             'metric': stats.links,
+             'lowerThreshold': None,
+             'upperThreshold': 2,
+             'minSize': 2,
+             'ExpectedSubgraphs': [(0, 1, 1), (0, 2, 2),
+                                   (1, 2, 0), (1, 3, 1),
+                                   (2, 3, 0), (2, 4, 2),
+                                   (3, 4, 1)]},
+            {'linko': simpleLinko,
+             'metric': stats.links,
+             'lowerThreshold': 3,
+             'upperThreshold': None,
+             'minSize': 2,
+             'ExpectedSubgraphs': [(0, 3, 4), (0, 4, 7), (1, 4, 4)]},
+            {'linko': simpleLinko,
+             'metric': stats.graphEntropy,
+             'lowerThreshold': 0.9,
+             'upperThreshold': 1,
+             'minSize': 3,
+             'ExpectedSubgraphs': [(0, 2, entropyTwoThirds),
+                                   (0, 3, entropyTwoThirds),
+                                   (1, 3, entropyTwoThirds),
+                                   (1, 4, entropyTwoThirds),
+                                   (2, 4, entropyTwoThirds)]}]
+
+    def performTestForParams(self, workers):
+        """"Performs the tests for each set of parameters."""
+        for params in self.testParams:
+            actual = list(stats.subgraphSweep(params['linko'],
+                                              params['metric'],
+                                              params['lowerThreshold'],
+                                              params['upperThreshold'],
+                                              params['minSize'],
+                                              workers=workers))
+            self.assertEqual(
+                actual,
+                params['ExpectedSubgraphs'],
+                ("Test fail: metric = {}"
+                 " workers = {}"
+                 " actual = {}"
+                 " ExpectedSubgraphs = {}")
+                .format(params['metric'].__name__,
+                        workers,
+                        actual,
+                        params['ExpectedSubgraphs']))
+
+            # The list version gives the same result.
+            self.assertEqual(
+                stats.subgraphMetric(params['linko'],
+                                     params['metric'],
+                                     params['lowerThreshold'],
+                                     params['upperThreshold'],
+                                     params['minSize']),
+                params['ExpectedSubgraphs'])
+
+    def test_serial(self):
+        """Tests the sweep in a single process."""
+        self.performTestForParams(None)
+
+    def test_workers(self):
+        """Tests the sweep with a pool of worker processes."""
+        self.performTestForParams(2)
+
+    def test_chunks(self):
+        """Tests that the pool gives the serial result over many chunks."""
+        linko = enumeration.enumToLinko((10, 0x15a3c91b7e4d))
+        for metric in [stats.links, stats.graphEntropy]:
+            serial = list(stats.subgraphSweep(linko, metric, 0.2, 8))
+            self.assertGreater(len(serial), 10)
+            for chunkSize in [1, 3, None]:
+                parallel = stats.subgraphSweep(linko, metric, 0.2, 8,
+                                               workers=2,
+                                               chunkSize=chunkSize)
+                self.assertEqual(list(parallel), serial,
+                                 "Test fail: chunkSize = {}"
+                                 .format(chunkSize))
+            self.assertEqual(stats.subgraphMetric(linko, metric, 0.2, 8,
+                                                  workers=2),
+                             serial)
+
+class Test_cachedMetric(unittest.TestCase):
+
+    """Basic unit tests for the statistics cache in the stats package."""
+
+    def setUp(self):
+        """Set up the linkographs and cache for the individual tests."""
+
+        self.linko = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+        # The same linkograph, built separately.
+        self.copyLinko = linkoCreate.Linkograph(
+            [(set(entry[0]), set(entry[1]), set(entry[2]))
+             for entry in self.linko],
+            ['A', 'B', 'C', 'D'])
+
+        self.cache = stats.StatsCache(maxSize=2)
+        self.entropy = stats.cachedMetric(stats.graphEntropy,
+                                          cache=self.cache)
+
+    def test_fingerprint(self):
+        """Tests that fingerprints follow the linkograph content."""
+        self.assertEqual(stats.linkoFingerprint(self.linko),
+                         stats.linkoFingerprint(self.copyLinko))
+
+        self.copyLinko[4][0].add('D')
+        self.assertNotEqual(stats.linkoFingerprint(self.linko),
+                            stats.linkoFingerprint(self.copyLinko))
+
+    def test_editedFingerprint(self):
+        """Tests that an edit keeping the counts changes the fingerprint."""
+        fingerprint = stats.linkoFingerprint(self.linko)
+
+        # Move the link (1, 3) to (2, 3).
+        self.linko[3][1].remove(1)
+        self.linko[1][2].remove(3)
+        self.linko[3][1].add(2)
+        self.linko[2][2].add(3)
+        self.assertNotEqual(stats.linkoFingerprint(self.linko),
+                            fingerprint)
+
+        expected = stats.graphEntropy(self.copyLinko)
+        self.assertEqual(self.entropy(self.copyLinko), expected)
+        self.copyLinko[0][0].remove('A')
+        self.copyLinko[1][0].add('A')
+        self.copyLinko[1][0].remove('D')
+        self.copyLinko[0][0].add('D')
+        self.assertEqual(self.entropy(self.copyLinko), expected)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_rememberedFingerprint(self):
+        """Tests that a pinned fingerprint is kept until forgotten."""
+        fingerprint = stats.rememberFingerprint(self.linko)
+        self.assertEqual(fingerprint,
+                         stats.linkoFingerprint(self.copyLinko))
+
+        self.linko[4][0].add('D')
+        self.assertEqual(stats.linkoFingerprint(self.linko), fingerprint)
+
+        stats.forgetFingerprint(self.linko)
+        self.assertNotEqual(stats.linkoFingerprint(self.linko),
+                            fingerprint)
+
+    def test_hitsAndMisses(self):
+        """Tests that equivalent calls share an entry."""
+        expected = stats.graphEntropy(self.linko, 1, 3)
+
+        self.assertEqual(self.entropy(self.linko, 1, 3), expected)
+        self.assertEqual(self.entropy(self.copyLinko,
+                                      lowerBound=1, upperBound=3),
+                         expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # Out of range bounds are normalized before lookup.
+        self.entropy(self.linko)
+        self.entropy(self.linko, -4, 10)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+    def test_eviction(self):
+        """Tests that the least recently used entry is evicted."""
+        self.entropy(self.linko, 0, 2)
+        self.entropy(self.linko, 1, 3)
+        self.entropy(self.linko, 0, 2)
+        self.entropy(self.linko, 2, 4)
+        self.assertEqual(len(self.cache), 2)
+
+        # The window (1, 3) was the least recently used.
+        self.entropy(self.linko, 0, 2)
+        self.entropy(self.linko, 1, 3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 4))
+
+    def test_copies(self):
+        """Tests that modifying a result does not modify the cache."""
+        labels = stats.cachedMetric(stats.totalLabels, cache=self.cache)
+        labels(self.linko)['A'] = 100
+        self.assertEqual(labels(self.linko)['A'], 3)
+
+    def test_disk(self):
+        """Tests that the disk tier survives a new cache."""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = stats.StatsCache(maxSize=1, directory=directory)
+            entropy = stats.cachedMetric(stats.graphEntropy, cache=cache)
+            entropy(self.linko, 0, 2)
+
+            cache = stats.StatsCache(maxSize=1, directory=directory)
+            entropy = stats.cachedMetric(stats.graphEntropy, cache=cache)
+            self.assertEqual(entropy(self.linko, 0, 2),
+                             stats.graphEntropy(self.linko, 0, 2))
+            self.assertEqual(cache.info()['diskHits'], 1)
+
+class Test_rolling(unittest.TestCase):
+
+    """Basic unit tests for rolling in the stats package."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        simpleLinko = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+        self.testParams = [
+            {'linko': simpleLinko,
+             'k': 2,
+             'step': 1,
+             'lowerBound': None,
+             'upperBound': None},
+            {'linko': simpleLinko,
+             'k': 3,
+             'step': 1,
+             'lowerBound': None,
+             'upperBound': None},
+            {'linko': simpleLinko,
+             'k': 3,
+             'step': 2,
+             'lowerBound': None,
+             'upperBound': None},
+            {'linko': simpleLinko,
+             'k': 2,
+             'step': 1,
+             'lowerBound': 1,
+             'upperBound': 3},
+            {'linko': simpleLinko,
+             'k': 5,
+             'step': 1,
+             'lowerBound': None,
+             'upperBound': None},
+            {'linko': simpleLinko,
+             'k': 6,
+             'step': 1,
+             'lowerBound': None,
+             'upperBound': None}]
+
+    def test_rolling(self):
+        """Tests that each window matches the direct calculation."""
+        for params in self.testParams:
+            linko, k = params['linko'], params['k']
+            lowerBound, upperBound = stats.boundDefaults(
+                linko, params['lowerBound'], params['upperBound'])
+            starts = range(lowerBound, upperBound - k + 2,
+                           params['step'])
+
+            actual = stats.rolling(linko, k,
+                                   ['links', 'graphEntropy'],
+                                   params['step'],
+                                   params['lowerBound'],
+                                   params['upperBound'])
+
+            self.assertEqual(
+                list(actual['links']),
+                [stats.links(linko, s, s+k-1) for s in starts],
+                "Test fail: params = {}".format(params))
+
+            self.assertEqual(
+                list(actual['graphEntropy']),
+                [stats.graphEntropy(linko, s, s+k-1) for s in starts],
+                "Test fail: params = {}".format(params))
+
+class Test_similarityMatrix(unittest.TestCase):
+
+    """Basic unit tests for the bitset similarity in the stats package."""
+
+    def setUp(self):
+        """Set up the linkographs for the individual tests."""
+
+        self.linkos = [
+            linkoCreate.Linkograph(
+                [(set(), set(), {1,2,3}),
+                 (set(), {0}, {3,4}),
+                 (set(), {0}, {4}),
+                 (set(), {0,1}, {4}),
+                 (set(), {1,2,3}, set())]),
+            linkoCreate.Linkograph(
+                [(set(), set(), {1}),
+                 (set(), {0}, {2,4}),
+                 (set(), {1}, {4}),
+                 (set(), set(), set()),
+                 (set(), {1,2}, set())]),
+            linkoCreate.Linkograph(
+                [(set(), set(), {2}),
+                 (set(), set(), set()),
+                 (set(), {0}, set())])]
+
+    def test_bitSimilarity(self):
+        """Tests agreement with similarity."""
+        for linko_0 in self.linkos:
+            for linko_1 in self.linkos:
+                self.assertEqual(stats.bitSimilarity(linko_0, linko_1),
+                                 stats.similarity(linko_0, linko_1))
+
+    def test_sameLength(self):
+        """Tests the matrix when only equal lengths are compared."""
+        for workers in [None, 2]:
+            underlinks, overlinks, accuracy = stats.similarityMatrix(
+                self.linkos, workers=workers)
+
+            self.assertEqual((underlinks[0, 1], overlinks[0, 1]), (4, 1))
+            self.assertEqual((underlinks[1, 0], overlinks[1, 0]), (1, 4))
+            self.assertEqual(accuracy[0, 1], 0.5)
+            self.assertEqual(accuracy[2, 2], 1.0)
+            self.assertTrue(math.isnan(accuracy[0, 2]))
+
+    def test_aligned(self):
+        """Tests the matrix when the first nodes are compared."""
+        underlinks, overlinks, accuracy = stats.similarityMatrix(
+            self.linkos, aligned=True)
+
+        # On nodes 0 through 2, linkograph 0 has the links (0,1) and
+        # (0,2) and linkograph 2 has the link (0,2).
+        self.assertEqual((underlinks[0, 2], overlinks[0, 2]), (1, 0))
+        self.assertEqual(accuracy[2, 0], 2/3)
+
+class Test_featureVector(unittest.TestCase):
+
+    """Basic unit tests for featureVector in the stats package."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        self.testParams = [
+            {'linko': linkoCreate.Linkograph([])},
+            {'linko': linkoCreate.Linkograph(
+                [(set(), set(), set())])},
+            {'linko': linkoCreate.Linkograph(
+                [(set(), set(), {1,2,3}),
+                 (set(), {0}, {2}),
+                 (set(), {0,1}, set()),
+                 (set(), {0}, set())])},
+            {'linko': linkoCreate.Linkograph(
+                [({'A', 'B', 'C'}, set(), {1,2,3}),
+                 ({'D'}, {0}, {3,4}),
+                 ({'A'}, {0}, {4}),
+                 ({'B', 'C'}, {0,1}, {4}),
+                 ({'A'}, {1,2,3}, set())])},
+            {'linko': linkoCreate.Linkograph(
+                [(set(), set(), {2,7}),
+                 (set(), set(), {2,3,9}),
+                 (set(), {0,1}, {8}),
+                 (set(), {1}, {4,5,6}),
+                 (set(), {3}, set()),
+                 (set(), {3}, {9}),
+                 (set(), {3}, {7}),
+                 (set(), {0,6}, set()),
+                 (set(), {2}, set()),
+                 (set(), {1,5}, set())])}]
+
+    def expectedFeatures(self, linko):
+        """Calculates the features with the individual functions."""
+
+        cartesian = stats.calculateCartesianStatistics(linko)
+        size = len(linko)
+
+        return dict(zip(stats.sessionFeatures,
+                        [size,
+                         stats.countCriticalNodes(linko, size/2)]
+                        + list(cartesian)
+                        + [stats.percentageOfLinks(linko),
+                           stats.graphEntropy(linko),
+                           stats.tComplexity(
+                               stats.linkographToString(linko)),
+                           stats.links(linko)/size if size else None,
+                           stats.summaryDifference(linko),
+                           stats.entropyDeviation(linko)
+                           if size else None,
+                           stats.meanLinkCoverage(linko),
+                           stats.topCover(linko)]))
+
+    def test_featureVector(self):
+        """Tests agreement with the individual functions."""
+        for params in self.testParams:
+            actual = stats.featureVector(params['linko'])
+            expected = self.expectedFeatures(params['linko'])
+
+            self.assertEqual(list(actual.keys()), stats.sessionFeatures)
+
+            for feature in stats.sessionFeatures:
+                message = ("Test fail: feature = {}"
+                           " linko = {}"
+                           " actual = {}"
+                           " expected = {}").format(feature,
+                                                    params['linko'],
+                                                    actual[feature],
+                                                    expected[feature])
+
+                # The link coverage ratios can be summed in a
+                # different order.
+                if feature == 'mean_link_coverage' and \
+                   expected[feature] is not None:
+                    self.assertAlmostEqual(actual[feature],
+                                           expected[feature],
+                                           msg=message)
+                else:
+                    self.assertEqual(actual[feature],
+                                     expected[feature],
+                                     message)
+
+    def test_subset(self):
+        """Tests requesting some of the features."""
+        linko = self.testParams[2]['linko']
+        self.assertEqual(stats.featureVector(linko, ['entropy',
+                                                     'node_count']),
+                         {'entropy': stats.graphEntropy(linko),
+                          'node_count': 4})
+
+class Test_coverage(unittest.TestCase):
+
+    """Basic unit tests for topCover and meanLinkCoverage."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        linko = linkoCreate.Linkograph(
+            [(set(), set(), {2,7}),
+             (set(), set(), {2,3,9}),
+             (set(), {0,1}, {8}),
+             (set(), {1}, {4,5,6}),
+             (set(), {3}, set()),
+             (set(), {3}, {9}),
+             (set(), {3}, {7}),
+             (set(), {0,6}, set()),
+             (set(), {2}, set()),
+             (set(), {1,5}, set())])
+
+        # Nodes 2, 3, 5, and 6 have longest links to 8, 6, 9, and 7,
+        # so the number of nodes covering idx = 1, ..., 8 is 0, 1, 2,
+        # 2, 3, 3, 2, 1.
+        fullTopCover = (1/2 + 2/3 + 2/4 + 3/5 + 3/6 + 2/7 + 1/8)/9
+
+        # Nodes 1, 2, 3, 5, and 6 have forelinks with coverages
+        # {2, 3, 9}/10, {7}/10, {2, 3, 4}/10, {5}/10, and {2}/10.
+        fullLinkCoverage = (14/30 + 7/10 + 9/30 + 5/10 + 2/10)/5
+
+        self.testParams = [
+            {'linko': linko,
+             'lowerBound': None,
+             'upperBound': None,
+             'ExpectedTopCover': fullTopCover,
+             'ExpectedLinkCoverage': fullLinkCoverage},
+            {'linko': linko,
+             'lowerBound': 3,
+             'upperBound': 3,
+             'ExpectedTopCover': 0.0,
+             'ExpectedLinkCoverage': None},
+            {'linko': linko,
+             'lowerBound': 5,
+             'upperBound': 2,
+             'ExpectedTopCover': None,
+             'ExpectedLinkCoverage': None},
+            {'linko': linkoCreate.Linkograph([]),
+             'lowerBound': None,
+             'upperBound': None,
+             'ExpectedTopCover': None,
+             'ExpectedLinkCoverage': None}]
+
+        # Windows are compared against the sublinkograph.
+        for (lowerBound, upperBound) in [(1, 8), (2, 9), (0, 4)]:
+            subLinko = linkoCreate.createSubLinko(linko, lowerBound,
+                                                  upperBound)
+            self.testParams.append(
+                {'linko': linko,
+                 'lowerBound': lowerBound,
+                 'upperBound': upperBound,
+                 'ExpectedTopCover': stats.topCover(subLinko),
+                 'ExpectedLinkCoverage':
+                     stats.meanLinkCoverage(subLinko)})
+
+    def assertValue(self, actual, expected, params):
+        """Compares values that are either None or floats."""
+        message = ("Test fail: lowerBound = {}"
+                   " upperBound = {}"
+                   " actual = {}"
+                   " expected = {}").format(params['lowerBound'],
+                                            params['upperBound'],
+                                            actual,
+                                            expected)
+        if expected is None:
+            self.assertIsNone(actual, message)
+        else:
+            self.assertAlmostEqual(actual, expected, msg=message)
+
+    def test_topCover(self):
+        """Tests the top cover of linkographs and windows."""
+        for params in self.testParams:
+            self.assertValue(stats.topCover(params['linko'],
+                                            params['lowerBound'],
+                                            params['upperBound']),
+                             params['ExpectedTopCover'],
+                             params)
+
+    def test_meanLinkCoverage(self):
+        """Tests the mean link coverage of linkographs and windows."""
+        for params in self.testParams:
+            self.assertValue(stats.meanLinkCoverage(params['linko'],
+                                                    params['lowerBound'],
+                                                    params['upperBound']),
+                             params['ExpectedLinkCoverage'],
+                             params)
+
+class Test_packedStrings(unittest.TestCase):
+
+    """Basic unit tests for the packed link strings in the stats package."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        self.linko = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+        self.testParams = [
+            {'linko': linkoCreate.Linkograph([]),
+             'ExpectedString': ''},
+            {'linko': linkoCreate.Linkograph([(set(), set(), set())]),
+             'ExpectedString': ''},
+            {'linko': self.linko,
+             'ExpectedString': '1110' + '011' + '01' + '1'}]
+
+    def test_linkographToPacked(self):
+        """Tests the packed link string of a linkograph."""
+        for params in self.testParams:
+            packed = stats.linkographToPacked(params['linko'])
+            self.assertEqual(packed.length,
+                             len(params['ExpectedString']))
+            self.assertEqual(stats.packedToString(packed),
+                             params['ExpectedString'])
+            self.assertEqual(stats.linkographToString(params['linko']),
+                             params['ExpectedString'])
+            self.assertEqual(stats.tComplexity(
+                stats.packedToString(packed)),
+                             stats.tComplexity(params['ExpectedString']))
+
+    def test_entryToPacked(self):
+        """Tests agreement with entryToString."""
+        for index, entry in enumerate(self.linko):
+            for listNumber in [[1], [2], [1, 2]]:
+                for lowerBound in range(index+1):
+                    for upperBound in range(index, len(self.linko)):
+                        packed = stats.entryToPacked(entry, index,
+                                                     listNumber,
+                                                     lowerBound,
+                                                     upperBound)
+                        self.assertEqual(
+                            stats.packedToString(packed),
+                            stats.entryToString(entry, index,
+                                                listNumber,
+                                                lowerBound,
+                                                upperBound))
+
+    def test_longString(self):
+        """Tests a string too long for a recursive T decomposition."""
+        # The code words are 0 with multiplicity 3 and then 0001 with
+        # multiplicity 9999.
+        string = '0001' * 10000
+        self.assertEqual(stats.tComplexity(string),
+                         math.log(4, 2) + math.log(10000, 2))
+
+class Test_approximation(unittest.TestCase):
+
+    """Basic unit tests for the approximate metrics in the stats package."""
+
+    def setUp(self):
+        """Set up the linkographs for the individual tests."""
+
+        # A linkograph where node i links to i+1 through i+5 and every
+        # node divisible by 7 also links to the node 30 after it.
+        size = 1000
+        self.large = linkoCreate.Linkograph(
+            [(set(), set(), set()) for n in range(size)])
+        for tail in range(size):
+            heads = set(range(tail+1, min(tail+6, size)))
+            if tail % 7 == 0 and tail + 30 < size:
+                heads.add(tail + 30)
+            for head in heads:
+                self.large[tail][2].add(head)
+                self.large[head][1].add(tail)
+
+        self.small = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+    def assertApproximation(self, approximation, exact, relativeError):
+        """Checks the reported bound and the actual error."""
+        self.assertLessEqual(approximation.relativeError, relativeError)
+        self.assertLessEqual(abs(approximation.value - exact),
+                             relativeError * approximation.value)
+
+    def test_percentageOfLinks(self):
+        """Tests the sampled link density."""
+        approximation = stats.approximatePercentageOfLinks(
+            self.large, relativeError=0.1, seed=1)
+        self.assertApproximation(approximation,
+                                 stats.percentageOfLinks(self.large),
+                                 0.1)
+        self.assertLess(approximation.samples,
+                        stats.totalLinks(len(self.large)))
+
+    def test_graphEntropy(self):
+        """Tests the sampled graph entropy."""
+        approximation = stats.approximateGraphEntropy(
+            self.large, relativeError=0.1, seed=1)
+        self.assertApproximation(approximation,
+                                 stats.graphEntropy(self.large), 0.1)
+
+    def test_linkEntropy(self):
+        """Tests the sampled mean link entropy."""
+        values = stats.linkEntropy(self.large, delta=10)
+        approximation = stats.approximateLinkEntropy(
+            self.large, delta=10, relativeError=0.05, seed=1)
+        self.assertApproximation(approximation,
+                                 sum(values)/len(values), 0.05)
+
+    def test_exact(self):
+        """Tests that small ranges are calculated exactly."""
+        self.assertEqual(
+            stats.approximatePercentageOfLinks(self.small),
+            (stats.percentageOfLinks(self.small), 0.0, 0.95, 10))
+        self.assertEqual(
+            stats.approximateGraphEntropy(self.small, lowerBound=1,
+                                          upperBound=3),
+            (stats.graphEntropy(self.small, 1, 3), 0.0, 0.95, 3))
+        self.assertEqual(
+            stats.approximatePercentageOfLinks(self.small, lowerBound=2,
+                                               upperBound=2).value,
+            None)
+
+    def test_maxSamples(self):
+        """Tests that no more than maxSamples samples are drawn."""
+        for maxSamples in [1, 2, 50]:
+            approximation = stats.approximateLinkEntropy(
+                self.large, delta=10, relativeError=1e-9,
+                maxSamples=maxSamples, seed=1)
+            self.assertEqual(approximation.samples, maxSamples)
+
+            approximation = stats.approximatePercentageOfLinks(
+                self.large, relativeError=1e-9, maxSamples=maxSamples,
+                seed=1)
+            self.assertLessEqual(approximation.samples, maxSamples)
+
+    def test_singleSample(self):
+        """Tests that one sample gives no bound and no warning."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            approximation = stats.approximateLinkEntropy(
+                self.large, delta=10, maxSamples=1, seed=1)
+        self.assertEqual(approximation.samples, 1)
+        self.assertEqual(approximation.relativeError, math.inf)
+
+class Test_spectrum(unittest.TestCase):
+
+    """Basic unit tests for entropySpectrum and percentSpectrum."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        simpleLinko = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+        self.testParams = []
+        for listNumber in [[1], [2], [1,2]]:
+            for restrict in [False, True]:
+                for lowerBound, upperBound in [(None, None), (1, 3),
+                                               (2, 2), (0, 1)]:
+                    self.testParams.append(
+                        {'linko': simpleLinko,
+                         'maxDelta': 5,
+                         'listNumber': listNumber,
+                         'restrict': restrict,
+                         'lowerBound': lowerBound,
+                         'upperBound': upperBound})
+
+    def test_spectrum(self):
+        """Tests that each column matches the slice functions."""
+        for params in self.testParams:
+            args = (params['linko'], params['maxDelta'],
+                    params['listNumber'], params['restrict'],
+                    params['lowerBound'], params['upperBound'])
+
+            entropies = stats.entropySpectrum(*args)
+            percents = stats.percentSpectrum(*args)
+
+            for delta in range(1, params['maxDelta']+1):
+                sliceArgs = (params['linko'], params['listNumber'],
+                             delta, params['restrict'],
+                             params['lowerBound'], params['upperBound'])
+
+                expected = stats.linkEntropy(*sliceArgs)
+                self.assertEqual(len(entropies[:, delta-1]),
+                                 len(expected))
+                for actual, value in zip(entropies[:, delta-1],
+                                         expected):
+                    self.assertAlmostEqual(
+                        actual, value,
+                        msg="Test fail: params = {}".format(params))
+
+                self.assertEqual(
+                    list(percents[:, delta-1]),
+                    stats.linkSlicePercents(*sliceArgs),
+                    "Test fail: params = {}".format(params))
+
+    def test_example(self):
+        """Tests the entropies of a node against hand calculation."""
+        entropies = stats.entropySpectrum(self.testParams[0]['linko'],
+                                          3, [2])
+        # Node 1 has forelinks to 3 and 4 only: 0 of 1, 1 of 2 and 2
+        # of 3 possible links for the deltas 1, 2 and 3.
+        self.assertEqual(entropies[1, 0], 0.0)
+        self.assertAlmostEqual(entropies[1, 1], 1.0)
+        self.assertAlmostEqual(entropies[1, 2],
+                               stats.shannonEntropy(2, 3))
+
+class Test_horizontalLinkEntropy(unittest.TestCase):
+
+    """Basic unit tests for horizontalLinkEntropy in the stats package."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        simpleLinko = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+        # The links by distance are 1: (0,1), (3,4); 2: (0,2), (1,3),
+        # (2,4); 3: (0,3), (1,4); 4: none.
+        self.testParams = [
+            {'linko': simpleLinko,
+             'maxDistance': None,
+             'restrict': False,
+             'lowerBound': None,
+             'upperBound': None,
+             'counts': [2, 3, 2, 0],
+             'totals': [4, 3, 2, 1]},
+            {'linko': simpleLinko,
+             'maxDistance': 2,
+             'restrict': False,
+             'lowerBound': None,
+             'upperBound': None,
+             'counts': [2, 3],
+             'totals': [4, 3]},
+            {'linko': simpleLinko,
+             'maxDistance': None,
+             'restrict': False,
+             'lowerBound': 1,
+             'upperBound': 2,
+             'counts': [0, 2, 1],
+             'totals': [2, 2, 1]},
+            {'linko': simpleLinko,
+             'maxDistance': None,
+             'restrict': True,
+             'lowerBound': 1,
+             'upperBound': 3,
+             'counts': [0, 1],
+             'totals': [2, 1]},
+            {'linko': simpleLinko,
+             'maxDistance': 3,
+             'restrict': True,
+             'lowerBound': 2,
+             'upperBound': 2,
+             'counts': [0, 0, 0],
+             'totals': [0, 0, 0]}]
+
+    def test_horizontalLinkCounts(self):
+        """Tests the links and possible links at each distance."""
+        for params in self.testParams:
+            counts, totals = stats.horizontalLinkCounts(
+                params['linko'], params['maxDistance'],
+                params['restrict'], params['lowerBound'],
+                params['upperBound'])
+
+            self.assertEqual(list(counts), params['counts'],
+                             "Test fail: params = {}".format(params))
+            self.assertEqual(list(totals), params['totals'],
+                             "Test fail: params = {}".format(params))
+
+    def test_horizontalLinkEntropy(self):
+        """Tests the entropy at each distance."""
+        for params in self.testParams:
+            actual = stats.horizontalLinkEntropy(
+                params['linko'], params['maxDistance'],
+                params['restrict'], params['lowerBound'],
+                params['upperBound'], lineNumbers=True)
+
+            expected = [(d, stats.shannonEntropy(l, t))
+                        for (d, (l, t)) in enumerate(
+                                zip(params['counts'], params['totals']),
+                                1)]
+
+            self.assertEqual(actual, expected,
+                             "Test fail: params = {}".format(params))
+
+class Test_patterns(unittest.TestCase):
+
+    """Basic unit tests for the chunk, web, and sawtooth detectors."""
+
+    def setUp(self):
+        """Set up the linkograph for the individual tests."""
+
+        # Nodes 0-3 form a dense block, 4 is isolated, and 5-8 form a
+        # sawtooth track with one extra link (5,7).
+        self.linko = linkoCreate.Linkograph(
+            [(set(), set(), {1,2,3}),
+             (set(), {0}, {2,3}),
+             (set(), {0,1}, {3}),
+             (set(), {0,1,2}, set()),
+             (set(), set(), set()),
+             (set(), set(), {6,7}),
+             (set(), {5}, {7}),
+             (set(), {5,6}, {8}),
+             (set(), {7}, set())])
+
+    def test_findChunks(self):
+        """Tests the chunks."""
+        self.assertEqual(stats.findChunks(self.linko),
+                         [(0, 3, 1.0), (5, 8, 4/6)])
+        self.assertEqual(stats.findChunks(self.linko, maxLength=1),
+                         [(0, 3, 3/6), (5, 8, 3/6)])
+        self.assertEqual(stats.findChunks(self.linko, minSize=5), [])
+        self.assertEqual(stats.findChunks(self.linko, lowerBound=1,
+                                          upperBound=3),
+                         [(1, 3, 1.0)])
+
+    def test_findChunksDegree(self):
+        """Tests the core degree threshold of the chunks."""
+        self.assertEqual(stats.findChunks(self.linko, minDegree=3),
+                         [(0, 3, 1.0), (5, 8, 4/6)])
+        self.assertEqual(stats.findChunks(self.linko, upperBound=7),
+                         [(0, 3, 1.0), (5, 7, 1.0)])
+        self.assertEqual(stats.findChunks(self.linko, upperBound=7,
+                                          minDegree=3),
+                         [(0, 3, 1.0)])
+        self.assertEqual(stats.findChunks(self.linko, minDegree=4), [])
+
+    def test_findWebs(self):
+        """Tests the webs."""
+        self.assertEqual(stats.findWebs(self.linko, 4, 0.6),
+                         [(0, 3, 1.0), (5, 8, 4/6)])
+        self.assertEqual(stats.findWebs(self.linko, 3, 1.0),
+                         [(0, 3, 1.0), (5, 7, 1.0)])
+        self.assertEqual(stats.findWebs(self.linko, 10, 0.1), [])
+        self.assertEqual(stats.findWebs(self.linko, 3, 1.0,
+                                        minDegree=3),
+                         [(0, 3, 1.0)])
+
+    def test_findSawtooths(self):
+        """Tests the sawtooth tracks."""
+        self.assertEqual(stats.findSawtooths(self.linko),
+                         [(0, 3, 4), (5, 8, 4)])
+        self.assertEqual(stats.findSawtooths(self.linko, minSize=5), [])
+        self.assertEqual(stats.findSawtooths(self.linko, lowerBound=6),
+                         [(6, 8, 3)])
+
+class Test_degreePrimitives(unittest.TestCase):
+
+    """Basic unit tests for the link length and degree primitives."""
+
+    def setUp(self):
+        """Set up the linkograph for the individual tests."""
+
+        self.linko = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+    def test_linkLengthHistogram(self):
+        """Tests the number of links of each length."""
+        self.assertEqual(list(stats.linkLengthHistogram(self.linko)),
+                         [0, 2, 3, 2, 0])
+        self.assertEqual(list(stats.linkLengthHistogram(self.linko, 1,
+                                                        3)),
+                         [0, 0, 1])
+
+    def test_degreeArrays(self):
+        """Tests the forelink and backlink counts."""
+        foreDegree, backDegree = stats.degreeArrays(self.linko)
+        self.assertEqual(list(foreDegree), [3, 2, 1, 1, 0])
+        self.assertEqual(list(backDegree), [0, 1, 1, 2, 3])
+
+        foreDegree, backDegree = stats.degreeArrays(self.linko, 1, 3)
+        self.assertEqual(list(foreDegree), [1, 0, 0])
+        self.assertEqual(list(backDegree), [0, 0, 1])
+
+    def test_criticalNodeCounts(self):
+        """Tests the critical nodes for several thresholds."""
+        thresholds = [0, 1, 2, 2.5, 3]
+        self.assertEqual(stats.criticalNodeCounts(self.linko, thresholds),
+                         [stats.countCriticalNodes(self.linko, threshold)
+                          for threshold in thresholds])
+        self.assertEqual(stats.criticalNodeCounts(self.linko, thresholds),
+                         [5, 5, 4, 4, 0])
+        self.assertEqual(stats.criticalNodeCounts(self.linko, [0], 1, 3),
+                         [2])
+
+class Test_LabelCounts(unittest.TestCase):
+
+    """Basic unit tests for LabelCounts and labelRatios."""
+
+    def setUp(self):
+        """Set up the parameters for the individual tests."""
+
+        self.linko = linkoCreate.Linkograph(
+            [({'A', 'B', 'C'}, set(), {1,2,3}),
+             ({'D'}, {0}, {3,4}),
+             ({'A'}, {0}, {4}),
+             ({'B', 'C'}, {0,1}, {4}),
+             ({'A', 'E'}, {1,2,3}, set())],
+            ['A', 'B', 'C', 'D'])
+
+        self.counts = stats.LabelCounts(self.linko)
+
+        self.windows = [(None, None), (1, 3), (2, 2), (3, 1), (-2, 10)]
+
+    def test_labels(self):
+        """Tests the labels that are counted."""
+        self.assertEqual(self.counts.labels, ['A', 'B', 'C', 'D', 'E'])
+
+    def test_totalLabels(self):
+        """Tests the frequencies against totalLabels."""
+        for (lowerBound, upperBound) in self.windows:
+            self.assertEqual(
+                self.counts.totalLabels(lowerBound, upperBound),
+                stats.totalLabels(self.linko, lowerBound, upperBound),
+                "Test fail: window = {}".format((lowerBound, upperBound)))
+
+    def test_percentageOfEntries(self):
+        """Tests the percentages against percentageOfEntries."""
+        for (lowerBound, upperBound) in self.windows:
+            self.assertEqual(
+                self.counts.percentageOfEntries(lowerBound, upperBound),
+                stats.percentageOfEntries(self.linko, lowerBound,
+                                          upperBound),
+                "Test fail: window = {}".format((lowerBound, upperBound)))
+
+    def test_labelRatios(self):
+        """Tests the matrix of label ratios."""
+        labels, ratios = stats.labelRatios(self.linko, self.windows,
+                                           ['A', 'D'])
+        self.assertEqual(labels, ['A', 'D'])
+        self.assertEqual(ratios.shape, (5, 2))
+        self.assertEqual(list(ratios[0]), [3/5, 1/5])
+        self.assertEqual(list(ratios[1]), [1/3, 1/3])
+        self.assertEqual(list(ratios[2]), [1.0, 0.0])
+        self.assertTrue(all(math.isnan(value) for value in ratios[3]))
+        self.assertEqual(list(ratios[4]), [3/5, 1/5])
+
+class Test_chains(unittest.TestCase):
+
+    """Basic unit tests for the chain depth and reachability metrics."""
+
+    def setUp(self):
+        """Set up the linkograph for the individual tests."""
+
+        # The chain 0 -> 1 -> 3 -> 5, the shortcut 0 -> 5, the link
+        # 2 -> 4 and node 6 with no links.
+        self.linko = linkoCreate.Linkograph(
+            [(set(), set(), {1,5}),
+             (set(), {0}, {3}),
+             (set(), set(), {4}),
+             (set(), {1}, {5}),
+             (set(), {2}, set()),
+             (set(), {0,3}, set()),
+             (set(), set(), set())])
+
+    def test_chainDepths(self):
+        """Tests the depths of the nodes."""
+        self.assertEqual(list(stats.chainDepths(self.linko)),
+                         [0, 1, 0, 2, 1, 3, 0])
+        self.assertEqual(list(stats.chainDepths(self.linko, 1, 5)),
+                         [0, 0, 1, 1, 2])
+
+    def test_longestChain(self):
+        """Tests the longest chain."""
+        self.assertEqual(stats.longestChain(self.linko), 3)
+        self.assertEqual(stats.longestChain(self.linko, 2, 4), 1)
+        self.assertEqual(stats.longestChain(self.linko, 6, 6), 0)
+
+    def test_reachableCounts(self):
+        """Tests the number of reachable nodes."""
+        for blockSize in [8, 16384]:
+            self.assertEqual(list(stats.reachableCounts(self.linko,
+                                                        blockSize=blockSize)),
+                             [3, 2, 1, 1, 0, 0, 0])
+        self.assertEqual(list(stats.reachableCounts(self.linko, 1, 4)),
+                         [1, 1, 0, 0])
+
+    def test_reachableBlocks(self):
+        """Tests reachableCounts over several blocks against a search."""
+        size = 20
+        linko = linkoCreate.Linkograph(
+            [(set(), set(), set()) for n in range(size)])
+        for tail in range(size):
+            for head in range(tail+1, size):
+                # A fixed scattering of short and long links.
+                if (3*tail + 5*head) % 11 == 0 or head == tail + 9:
+                    linko[tail][2].add(head)
+                    linko[head][1].add(tail)
+
+        def reachable(node, lowerBound, upperBound):
+            seen = set()
+            stack = [node]
+            while stack:
+                for head in linko[stack.pop()][2]:
+                    if head <= upperBound and head not in seen:
+                        seen.add(head)
+                        stack.append(head)
+            return len(seen)
+
+        for (lowerBound, upperBound) in [(0, 19), (2, 17), (5, 19)]:
+            expected = [reachable(node, lowerBound, upperBound)
+                        for node in range(lowerBound, upperBound+1)]
+            for blockSize in [8, 16, 16384]:
+                self.assertEqual(
+                    list(stats.reachableCounts(linko, lowerBound,
+                                               upperBound, blockSize)),
+                    expected,
+                    "Test fail: bounds = {}, blockSize = {}".format(
+                        (lowerBound, upperBound), blockSize))
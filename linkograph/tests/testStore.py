@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+"""Tests the store.py package."""
+
+import unittest
+import os # For file names.
+import subprocess # For identities in another process.
+import sys
+import tempfile # For the store directory.
+from linkograph import store # The package under test.
+from linkograph import enumeration # For the stored results.
+from linkograph import stats # For the functions.
+
+
+class Test_ResultStore(unittest.TestCase):
+
+    """Basic unit tests for ResultStore."""
+
+    def setUp(self):
+        """Set up a store for the individual tests."""
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = store.ResultStore(self.directory.name)
+
+        self.ontology = {'A':['A','C'], 'B':['A'], 'C':['B','C']}
+
+    def tearDown(self):
+        """Remove the store directory."""
+        self.directory.cleanup()
+
+    def test_frequency(self):
+        """Tests that frequency stores and reuses its results."""
+
+        expected = enumeration.frequency(5, self.ontology, store=False)
+
+        for _ in range(2):
+            actual = enumeration.frequency(5, self.ontology,
+                                           store=self.store)
+            self.assertEqual(list(actual.items()), list(expected.items()))
+
+        self.assertEqual((self.store.hits, self.store.misses), (1, 1))
+
+        # parallelFrequency gives the same result, so it is shared.
+        self.assertEqual(enumeration.parallelFrequency(
+            5, self.ontology, store=self.store), expected)
+        self.assertEqual(self.store.hits, 2)
+
+    def test_values(self):
+        """Tests the columns for different function values."""
+        for function in [stats.graphEntropy, stats.links,
+                         enumeration.shannonValue, enumeration.linkoToEnum]:
+            expected = enumeration.frequency(4, self.ontology, function,
+                                             store=False)
+            enumeration.frequency(4, self.ontology, function,
+                                  store=self.store)
+            self.assertEqual(enumeration.frequency(4, self.ontology,
+                                                   function,
+                                                   store=self.store),
+                             expected)
+
+        arrays = {}
+        values = [(8, 2**300 + 5), (3, 0), (0, 0)]
+        kind = store._encodeColumn('v', values, arrays)
+        self.assertEqual(kind, 'enum')
+        self.assertEqual(store._decodeColumn('v', kind, arrays), values)
+
+        arrays = {}
+        values = [(1, 2.0), 'x', None]
+        kind = store._encodeColumn('v', values, arrays)
+        self.assertEqual(kind, 'pickle')
+        self.assertEqual(store._decodeColumn('v', kind, arrays), values)
+
+    def test_histogram(self):
+        """Tests that histogram stores and reuses its results."""
+        expected = enumeration.histogram(4, self.ontology, store=False)
+        enumeration.histogram(4, self.ontology, store=self.store)
+        self.assertEqual(enumeration.histogram(4, self.ontology,
+                                               store=self.store),
+                         expected)
+        self.assertEqual(self.store.hits, 1)
+
+    def test_keys(self):
+        """Tests the runs that are not stored or are kept apart."""
+
+        # Functions without an identity are not stored.
+        enumeration.frequency(3, self.ontology, lambda linko: 0,
+                              store=self.store)
+        self.assertEqual(self.store.entries(), [])
+
+        # Neither are random runs without a seed.
+        enumeration.frequency(3, self.ontology, samples=5, random=True,
+                              store=self.store)
+        self.assertEqual(self.store.entries(), [])
+
+        enumeration.frequency(3, self.ontology, samples=5, random=True,
+                              seed=1, store=self.store)
+        enumeration.frequency(3, self.ontology, samples=5,
+                              store=self.store)
+        enumeration.frequency(3, self.ontology, absClasses=['A', 'B'],
+                              store=self.store)
+        self.assertEqual(len(self.store.entries()), 3)
+
+    def test_invalidate(self):
+        """Tests removing results."""
+
+        for length in range(1, 4):
+            enumeration.frequency(length, self.ontology,
+                                  store=self.store)
+            enumeration.frequency(length, {'A':['A']},
+                                  store=self.store)
+
+        self.assertEqual(self.store.invalidate(length=2), 2)
+        self.assertEqual(self.store.invalidate(ontology=self.ontology),
+                         2)
+        self.assertEqual([fields['length'] for (fields, size)
+                          in self.store.entries()], [1, 3])
+
+        self.store.clear()
+        self.assertEqual(self.store.entries(), [])
+
+    def test_eviction(self):
+        """Tests that the least recently used results are evicted."""
+
+        for length in range(1, 4):
+            enumeration.frequency(length, self.ontology,
+                                  store=self.store)
+
+        files = self.store._files()
+        for (age, (_, _, path)) in enumerate(files):
+            os.utime(path, (age, age))
+
+        # Using the oldest entry makes it the most recent.
+        enumeration.frequency(1, self.ontology, store=self.store)
+
+        sizes = {fields['length']: size
+                 for (fields, size) in self.store.entries()}
+
+        limited = store.ResultStore(self.directory.name,
+                                    maxBytes=sizes[1] + sizes[3] + 10)
+        enumeration.frequency(3, self.ontology, samples=2,
+                              store=limited)
+
+        lengths = sorted(fields['length'] for (fields, size)
+                         in limited.entries())
+        self.assertLessEqual(limited.size(), limited.maxBytes)
+        self.assertNotIn(2, lengths)
+
+    def test_identity(self):
+        """Tests that function identities are the same in a new process."""
+        for function in ['stats.links', 'stats.graphEntropy',
+                         'enumeration.shannonValue']:
+            other = subprocess.run(
+                [sys.executable, '-c',
+                 'from linkograph import store, stats, enumeration;'
+                 ' print(store.functionIdentity({}))'.format(function)],
+                capture_output=True, text=True, check=True,
+                env=dict(os.environ, PYTHONHASHSEED='1')).stdout.strip()
+            self.assertEqual(other,
+                             store.functionIdentity(eval(function)))
+
+    def test_version(self):
+        """Tests that results of another version are not found."""
+        enumeration.frequency(3, self.ontology, store=self.store)
+
+        versioned = store.ResultStore(self.directory.name, version=2)
+        enumeration.frequency(3, self.ontology, store=versioned)
+        self.assertEqual((versioned.hits, versioned.misses), (0, 1))
+        self.assertEqual(len(versioned.entries()), 2)
+
+    def test_directory(self):
+        """Tests that the directory is only created to store a result."""
+        directory = os.path.join(self.directory.name, 'results')
+        lazy = store.ResultStore(directory)
+        fields = lazy.describe('frequency', 2, self.ontology)
+        self.assertIsNone(lazy.get(fields))
+        self.assertEqual(lazy.entries(), [])
+        self.assertFalse(os.path.exists(directory))
+
+        enumeration.frequency(2, self.ontology, store=lazy)
+        self.assertEqual(len(lazy.entries()), 1)
@@ -53,11 +53,14 @@ def generateLinkMarkovState(ontologySize, minLinkoSize, maxLinkoSize,
 
     outputs
 
-    a numOntology x numLinkos x ontologySize x ontologySize x 2 array
-    where numLinkos is to the floor of ((maxLinkoSize - 1) -
-    minLinkoSize) // stepLinkoSize, ontologySize is the size of the
-    ontology used by the given model, and numOntologies is
-    (ontologySize)**(2*(ontologySize)). The first dimension is for the
+    (results, counts) where results is a numOntology x numLinkos x
+    ontologySize x ontologySize x 2 array and counts[i] is the number
+    of ontologies isomorphic to the ith. Only one ontology of each
+    isomorphism class is considered, see
+    enumeration.canonicalOntologies, so numOntologies is the number of
+    isomorphism classes. numLinkos is to the floor of ((maxLinkoSize -
+    1) - minLinkoSize) // stepLinkoSize and ontologySize is the size
+    of the ontology used by the given model. The first dimension is for the
     linkograph size. For example, an i in this dimension selects the
     linkograph of size minLinkoSize + i*stepLinkoSize. The second and
     third dimensions give the link in the link Markov model. Thus, a
@@ -72,36 +75,36 @@ def generateLinkMarkovState(ontologySize, minLinkoSize, maxLinkoSize,
 
     """
 
-    numOntologies = ontologySize**(2*ontologySize)
+    # One ontology for each isomorphism class, since relabeling the
+    # classes does not change the statistics.
+    ontologies = list(lenumeration.canonicalOntologies(ontologySize))
+    numOntologies = len(ontologies)
 
     linkoSizes = range(minLinkoSize, maxLinkoSize, stepLinkoSize)
     
     results = np.zeros((numOntologies, len(linkoSizes), ontologySize,
                         ontologySize, 2))
 
-    # Use a modularCounter to loop through all the ontologies
-    enumCounter = lenumeration.modularCounter(ontologySize,
-                                              ontologySize**2)
-    
+    counts = np.array([count for (enum, count) in ontologies])
+
     # Loop through all the ontogies with ontologySize.
-    for i in range(numOntologies):
+    for (i, (enum, count)) in enumerate(ontologies):
         # Generate the ontology.
-        ont = enumeration.enumOnt(enum)
+        ont = lenumeration.enumOnt(enum)
 
         # Generate the Markov model to use for generating linkographs.
         seed = int(math.modf(time.time())[0]*(10**timeSize))
         
-        model = genModelFromOntology(ontology, precision=precision,
-                                     seed=seed)
+        model = markel.genModelFromOntology(ont, precision=precision,
+                                            seed=seed)
         
-        results[i, :, :, :, :] = genSingleOntologyState(minLinkoSize,
+        results[i, :, :, :, :] = genSingleOntologyStats(minLinkoSize,
                                                         maxLinkoSize,
                                                         stepLinkoSize,
                                                         model, runNum,
                                                         precision=precision)
 
-        # Increment the enumCounter
-        enumCounter.inc()
+    return results, counts
 
 def genSingleOntologyStats(minLinkoSize, maxLinkoSize, stepLinkoSize,
                            model, runNum, precision=2):